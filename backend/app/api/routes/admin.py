@@ -9,6 +9,12 @@ from app.models.order import Order
 from app.models.product import Product
 from app.schemas.user import UserResponse
 from app.services.auth import get_current_superuser
+from app.services.cache import cache_stats
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.search_index import search_index
+from app.services.suggest import suggestion_trie
+from app.services.ratings import reconcile_rating_aggregates
+from app.services.flash_sale import flash_sale
 from datetime import datetime, timedelta
 
 router = APIRouter()
@@ -197,3 +203,72 @@ async def toggle_superuser_status(
             detail=f"Failed to update superuser status: {str(e)}"
         )
 
+
+@router.get("/catalog/memory")
+async def get_catalog_memory(current_user: User = Depends(get_current_superuser)):
+    """
+    Memory held by the in-process catalog snapshot and cache tiers
+    """
+    return {
+        "snapshot": catalog_snapshot.memory_report(),
+        "search_index": search_index.memory_report(),
+        "suggestions": suggestion_trie.memory_report(),
+        "cache": cache_stats(),
+    }
+
+
+@router.post("/reviews/reconcile")
+async def reconcile_reviews(current_user: User = Depends(get_current_superuser)):
+    """
+    Recompute review aggregates (rating sum, count, star histogram) from the reviews collection
+    """
+    repaired = await reconcile_rating_aggregates()
+    return {"repaired": repaired}
+
+
+class FlashSaleProducts(BaseModel):
+    product_ids: List[str] = []
+    tag: Optional[str] = None  # e.g. "Marvel Edition" for a whole drop
+
+
+async def _flash_sale_product_ids(data: FlashSaleProducts) -> List[str]:
+    product_ids = []
+    for product_id in data.product_ids:
+        try:
+            PydanticObjectId(product_id)
+        except Exception:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid product ID: {product_id}")
+        product_ids.append(product_id)
+    if data.tag:
+        docs = await Product.get_motor_collection().find({"tags": data.tag}, {"_id": 1}).to_list(length=None)
+        product_ids.extend(str(doc["_id"]) for doc in docs)
+    if not product_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No products selected")
+    return list(dict.fromkeys(product_ids))
+
+
+@router.get("/flash-sale")
+async def get_flash_sale(current_user: User = Depends(get_current_superuser)):
+    """
+    Products on flash sale with their stock tokens and sellable stock in MongoDB
+    """
+    return {"products": await flash_sale.report()}
+
+
+@router.post("/flash-sale")
+async def start_flash_sale(data: FlashSaleProducts, current_user: User = Depends(get_current_superuser)):
+    """
+    Put products on flash sale (or re-seed their tokens after a restock)
+    """
+    tokens = await flash_sale.enable(await _flash_sale_product_ids(data))
+    return {"tokens": tokens}
+
+
+@router.post("/flash-sale/end")
+async def end_flash_sale(data: FlashSaleProducts, current_user: User = Depends(get_current_superuser)):
+    """
+    Take products off flash sale; open flash holds become regular reservations
+    """
+    product_ids = await _flash_sale_product_ids(data)
+    reserved = await flash_sale.disable(product_ids)
+    return {"ended": product_ids, "reserved": reserved}
@@ -11,6 +11,8 @@ from app.models.product import Product
 from app.models.user import User
 from app.models.review import Review
 from app.services.auth import get_current_active_user
+from app.services.product_loader import ProductLoader, get_product_loader
+from app.services.purchases import product_purchase_summary
 
 router = APIRouter()
 
@@ -61,7 +63,8 @@ async def get_sales_summary(
 @router.get("/top-products")
 async def get_top_products(
     limit: int = 10,
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    loader: ProductLoader = Depends(get_product_loader)
 ):
     """Get top selling products (Admin only)"""
     
@@ -89,24 +92,36 @@ async def get_top_products(
     sorted_products = sorted(product_sales.items(), key=lambda x: x[1], reverse=True)[:limit]
     
     # Get product details
+    products = await loader.load_many(product_id for product_id, _ in sorted_products)
     top_products = []
-    for product_id, quantity in sorted_products:
-        try:
-            product = await Product.get(PydanticObjectId(product_id))
-            if product:
-                top_products.append({
-                    "product_id": product_id,
-                    "product_name": product.name,
-                    "quantity_sold": quantity,
-                    "revenue": round(product_revenue.get(product_id, 0), 2),
-                    "current_stock": product.stock,
-                    "image": product.main_image
-                })
-        except:
-            continue
+    for (product_id, quantity), product in zip(sorted_products, products):
+        if product:
+            top_products.append({
+                "product_id": product_id,
+                "product_name": product.name,
+                "quantity_sold": quantity,
+                "revenue": round(product_revenue.get(product_id, 0), 2),
+                "current_stock": product.stock,
+                "image": product.main_image
+            })
     
     return {"top_products": top_products}
 
+@router.get("/products/{product_id}/purchases")
+async def get_product_purchases(
+    product_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Paid orders, units, buyers and revenue for one product (Admin only)"""
+    
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    return await product_purchase_summary(product_id)
+
 @router.get("/low-stock")
 async def get_low_stock_products(
     threshold: int = 10,
@@ -3,6 +3,8 @@ from pydantic import BaseModel
 from typing import List, Optional
 from app.models.banner import HeroBanner
 from app.services.auth import get_current_user
+from app.services.catalog import BANNERS, conditional_get, invalidate_banners
+from app.services.catalog_snapshot import catalog_snapshot
 
 router = APIRouter()
 
@@ -30,10 +32,13 @@ class BannerUpdate(BaseModel):
     is_active: Optional[bool] = None
 
 
-@router.get("/hero")
+@router.get("/hero", dependencies=[Depends(conditional_get(BANNERS))])
 async def get_hero_banners() -> List[dict]:
     """Get all active hero banners sorted by position"""
-    banners = await HeroBanner.find({"is_active": True}).sort([("position", 1)]).to_list()
+    if await catalog_snapshot.ensure_fresh():
+        banners = catalog_snapshot.active_banners()
+    else:
+        banners = await HeroBanner.find({"is_active": True}).sort([("position", 1)]).to_list()
     # Convert to dict with id field for frontend
     return [
         {
@@ -81,6 +86,7 @@ async def create_hero_banner(banner_data: BannerCreate, current_user = Depends(g
     
     banner = HeroBanner.model_construct(**banner_dict)
     await banner.insert()
+    await invalidate_banners()
     return banner
 
 
@@ -101,6 +107,7 @@ async def update_hero_banner(banner_id: str, banner_data: BannerUpdate, current_
     
     update_data = banner_data.dict(exclude_unset=True)
     await banner.update({"$set": update_data})
+    await invalidate_banners()
     return banner
 
 
@@ -119,4 +126,5 @@ async def delete_hero_banner(banner_id: str, current_user = Depends(get_current_
             detail="Banner not found"
         )
     await banner.delete()
+    await invalidate_banners()
     return {"message": "Banner deleted successfully"}
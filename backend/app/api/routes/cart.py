@@ -1,46 +1,52 @@
-from datetime import datetime
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from beanie import PydanticObjectId
 
 
-from app.models.cart import CartItem
+from app.models.cart import CartLine
 from app.models.product import Product
 from app.models.user import User
 from app.schemas.cart import AddToCart, UpdateCartItem, CartItemResponse, CartSummary
 from app.services.auth import get_current_active_user
+from app.services import cart as cart_service
 
 
 router = APIRouter()
 
 
+def line_response(line: CartLine) -> CartItemResponse:
+    return CartItemResponse(
+        id=line.id,
+        product_id=line.product_id,
+        product_name=line.product_name,
+        product_price=line.product_price,
+        quantity=line.quantity,
+        image_url=line.image_url,
+        subtotal=line.subtotal
+    )
+
+
 @router.get("/", response_model=CartSummary)
 async def get_cart(current_user: User = Depends(get_current_active_user)):
-    """Get user's cart with all items"""
-    
-    cart_items = await CartItem.find(
-        CartItem.user_id == str(current_user.id)
-    ).to_list()
-    
-    items_response = []
-    total_price = 0.0
-    
-    for item in cart_items:
-        item_response = CartItemResponse(
-            id=str(item.id),
-            product_id=item.product_id,
-            product_name=item.product_name,
-            product_price=item.product_price,
-            quantity=item.quantity,
-            image_url=item.image_url,
-            subtotal=item.subtotal
-        )
-        items_response.append(item_response)
-        total_price += item.subtotal
+    """Get user's cart, repriced and stock-checked against current products"""
+    
+    # One indexed fetch of the whole cart, one batched product lookup
+    cart = await cart_service.get_user_cart(str(current_user.id))
+    products = await cart_service.load_line_products(cart.items)
+    
+    items_response = [
+        CartItemResponse(**cart_service.reprice_line(line, products.get(line.product_id)))
+        for line in cart.items
+    ]
+    total_price = sum(item.subtotal for item in items_response)
     
     return CartSummary(
         items=items_response,
         total_items=len(items_response),
-        total_price=round(total_price, 2)
+        total_price=round(total_price, 2),
+        version=cart.version,
+        has_price_changes=any(item.price_changed for item in items_response),
+        has_stock_issues=any(item.out_of_stock for item in items_response)
     )
 
 
@@ -66,65 +72,26 @@ async def add_to_cart(
         )
     
     # Check stock
-    if product.stock < cart_item.quantity:
+    if product.available_stock < cart_item.quantity:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Only {product.stock} items available in stock"
+            detail=f"Only {product.available_stock} items available in stock"
         )
     
-    # Check if item already in cart
-    existing_item = await CartItem.find_one(
-        CartItem.user_id == str(current_user.id),
-        CartItem.product_id == cart_item.product_id
+    # Adds to an existing line (within stock) or pushes a new one, atomically
+    line = await cart_service.add_item(
+        str(current_user.id),
+        CartLine(
+            product_id=cart_item.product_id,
+            product_name=product.name,
+            product_price=product.final_price,
+            quantity=cart_item.quantity,
+            image_url=product.main_image
+        ),
+        max_quantity=product.available_stock
     )
     
-    if existing_item:
-        # Update quantity
-        new_quantity = existing_item.quantity + cart_item.quantity
-        
-        if product.stock < new_quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Cannot add {cart_item.quantity} more. Only {product.stock - existing_item.quantity} items available"
-            )
-        
-        existing_item.quantity = new_quantity
-        existing_item.updated_at = datetime.utcnow()
-        await existing_item.save()
-        
-        return CartItemResponse(
-            id=str(existing_item.id),
-            product_id=existing_item.product_id,
-            product_name=existing_item.product_name,
-            product_price=existing_item.product_price,
-            quantity=existing_item.quantity,
-            image_url=existing_item.image_url,
-            subtotal=existing_item.subtotal
-        )
-    
-    # Create new cart item
-    # Get main image (first image from images array, or None)
-    main_image = product.images[0] if product.images and len(product.images) > 0 else None
-    
-    new_cart_item = CartItem(
-        user_id=str(current_user.id),
-        product_id=cart_item.product_id,
-        product_name=product.name,
-        product_price=product.final_price,
-        quantity=cart_item.quantity,
-        image_url=main_image  # Fixed: use main_image from images array
-    )
-    await new_cart_item.insert()
-    
-    return CartItemResponse(
-        id=str(new_cart_item.id),
-        product_id=new_cart_item.product_id,
-        product_name=new_cart_item.product_name,
-        product_price=new_cart_item.product_price,
-        quantity=new_cart_item.quantity,
-        image_url=new_cart_item.image_url,
-        subtotal=new_cart_item.subtotal
-    )
+    return line_response(line)
 
 
 @router.put("/{item_id}", response_model=CartItemResponse)
@@ -135,34 +102,24 @@ async def update_cart_item(
 ):
     """Update cart item quantity (set to 0 to remove)"""
     
-    try:
-        cart_item = await CartItem.get(PydanticObjectId(item_id))
-        if not cart_item:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Cart item not found"
-            )
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid cart item ID"
-        )
-    
-    # Verify ownership
-    if cart_item.user_id != str(current_user.id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this cart item"
-        )
+    user_id = str(current_user.id)
     
     # If quantity is 0, delete the item
     if update_data.quantity == 0:
-        await cart_item.delete()
+        await cart_service.remove_line(user_id, item_id, update_data.version)
         raise HTTPException(
             status_code=status.HTTP_204_NO_CONTENT,
             detail="Item removed from cart"
         )
     
+    cart = await cart_service.get_user_cart(user_id)
+    cart_item = next((line for line in cart.items if line.id == item_id), None)
+    if not cart_item:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Cart item not found"
+        )
+    
     # Check product stock
     product = await Product.get(PydanticObjectId(cart_item.product_id))
     if not product:
@@ -171,66 +128,33 @@ async def update_cart_item(
             detail="Product no longer available"
         )
     
-    if product.stock < update_data.quantity:
+    if product.available_stock < update_data.quantity:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Only {product.stock} items available in stock"
+            detail=f"Only {product.available_stock} items available in stock"
         )
     
     # Update quantity
-    cart_item.quantity = update_data.quantity
-    cart_item.product_price = product.final_price
-    cart_item.updated_at = datetime.utcnow()
-    await cart_item.save()
-    
-    return CartItemResponse(
-        id=str(cart_item.id),
-        product_id=cart_item.product_id,
-        product_name=cart_item.product_name,
-        product_price=cart_item.product_price,
-        quantity=cart_item.quantity,
-        image_url=cart_item.image_url,
-        subtotal=cart_item.subtotal
+    line = await cart_service.set_line_quantity(
+        user_id, item_id, update_data.quantity, product.final_price, update_data.version
     )
+    
+    return line_response(line)
 
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_from_cart(
     item_id: str,
+    version: Optional[int] = None,
     current_user: User = Depends(get_current_active_user)
 ):
     """Remove item from cart"""
     
-    try:
-        cart_item = await CartItem.get(PydanticObjectId(item_id))
-        if not cart_item:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Cart item not found"
-            )
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid cart item ID"
-        )
-    
-    # Verify ownership
-    if cart_item.user_id != str(current_user.id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to remove this cart item"
-        )
-    
-    await cart_item.delete()
+    await cart_service.remove_line(str(current_user.id), item_id, version)
 
 
 @router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
 async def clear_cart(current_user: User = Depends(get_current_active_user)):
     """Clear all items from cart"""
     
-    cart_items = await CartItem.find(
-        CartItem.user_id == str(current_user.id)
-    ).to_list()
-    
-    for item in cart_items:
-        await item.delete()
+    await cart_service.clear_cart(str(current_user.id))
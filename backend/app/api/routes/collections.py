@@ -9,7 +9,13 @@ from app.models.collection import Collection
 from app.models.product import Product
 from app.models.user import User
 from app.services.auth import get_current_active_user
-from app.services.cache import cache_clear_pattern
+from app.services.catalog import (
+    CATALOG, COLLECTIONS, product_namespaces, invalidate_product, invalidate_products,
+    invalidate_collection, conditional_get
+)
+from app.services.catalog_snapshot import catalog_snapshot, after_cursor
+from app.services.pagination import cached_count, keyset_filter, next_cursor, sort_spec
+from app.services.pricing import save_product_fields
 
 router = APIRouter()
 
@@ -52,7 +58,7 @@ def slugify(text: str) -> str:
     return text
 
 
-def collection_to_dict(c: Collection) -> dict:
+def collection_to_dict(c: Collection, product_count: Optional[int] = None) -> dict:
     return {
         "id": str(c.id),
         "name": c.name,
@@ -67,7 +73,7 @@ def collection_to_dict(c: Collection) -> dict:
         "bg_pattern": c.bg_pattern,
         "is_active": c.is_active,
         "position": c.position,
-        "product_count": c.product_count,
+        "product_count": c.product_count if product_count is None else product_count,
         "created_at": c.created_at.isoformat() if c.created_at else None,
         "updated_at": c.updated_at.isoformat() if c.updated_at else None,
     }
@@ -75,9 +81,17 @@ def collection_to_dict(c: Collection) -> dict:
 
 # ==================== PUBLIC ROUTES ====================
 
-@router.get("/")
+@router.get("/", dependencies=[Depends(conditional_get(COLLECTIONS, CATALOG))])
 async def get_collections():
     """Get all active collections"""
+    if await catalog_snapshot.ensure_fresh():
+        return {
+            "collections": [
+                collection_to_dict(c, catalog_snapshot.collection_product_count(c.name))
+                for c in catalog_snapshot.active_collections()
+            ]
+        }
+
     collections = await Collection.find(
         Collection.is_active == True
     ).sort([("position", 1)]).to_list()
@@ -113,6 +127,12 @@ async def get_all_collections(current_user: User = Depends(get_current_active_us
 @router.get("/{collection_id}")
 async def get_collection(collection_id: str):
     """Get a single collection by ID"""
+    if await catalog_snapshot.ensure_fresh():
+        collection = catalog_snapshot.get_collection(collection_id)
+        if not collection:
+            raise HTTPException(status_code=404, detail="Collection not found")
+        return collection_to_dict(collection, catalog_snapshot.collection_product_count(collection.name))
+
     try:
         collection = await Collection.get(PydanticObjectId(collection_id))
         if not collection:
@@ -135,24 +155,52 @@ async def get_collection_products(
     limit: int = 50,
     sort_by: str = "created_at",
     sort_order: str = "desc",
+    cursor: Optional[str] = None,  # next_cursor from the previous page; replaces skip
+    include_total: bool = True,
 ):
     """Get products in a collection"""
-    try:
-        collection = await Collection.get(PydanticObjectId(collection_id))
+    if sort_by == "price":
+        sort_by = "final_price"
+    if sort_by not in Product.model_fields:
+        sort_by = "created_at"
+    descending = sort_order != "asc"
+
+    if await catalog_snapshot.ensure_fresh():
+        collection = catalog_snapshot.get_collection(collection_id)
         if not collection:
             raise HTTPException(status_code=404, detail="Collection not found")
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid collection ID")
 
-    query = Product.find({"tags": collection.name, "is_active": True})
-    sort_field = getattr(Product, sort_by, Product.created_at)
-    if sort_order == "asc":
-        query = query.sort(+sort_field)
+        matches = catalog_snapshot.list_products(
+            tags=[collection.name], sort_by=sort_by, sort_order=sort_order
+        )
+        remaining = after_cursor(matches, sort_by, descending, cursor) if cursor else matches[skip:]
+        products, next_page = next_cursor(remaining[:limit + 1], limit, sort_by)
+        total = len(matches) if include_total else None
     else:
-        query = query.sort(-sort_field)
-
-    products = await query.skip(skip).limit(limit).to_list()
-    total = await Product.find({"tags": collection.name, "is_active": True}).count()
+        try:
+            collection = await Collection.get(PydanticObjectId(collection_id))
+            if not collection:
+                raise HTTPException(status_code=404, detail="Collection not found")
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid collection ID")
+
+        def build_query():
+            return Product.find({"tags": collection.name, "is_active": True})
+
+        query = build_query()
+        if cursor:
+            query = query.find(keyset_filter(sort_by, descending, cursor))
+        else:
+            query = query.skip(skip)
+
+        products = await query.sort(sort_spec(sort_by, descending)).limit(limit + 1).to_list()
+        products, next_page = next_cursor(products, limit, sort_by)
+
+        total = None
+        if include_total:
+            total = await cached_count(
+                "collection-products", [f"collection:{collection.name}"], build_query().count, collection.name
+            )
 
     return {
         "collection": collection_to_dict(collection),
@@ -182,6 +230,8 @@ async def get_collection_products(
             for p in products
         ],
         "total": total,
+        "has_more": next_page is not None,
+        "next_cursor": next_page,
     }
 
 
@@ -216,7 +266,7 @@ async def create_collection(
         position=data.position or 0,
     )
     await collection.insert()
-    cache_clear_pattern("products:*")
+    await invalidate_collection(collection.name)
     return collection_to_dict(collection)
 
 
@@ -239,14 +289,16 @@ async def update_collection(
 
     old_name = collection.name
     update_data = data.dict(exclude_unset=True)
+    renamed_products = []
 
     if "name" in update_data and update_data["name"] != old_name:
+        renamed_products = await Product.find({"tags": old_name}).to_list()
         # Rename the tag on all products
         update_data["slug"] = slugify(update_data["name"])
         product_collection = Product.get_motor_collection()
         await product_collection.update_many(
             {"tags": old_name},
-            {"$set": {"tags.$[elem]": update_data["name"]}},
+            {"$set": {"tags.$[elem]": update_data["name"], "updated_at": datetime.now(timezone.utc)}},
             array_filters=[{"elem": old_name}],
         )
 
@@ -255,7 +307,9 @@ async def update_collection(
     collection.updated_at = datetime.now(timezone.utc)
     await collection.save()
 
-    cache_clear_pattern("products:*")
+    # Renamed tags show up in every listing those products appear in
+    await invalidate_products(renamed_products, [f"collection:{collection.name}"])
+    await invalidate_collection(old_name, collection.name)
     return collection_to_dict(collection)
 
 
@@ -276,7 +330,7 @@ async def delete_collection(
         raise HTTPException(status_code=400, detail="Invalid collection ID")
 
     await collection.delete()
-    cache_clear_pattern("products:*")
+    await invalidate_collection(collection.name)
     return {"message": f"Collection '{collection.name}' deleted successfully"}
 
 
@@ -306,6 +360,7 @@ async def add_product_to_collection(
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid product ID")
 
+    previous_namespaces = product_namespaces(product)
     tags_to_add = []
     if collection.name not in product.tags:
         tags_to_add.append(collection.name)
@@ -314,10 +369,10 @@ async def add_product_to_collection(
 
     if tags_to_add:
         product.tags.extend(tags_to_add)
-        product.updated_at = datetime.now(timezone.utc)
-        await product.save()
+        product = await save_product_fields(product, "tags")
 
-    cache_clear_pattern("products:*")
+    await invalidate_product(product, previous_namespaces)
+    await invalidate_collection(collection.name)
     return {"success": True, "message": f"Product added to {collection.name}"}
 
 
@@ -345,6 +400,7 @@ async def remove_product_from_collection(
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid product ID")
 
+    previous_namespaces = product_namespaces(product)
     if collection.name in product.tags:
         product.tags.remove(collection.name)
 
@@ -356,10 +412,10 @@ async def remove_product_from_collection(
     if not has_other_edition and "Special Edition" in product.tags:
         product.tags.remove("Special Edition")
 
-    product.updated_at = datetime.now(timezone.utc)
-    await product.save()
+    product = await save_product_fields(product, "tags")
 
-    cache_clear_pattern("products:*")
+    await invalidate_product(product, previous_namespaces)
+    await invalidate_collection(collection.name)
     return {"success": True, "message": f"Product removed from {collection.name}"}
 
 
@@ -1,12 +1,11 @@
-from typing import List
+import re
+from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from beanie import PydanticObjectId
 from fastapi.responses import StreamingResponse
 from app.services.invoice import generate_invoice_pdf
 from app.models.order import Order, OrderItem
-from app.models.cart import CartItem
-from app.models.product import Product
 from app.models.user import User
 from app.schemas.order import (
     CreateOrder, OrderResponse, OrderSummary, 
@@ -16,20 +15,34 @@ from app.services.auth import get_current_active_user
 from app.services.order import generate_order_number, calculate_order_totals
 from app.services.email import send_email, send_order_confirmation_email, send_order_shipped_email, send_order_delivered_email
 from app.services.notification import notify_order_status_change
+from app.services.fieldsets import (
+    ORDER_FIELD_PRESETS, ORDER_FIELD_SOURCES, order_projection, parse_fields, serialize_order_doc
+)
+from app.services.serializers import json_response, serialize_products
+from app.services.pagination import keyset_filter, next_cursor, sort_spec
+from app.services.purchases import purchased_product_ids
+from app.services.cart import get_user_cart, remove_lines
+from app.services.product_loader import ProductLoader, get_product_loader
+from app.services.inventory import (
+    decrement_stock, place_holds, release_holds, restore_stock, stock_quantities
+)
 
 router = APIRouter()
 
+# Users an admin customer search may expand to
+MAX_CUSTOMER_MATCHES = 100
+
 @router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 async def create_order(
     order_data: CreateOrder,
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    loader: ProductLoader = Depends(get_product_loader)
 ):
     """Place order from cart with coupon and dynamic shipping"""
     
     # Get cart items
-    cart_items = await CartItem.find(
-        CartItem.user_id == str(current_user.id)
-    ).to_list()
+    cart = await get_user_cart(str(current_user.id))
+    cart_items = cart.items
     
     if not cart_items:
         raise HTTPException(
@@ -41,20 +54,20 @@ async def create_order(
     order_items = []
     subtotal = 0.0
     
-    for cart_item in cart_items:
-        # Get current product
-        product = await Product.get(PydanticObjectId(cart_item.product_id))
-        
+    # All cart products in one query
+    products = await loader.load_many(cart_item.product_id for cart_item in cart_items)
+    
+    for cart_item, product in zip(cart_items, products):
         if not product:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Product {cart_item.product_name} no longer available"
             )
         
-        if product.stock < cart_item.quantity:
+        if product.available_stock < cart_item.quantity:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient stock for {product.name}. Only {product.stock} available"
+                detail=f"Insufficient stock for {product.name}. Only {product.available_stock} available"
             )
         
         # Create order item (UPDATED: use main_image and final_price)
@@ -135,7 +148,7 @@ async def create_order(
     total_amount = round(subtotal - discount_amount + shipping_cost + platform_fee, 2)
     
     # Generate order number
-    order_number = generate_order_number()
+    order_number = await generate_order_number()
     
     # Determine payment status based on payment method (ADDED)
     payment_status = "pending"
@@ -148,6 +161,21 @@ async def create_order(
         payment_status = "pending"
         order_status = "pending"
     
+    # COD takes stock now; online payments hold it until captured (or the
+    # hold expires). Either way one conditional bulk write, all-or-nothing,
+    # so concurrent checkouts cannot oversell
+    quantities = stock_quantities(cart_items)
+    if order_data.payment_method == "cod":
+        failed = await decrement_stock(quantities)
+    else:
+        failed = await place_holds(order_number, quantities)
+    if failed:
+        names = ", ".join(item.product_name for item in order_items if item.product_id in failed)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Insufficient stock for {names or 'some items'}. Please review your cart"
+        )
+    
     # Create order
     order = Order(
         user_id=str(current_user.id),
@@ -166,30 +194,31 @@ async def create_order(
         shipping_zone=shipping_zone,
         estimated_delivery=estimated_delivery
     )
-    await order.insert()
+    try:
+        await order.insert()
+    except Exception:
+        if order_data.payment_method == "cod":
+            await restore_stock(quantities)
+        else:
+            await release_holds(order_number)
+        raise
     
     # Mark coupon as used only for COD (for Razorpay, coupon is marked after payment verification)
     if coupon_code and order_data.payment_method == "cod":
         from app.services.coupon import mark_coupon_used
         await mark_coupon_used(coupon_code, str(current_user.id))
     
-    # For COD orders - update stock immediately (ADDED)
+    # For COD orders stock was taken above
     if order_data.payment_method == "cod":
-        for cart_item in cart_items:
-            product = await Product.get(PydanticObjectId(cart_item.product_id))
-            product.stock -= cart_item.quantity
-            await product.save()
-        
         # Clear cart for COD orders
-        for cart_item in cart_items:
-            await cart_item.delete()
+        await remove_lines(str(current_user.id), [cart_item.id for cart_item in cart_items])
         
         # Send order confirmation email for COD
         user = await User.get(PydanticObjectId(current_user.id))
         if user:
             await send_order_confirmation_email(user.email, order)
     
-    # For Razorpay orders - stock will be updated after payment verification
+    # For Razorpay orders - held stock is converted after payment verification
     # Cart will be cleared after payment
     
     return OrderResponse(
@@ -220,34 +249,85 @@ async def create_order(
         created_at=order.created_at
     )
 
-@router.get("/", response_model=List[OrderSummary])
-async def get_my_orders(current_user: User = Depends(get_current_active_user)):
-    """Get user's order history"""
-    
-    orders = await Order.find(
-        Order.user_id == str(current_user.id)
-    ).sort(-Order.created_at).to_list()
-    
-    return [
-        OrderSummary(
-            id=str(order.id),
-            order_number=order.order_number,
-            total_amount=order.total_amount,
-            status=order.status,
-            payment_status=order.payment_status,
-            created_at=order.created_at,
-            items_count=len(order.items)
-        )
-        for order in orders
+async def _order_page(query: dict, fields: Optional[str], limit: int, cursor: Optional[str]):
+    """One keyset page of orders, newest first, with only the requested fields loaded"""
+    field_list = parse_fields(fields, ORDER_FIELD_SOURCES, ORDER_FIELD_PRESETS) or ORDER_FIELD_PRESETS["summary"]
+    if cursor:
+        query = {"$and": [query, keyset_filter("created_at", True, cursor)]}
+    docs = await Order.get_motor_collection().find(
+        query, order_projection(field_list, extra=("created_at", "user_id"))
+    ).sort(sort_spec("created_at", True)).limit(limit + 1).to_list(length=limit + 1)
+    docs, next_page = next_cursor(docs, limit, "created_at")
+    return docs, field_list, next_page
+
+@router.get("/")
+async def get_my_orders(
+    current_user: User = Depends(get_current_active_user),
+    fields: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Get user's order history, newest first (cursor paginated)"""
+    
+    # Summary fields by default; only the projected fields leave MongoDB
+    query = {"user_id": str(current_user.id)}
+    if status_filter:
+        query["status"] = status_filter
+    docs, field_list, next_page = await _order_page(query, fields, limit, cursor)
+    
+    return json_response({
+        "orders": [serialize_order_doc(doc, field_list) for doc in docs],
+        "has_more": next_page is not None,
+        "next_cursor": next_page
+    })
+
+@router.get("/buy-again")
+async def get_buy_again(
+    limit: int = 12,
+    current_user: User = Depends(get_current_active_user),
+    loader: ProductLoader = Depends(get_product_loader)
+):
+    """Products from the user's delivered orders that can be ordered again"""
+    
+    product_ids = await purchased_product_ids(str(current_user.id), limit)
+    products = [
+        product for product in await loader.load_many(product_ids)
+        if product and product.is_active
     ]
+    return json_response({"products": serialize_products(products)})
 
 @router.get("/{order_id}", response_model=OrderResponse)
 async def get_order_details(
     order_id: str,
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    fields: Optional[str] = None
 ):
     """Get order details"""
     
+    field_list = parse_fields(fields, ORDER_FIELD_SOURCES, ORDER_FIELD_PRESETS)
+    if field_list is not None:
+        try:
+            doc = await Order.get_motor_collection().find_one(
+                {"_id": PydanticObjectId(order_id)}, order_projection(field_list, extra=("user_id",))
+            )
+        except Exception:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid order ID"
+            )
+        if not doc:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Order not found"
+            )
+        if doc.get("user_id") != str(current_user.id) and not current_user.is_superuser:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to view this order"
+            )
+        return json_response(serialize_order_doc(doc, field_list))
+    
     try:
         order = await Order.get(PydanticObjectId(order_id))
         if not order:
@@ -328,17 +408,26 @@ async def cancel_order(
             detail=f"Cannot cancel order with status: {order.status}"
         )
     
-    # Restore stock
-    for item in order.items:
-        product = await Product.get(PydanticObjectId(item.product_id))
-        if product:
-            product.stock += item.quantity
-            await product.save()
-    
-    # Update order status
+    # Update order status atomically so concurrent cancels restock only once
+    now = datetime.utcnow()
+    cancelled = await Order.get_motor_collection().find_one_and_update(
+        {"_id": order.id, "status": {"$in": ["pending", "processing"]}},
+        {"$set": {"status": "cancelled", "updated_at": now}}
+    )
+    if not cancelled:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Order status changed; please refresh"
+        )
     order.status = "cancelled"
-    order.updated_at = datetime.utcnow()
-    await order.save()
+    order.updated_at = now
+    
+    # Restore stock that was actually taken (COD at checkout, prepaid once
+    # paid); an unpaid order only gives back its holds
+    if cancelled.get("payment_status") in ["cod", "paid"]:
+        await restore_stock(stock_quantities(order.items))
+    else:
+        await release_holds(order.order_number)
     
     return OrderResponse(
         id=str(order.id),
@@ -367,9 +456,20 @@ async def cancel_order(
     )
 
 # Admin routes
-@router.get("/admin/all", response_model=List[OrderSummary])
-async def get_all_orders(current_user: User = Depends(get_current_active_user)):
-    """Admin: Get all orders"""
+@router.get("/admin/all")
+async def get_all_orders(
+    current_user: User = Depends(get_current_active_user),
+    fields: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    payment_status: Optional[str] = None,
+    date_from: Optional[datetime] = None,  # created_at >= date_from
+    date_to: Optional[datetime] = None,  # created_at < date_to
+    order_number: Optional[str] = None,  # Prefix, e.g. ORD261017
+    customer: Optional[str] = None,  # Email prefix or user ID
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None
+):
+    """Admin: Search orders, newest first (cursor paginated)"""
     
     if not current_user.is_superuser:
         raise HTTPException(
@@ -377,20 +477,59 @@ async def get_all_orders(current_user: User = Depends(get_current_active_user)):
             detail="Admin access required"
         )
     
-    orders = await Order.find_all().sort(-Order.created_at).to_list()
-    
-    return [
-        OrderSummary(
-            id=str(order.id),
-            order_number=order.order_number,
-            total_amount=order.total_amount,
-            status=order.status,
-            payment_status=order.payment_status,
-            created_at=order.created_at,
-            items_count=len(order.items)
-        )
-        for order in orders
-    ]
+    # Every filter is served by a (filter, created_at, _id) index or the
+    # unique order_number index
+    query = {}
+    if status_filter:
+        query["status"] = status_filter
+    if payment_status:
+        query["payment_status"] = payment_status
+    if date_from or date_to:
+        query["created_at"] = {}
+        if date_from:
+            query["created_at"]["$gte"] = date_from
+        if date_to:
+            query["created_at"]["$lt"] = date_to
+    if order_number:
+        query["order_number"] = {"$regex": f"^{re.escape(order_number.strip().upper())}"}
+    if customer:
+        customer = customer.strip()
+        user_ids = []
+        try:
+            user_ids.append(str(PydanticObjectId(customer)))
+        except Exception:
+            pass
+        users = await User.get_motor_collection().find(
+            {"email": {"$regex": f"^{re.escape(customer.lower())}"}}, {"_id": 1}
+        ).limit(MAX_CUSTOMER_MATCHES).to_list(length=MAX_CUSTOMER_MATCHES)
+        user_ids.extend(str(user["_id"]) for user in users)
+        query["user_id"] = {"$in": user_ids}
+    
+    docs, field_list, next_page = await _order_page(query, fields, limit, cursor)
+    
+    # Customer emails for this page only, in one query
+    user_object_ids = []
+    for user_id in {doc.get("user_id") for doc in docs}:
+        try:
+            user_object_ids.append(PydanticObjectId(user_id))
+        except Exception:
+            continue
+    emails = {
+        str(user["_id"]): user.get("email")
+        async for user in User.get_motor_collection().find({"_id": {"$in": user_object_ids}}, {"email": 1})
+    }
+    
+    orders = []
+    for doc in docs:
+        order = serialize_order_doc(doc, field_list)
+        order["user_email"] = emails.get(doc.get("user_id"))
+        orders.append(order)
+    
+    return json_response({
+        "orders": orders,
+        "has_more": next_page is not None,
+        "next_cursor": next_page
+    })
 
 
 
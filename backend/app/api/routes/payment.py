@@ -5,8 +5,7 @@ from typing import Optional
 
 from app.models.order import Order
 from app.models.user import User
-from app.models.product import Product
-from app.models.cart import CartItem
+from app.services.cart import remove_products
 from app.schemas.payment import CreateRazorpayOrder, VerifyPayment, RazorpayOrderResponse
 from app.services.auth import get_current_active_user
 from app.services.razorpay_service import (
@@ -17,6 +16,7 @@ from app.services.razorpay_service import (
     create_refund
 )
 from app.services.email import send_email
+from app.services.inventory import convert_holds, stock_quantities
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
@@ -196,24 +196,18 @@ async def verify_payment(
     # Reload order after atomic update
     order = await Order.get(order.id)
     
-    # Update product stock atomically
-    product_collection = Product.get_motor_collection()
-    for order_item in order.items:
-        try:
-            await product_collection.update_one(
-                {"_id": PydanticObjectId(order_item.product_id), "stock": {"$gte": order_item.quantity}},
-                {"$inc": {"stock": -order_item.quantity, "sales_count": order_item.quantity}}
-            )
-        except Exception as e:
-            print(f"Error updating stock for product {order_item.product_id}: {e}")
+    # Convert the checkout holds into sales (lines whose hold expired take
+    # stock directly; the order is already paid)
+    try:
+        oversold = await convert_holds(order.order_number, stock_quantities(order.items))
+        if oversold:
+            print(f"⚠️ Paid order {order.order_number} oversold products: {', '.join(oversold)}")
+    except Exception as e:
+        print(f"Error updating stock for order {order.order_number}: {e}")
     
     # Clear user's cart
     try:
-        cart_items = await CartItem.find(
-            CartItem.user_id == str(current_user.id)
-        ).to_list()
-        for cart_item in cart_items:
-            await cart_item.delete()
+        await remove_products(str(current_user.id), [item.product_id for item in order.items])
     except Exception as e:
         print(f"Error clearing cart: {e}")
     
@@ -281,23 +275,16 @@ async def razorpay_webhook(
             
             if result:
                 # We won the race - do stock/cart/email/coupon
-                product_collection = Product.get_motor_collection()
-                for order_item in order.items:
-                    try:
-                        await product_collection.update_one(
-                            {"_id": PydanticObjectId(order_item.product_id), "stock": {"$gte": order_item.quantity}},
-                            {"$inc": {"stock": -order_item.quantity, "sales_count": order_item.quantity}}
-                        )
-                    except Exception as e:
-                        print(f"Webhook: Error updating stock for {order_item.product_id}: {e}")
+                try:
+                    oversold = await convert_holds(order.order_number, stock_quantities(order.items))
+                    if oversold:
+                        print(f"⚠️ Webhook: paid order {order.order_number} oversold products: {', '.join(oversold)}")
+                except Exception as e:
+                    print(f"Webhook: Error updating stock for {order.order_number}: {e}")
             
                 # Clear user's cart
                 try:
-                    cart_items = await CartItem.find(
-                        CartItem.user_id == order.user_id
-                    ).to_list()
-                    for cart_item in cart_items:
-                        await cart_item.delete()
+                    await remove_products(order.user_id, [item.product_id for item in order.items])
                 except Exception as e:
                     print(f"Webhook: Error clearing cart: {e}")
                 
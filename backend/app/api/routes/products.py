@@ -1,5 +1,5 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Response
 from beanie import PydanticObjectId
 from datetime import datetime
 import csv
@@ -12,33 +12,69 @@ from app.models.tracking import RecentlyViewed
 from app.schemas.product import ProductResponse
 from app.services.auth import get_current_active_user
 from app.services.cloudinary import upload_image
-from app.services.cache import cache_get, cache_set, cache_clear_pattern
+from app.services.cache import get_or_set, versioned_key
+from app.services.catalog import (
+    CATALOG, listing_namespaces, product_namespaces, invalidate_product, invalidate_products,
+    check_not_modified, conditional_get, is_collection_tag
+)
+from app.services.catalog_snapshot import catalog_snapshot, after_cursor
+from app.services.pagination import cached_count, keyset_filter, next_cursor, sort_spec
+from app.services.facets import faceted_search, normalize_filters
+from app.services.flash_sale import flash_sale
+from app.services.pricing import save_product_fields
+from app.services.serializers import json_response, serialize_product, serialize_products
+from app.services.view_counter import view_counter
+from app.services.product_loader import ProductLoader, get_product_loader
+from app.services.fieldsets import PRODUCT_FIELD_PRESETS, PRODUCT_FIELD_SOURCES, find_products, parse_fields
 
 router = APIRouter()
 
+MAX_BATCH_IDS = 50
+
+
+async def listing_conditional_get(request: Request, response: Response):
+    """304 for a product listing whose filter namespaces haven't changed"""
+    params = request.query_params
+    namespaces = listing_namespaces(
+        category=params.get("category"),
+        brand=params.get("brand"),
+        tag=params.get("tag"),
+        collection=params.get("collection"),
+    )
+    await check_not_modified(request, response, namespaces)
+
 # ==================== PUBLIC ROUTES ====================
 
-@router.get("/trending", response_model=List[ProductResponse])
-async def get_trending_products(limit: int = 100):
+@router.get("/trending", response_model=List[ProductResponse], dependencies=[Depends(conditional_get(CATALOG))])
+async def get_trending_products(response: Response, limit: int = 100, fields: Optional[str] = None):
     """Get trending products (bestsellers)"""
-    products = await Product.find(
-        Product.is_active == True
-    ).sort([("sales_count", -1)]).limit(limit).to_list()
+    field_list = parse_fields(fields, PRODUCT_FIELD_SOURCES, PRODUCT_FIELD_PRESETS)
+    if await catalog_snapshot.ensure_fresh():
+        products = catalog_snapshot.trending(limit)
+    else:
+        products = await find_products(
+            Product.find(Product.is_active == True), field_list,
+            sort=[("sales_count", -1)], limit=limit
+        )
     
-    return [ProductResponse(**product.dict()) for product in products]
+    return json_response(serialize_products(products, field_list), response)
 
-@router.get("/collections")
+@router.get("/collections", dependencies=[Depends(conditional_get(CATALOG))])
 async def get_collections():
     """Get all unique collection tags (Special Edition collections)"""
-    collection = Product.get_motor_collection()
-    # Get distinct tags that represent special edition collections
-    all_tags = await collection.distinct("tags", {"is_active": True, "tags": {"$exists": True, "$ne": []}})
+    if await catalog_snapshot.ensure_fresh():
+        all_tags = catalog_snapshot.tags()
+    else:
+        collection = Product.get_motor_collection()
+        # Get distinct tags that represent special edition collections
+        all_tags = await collection.distinct("tags", {"is_active": True, "tags": {"$exists": True, "$ne": []}})
     # Filter to only collection-style tags (e.g., 'Harry Potter Edition', 'Marvel Edition')
-    collections = sorted([t for t in all_tags if 'Edition' in t or 'Collection' in t or 'Special' in t])
+    collections = sorted([t for t in all_tags if is_collection_tag(t)])
     return {"collections": collections}
 
-@router.get("/", response_model=dict)
+@router.get("/", response_model=dict, dependencies=[Depends(listing_conditional_get)])
 async def get_products(
+    response: Response,
     skip: int = 0,
     limit: int = 20,
     category: Optional[str] = None,
@@ -48,278 +84,307 @@ async def get_products(
     search: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
+    in_stock: Optional[bool] = None,
     sort_by: Optional[str] = "created_at",  # created_at, price, name, sales_count
-    sort_order: Optional[str] = "desc"  # asc, desc
+    sort_order: Optional[str] = "desc",  # asc, desc
+    cursor: Optional[str] = None,  # next_cursor from the previous page; replaces skip
+    include_total: bool = True,
+    fields: Optional[str] = None  # e.g. "card" or "id,name,final_price,main_image"
 ):
     """Get all products with filters, search, and caching"""
     
-    # Create cache key
-    cache_key = f"products:{skip}:{limit}:{category}:{brand}:{tag}:{collection}:{search}:{min_price}:{max_price}:{sort_by}:{sort_order}"
-    
-    # Try to get from cache
-    cached_data = cache_get(cache_key)
-    if cached_data:
-        return cached_data
-    
-    # Build query
-    query = Product.find(Product.is_active == True)
-    
-    # Filters
-    if category:
-        query = query.find(Product.category == category)
-    if brand:
-        query = query.find(Product.brand == brand)
-    if tag:
-        query = query.find({"tags": tag})
-    if collection:
-        query = query.find({"tags": collection})
-    if search:
-        query = query.find({"$text": {"$search": search}})
-    if min_price is not None:
-        query = query.find(Product.price >= min_price)
-    if max_price is not None:
-        query = query.find(Product.price <= max_price)
-    
-    # Sorting
-    sort_field = getattr(Product, sort_by, Product.created_at)
-    if sort_order == "asc":
-        query = query.sort(+sort_field)
-    else:
-        query = query.sort(-sort_field)
-    
-    # Pagination
-    products = await query.skip(skip).limit(limit).to_list()
-    total = await query.count()
-    
-    result = {
-        "products": [
-            ProductResponse(
-                id=str(product.id),
-                name=product.name,
-                description=product.description,
-                price=product.price,
-                final_price=product.final_price,
-                savings=product.savings,
-                savings_percentage=product.savings_percentage,
-                discount_active=product.discount_active,
-                discount_percentage=product.discount_percentage,
-                discount_amount=product.discount_amount,
-                discount_starts_at=product.discount_starts_at,
-                discount_ends_at=product.discount_ends_at,
-                category=product.category,
-                brand=product.brand,
-                images=product.images,
-                main_image=product.main_image,
-                stock=product.stock,
-                total_stock=product.total_stock,
-                is_in_stock=product.is_in_stock,
-                has_variants=product.has_variants,
-                variants=product.variants,
-                related_product_ids=product.related_product_ids,
-                is_active=product.is_active,
-                is_featured=product.is_featured,
-                tags=product.tags,
-                views_count=product.views_count,
-                sales_count=product.sales_count,
-                slug=product.slug,
-                created_at=product.created_at,
-                updated_at=product.updated_at
-            ).dict()
-            for product in products
-        ],
-        "total": total,
-        "skip": skip,
-        "limit": limit,
-        "has_more": total > skip + limit
-    }
+    field_list = parse_fields(fields, PRODUCT_FIELD_SOURCES, PRODUCT_FIELD_PRESETS)
+    namespaces = listing_namespaces(category=category, brand=brand, tag=tag, collection=collection)
+    filters = (category, brand, tag, collection, search, min_price, max_price, in_stock)
     
-    # Cache for 5 minutes
-    cache_set(cache_key, result, expire=300)
+    # Create cache key
+    cache_key = await versioned_key(
+        "products", namespaces,
+        skip, limit, *filters, sort_by, sort_order, cursor, include_total, field_list
+    )
     
-    return result
+    # Price filters and sorting use the sell price, not the list price
+    if sort_by == "price":
+        sort_by = "final_price"
+    if sort_by not in Product.model_fields:
+        sort_by = "created_at"
+    descending = sort_order != "asc"
+    
+    def build_query():
+        query = Product.find(Product.is_active == True)
+    
+        # Filters
+        if category:
+            query = query.find(Product.category == category)
+        if brand:
+            query = query.find(Product.brand == brand)
+        if tag:
+            query = query.find({"tags": tag})
+        if collection:
+            query = query.find({"tags": collection})
+        if search:
+            query = query.find({"$text": {"$search": search}})
+        if min_price is not None:
+            query = query.find(Product.final_price >= min_price)
+        if max_price is not None:
+            query = query.find(Product.final_price <= max_price)
+        if in_stock is not None:
+            query = query.find(Product.is_in_stock == in_stock)
+        return query
+    
+    async def query_products():
+        query = build_query()
+        if cursor:
+            query = query.find(keyset_filter(sort_by, descending, cursor))
+    
+        # One extra row tells us whether another page exists; the sort field
+        # is always loaded so the next cursor can be built
+        products = await find_products(
+            query, field_list, sort=sort_spec(sort_by, descending),
+            skip=0 if cursor else skip, limit=limit + 1, extra=(sort_by,)
+        )
+        page, next_page = next_cursor(products, limit, sort_by)
+    
+        total = None
+        if include_total:
+            total = await cached_count("products", namespaces, build_query().count, *filters)
+        return page, next_page, total
+    
+    async def build_result():
+        # Text search needs Mongo's $text index; everything else can be
+        # answered from the in-process snapshot
+        if not search and await catalog_snapshot.ensure_fresh():
+            matches = catalog_snapshot.list_products(
+                category=category,
+                brand=brand,
+                tags=(tag, collection),
+                min_price=min_price,
+                max_price=max_price,
+                in_stock=in_stock,
+                sort_by=sort_by,
+                sort_order=sort_order,
+            )
+            remaining = after_cursor(matches, sort_by, descending, cursor) if cursor else matches[skip:]
+            products, next_page = next_cursor(remaining[:limit + 1], limit, sort_by)
+            total = len(matches) if include_total else None
+        else:
+            products, next_page, total = await query_products()
+    
+        result = {
+            "products": serialize_products(products, field_list),
+            "total": total,
+            "skip": skip,
+            "limit": limit,
+            "has_more": next_page is not None,
+            "next_cursor": next_page
+        }
+        return result
+    
+    # Cache for 5 minutes; concurrent misses share one build
+    return json_response(await get_or_set(cache_key, build_result, expire=300), response)
 
-@router.get("/featured", response_model=List[ProductResponse])
-async def get_featured_products(limit: int = 8):
+@router.get("/featured", response_model=List[ProductResponse], dependencies=[Depends(conditional_get(CATALOG))])
+async def get_featured_products(response: Response, limit: int = 8, fields: Optional[str] = None):
     """Get featured products"""
     
-    products = await Product.find(
-        Product.is_active == True,
-        Product.is_featured == True
-    ).limit(limit).to_list()
-    
-    return [
-        ProductResponse(
-            id=str(product.id),
-            name=product.name,
-            description=product.description,
-            price=product.price,
-            final_price=product.final_price,
-            savings=product.savings,
-            savings_percentage=product.savings_percentage,
-            discount_active=product.discount_active,
-            discount_percentage=product.discount_percentage,
-            discount_amount=product.discount_amount,
-            discount_starts_at=product.discount_starts_at,
-            discount_ends_at=product.discount_ends_at,
-            category=product.category,
-            brand=product.brand,
-            images=product.images,
-            main_image=product.main_image,
-            stock=product.stock,
-            total_stock=product.total_stock,
-            is_in_stock=product.is_in_stock,
-            has_variants=product.has_variants,
-            variants=product.variants,
-            related_product_ids=product.related_product_ids,
-            is_active=product.is_active,
-            is_featured=product.is_featured,
-            tags=product.tags,
-            views_count=product.views_count,
-            sales_count=product.sales_count,
-            slug=product.slug,
-            created_at=product.created_at,
-            updated_at=product.updated_at
+    field_list = parse_fields(fields, PRODUCT_FIELD_SOURCES, PRODUCT_FIELD_PRESETS)
+    if await catalog_snapshot.ensure_fresh():
+        products = catalog_snapshot.featured(limit)
+    else:
+        products = await find_products(
+            Product.find(Product.is_active == True, Product.is_featured == True), field_list, limit=limit
         )
-        for product in products
-    ]
+    
+    return json_response(serialize_products(products, field_list), response)
 
-@router.get("/categories")
+@router.get("/categories", dependencies=[Depends(conditional_get(CATALOG))])
 async def get_categories():
     """Get all product categories"""
     
+    if await catalog_snapshot.ensure_fresh():
+        return {"categories": catalog_snapshot.categories()}
+    
     collection = Product.get_motor_collection()
     categories = await collection.distinct("category", {"is_active": True, "category": {"$ne": None}})
     
     return {"categories": sorted(categories)}
 
-@router.get("/brands")
+@router.get("/brands", dependencies=[Depends(conditional_get(CATALOG))])
 async def get_brands():
     """Get all product brands"""
     
+    if await catalog_snapshot.ensure_fresh():
+        return {"brands": catalog_snapshot.brands()}
+    
     collection = Product.get_motor_collection()
     brands = await collection.distinct("brand", {"is_active": True, "brand": {"$ne": None}})
     
     return {"brands": sorted(brands)}
 
+@router.get("/facets", response_model=dict, dependencies=[Depends(conditional_get(CATALOG))])
+async def get_product_facets(
+    response: Response,
+    skip: int = 0,
+    limit: int = 20,
+    category: Optional[str] = None,
+    brand: Optional[str] = None,
+    tag: Optional[str] = None,
+    collection: Optional[str] = None,
+    search: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: Optional[bool] = None,
+    sort_by: Optional[str] = "created_at",
+    sort_order: Optional[str] = "desc"
+):
+    """Search products and get filter-aware facet counts in one call"""
+    
+    filters = normalize_filters(
+        category=category, brand=brand, tag=tag, collection=collection, search=search,
+        min_price=min_price, max_price=max_price, in_stock=in_stock
+    )
+    if sort_by == "price":
+        sort_by = "final_price"
+    if sort_by not in Product.model_fields:
+        sort_by = "created_at"
+    descending = sort_order != "asc"
+    
+    # Facets for one dimension ignore that dimension's filter, so any
+    # catalog write can change them
+    cache_key = await versioned_key(
+        "facets", [CATALOG], skip, limit, *filters.values(), sort_by, descending
+    )
+    
+    async def build_result():
+        products, total, facets = await faceted_search(filters, sort_by, descending, skip, limit)
+        return {
+            "products": serialize_products(products),
+            "total": total,
+            "skip": skip,
+            "limit": limit,
+            "has_more": total > skip + limit,
+            "facets": facets
+        }
+    
+    return json_response(await get_or_set(cache_key, build_result, expire=300), response)
+
+@router.get("/batch", response_model=dict, dependencies=[Depends(conditional_get(CATALOG))])
+async def get_products_batch(response: Response, ids: str, fields: Optional[str] = None):
+    """Get several products by id or slug in one call (request order, no view counting)"""
+    
+    field_list = parse_fields(fields, PRODUCT_FIELD_SOURCES, PRODUCT_FIELD_PRESETS)
+    keys = list(dict.fromkeys(key.strip() for key in ids.split(",") if key.strip()))
+    if not keys:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No product ids given"
+        )
+    if len(keys) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_IDS} products per request"
+        )
+    
+    async def build_result():
+        if await catalog_snapshot.ensure_fresh():
+            found = {key: catalog_snapshot.get(key) for key in keys}
+            found = {key: p for key, p in found.items() if p is not None and p.is_active}
+        else:
+            object_ids = [PydanticObjectId(key) for key in keys if PydanticObjectId.is_valid(key)]
+            products = await find_products(
+                Product.find(
+                    {"$or": [{"_id": {"$in": object_ids}}, {"slug": {"$in": keys}}]},
+                    Product.is_active == True
+                ),
+                field_list,
+                extra=("slug",)
+            )
+            by_key = {}
+            for product in products:
+                by_key[str(product.id)] = product
+                if product.slug:
+                    by_key[product.slug] = product
+            found = {key: by_key[key] for key in keys if key in by_key}
+        
+        return {
+            "products": [serialize_product(found[key], field_list) for key in keys if key in found],
+            "missing": [key for key in keys if key not in found]
+        }
+    
+    # Every product write bumps CATALOG, so it covers all the ids/slugs
+    cache_key = await versioned_key("products:batch", [CATALOG], ",".join(keys), fields)
+    return json_response(await get_or_set(cache_key, build_result, expire=300), response)
+
 @router.get("/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: str):
+async def get_product(product_id: str, fields: Optional[str] = None):
     """Get single product by ID"""
     
+    field_list = parse_fields(fields, PRODUCT_FIELD_SOURCES, PRODUCT_FIELD_PRESETS)
     try:
-        product = await Product.get(PydanticObjectId(product_id))
-        if not product:
-            raise HTTPException(status_code=404, detail="Product not found")
+        if await catalog_snapshot.ensure_fresh():
+            product = catalog_snapshot.get(product_id)
+            if not product:
+                raise HTTPException(status_code=404, detail="Product not found")
+        elif field_list is not None:
+            matches = await find_products(
+                Product.find(Product.id == PydanticObjectId(product_id)), field_list, limit=1
+            )
+            product = matches[0] if matches else None
+            if not product:
+                raise HTTPException(status_code=404, detail="Product not found")
+        else:
+            product = await Product.get(PydanticObjectId(product_id))
+            if not product:
+                raise HTTPException(status_code=404, detail="Product not found")
         
-        # Increment views
-        await product.increment_views()
+        # Read-only path: views are batched and flushed as $inc deltas
+        view_counter.record(product.id)
         
-        return ProductResponse(
-            id=str(product.id),
-            name=product.name,
-            description=product.description,
-            price=product.price,
-            final_price=product.final_price,
-            savings=product.savings,
-            savings_percentage=product.savings_percentage,
-            discount_active=product.discount_active,
-            discount_percentage=product.discount_percentage,
-            discount_amount=product.discount_amount,
-            discount_starts_at=product.discount_starts_at,
-            discount_ends_at=product.discount_ends_at,
-            category=product.category,
-            brand=product.brand,
-            images=product.images,
-            main_image=product.main_image,
-            stock=product.stock,
-            total_stock=product.total_stock,
-            is_in_stock=product.is_in_stock,
-            has_variants=product.has_variants,
-            variants=product.variants,
-            related_product_ids=product.related_product_ids,
-            is_active=product.is_active,
-            is_featured=product.is_featured,
-            tags=product.tags,
-            views_count=product.views_count,
-            sales_count=product.sales_count,
-            slug=product.slug,
-            created_at=product.created_at,
-            updated_at=product.updated_at
-        )
+        return json_response(serialize_product(product, field_list))
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid product ID")
 
 @router.get("/{product_id}/related")
-async def get_related_products(product_id: str, limit: int = 6):
+async def get_related_products(
+    product_id: str,
+    limit: int = 6,
+    fields: Optional[str] = None,
+    loader: ProductLoader = Depends(get_product_loader)
+):
     """Get related products"""
     
-    try:
-        product = await Product.get(PydanticObjectId(product_id))
+    field_list = parse_fields(fields, PRODUCT_FIELD_SOURCES, PRODUCT_FIELD_PRESETS)
+    if await catalog_snapshot.ensure_fresh():
+        product = catalog_snapshot.get(product_id)
         if not product:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Product not found"
             )
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid product ID"
-        )
-    
-    # Get manually set related products
-    related_products = []
-    for related_id in product.related_product_ids:
-        try:
-            related = await Product.get(PydanticObjectId(related_id))
-            if related and related.is_active:
-                related_products.append(related)
-        except Exception:
-            continue
-    
-    # If no manual related products, find by category
-    if not related_products:
-        related_products = await Product.find(
-            Product.category == product.category,
-            Product.id != product.id,
-            Product.is_active == True
-        ).limit(limit).to_list()
-    
-    return {
-        "related_products": [
-            ProductResponse(
-                id=str(p.id),
-                name=p.name,
-                description=p.description,
-                price=p.price,
-                final_price=p.final_price,
-                savings=p.savings,
-                savings_percentage=p.savings_percentage,
-                discount_active=p.discount_active,
-                discount_percentage=p.discount_percentage,
-                discount_amount=p.discount_amount,
-                discount_starts_at=p.discount_starts_at,
-                discount_ends_at=p.discount_ends_at,
-                category=p.category,
-                brand=p.brand,
-                images=p.images,
-                main_image=p.main_image,
-                stock=p.stock,
-                total_stock=p.total_stock,
-                is_in_stock=p.is_in_stock,
-                has_variants=p.has_variants,
-                variants=p.variants,
-                related_product_ids=p.related_product_ids,
-                is_active=p.is_active,
-                is_featured=p.is_featured,
-                tags=p.tags,
-                views_count=p.views_count,
-                sales_count=p.sales_count,
-                slug=p.slug,
-                created_at=p.created_at,
-                updated_at=p.updated_at
-            ).dict()
-            for p in related_products
+        related_products = catalog_snapshot.related(product, limit)
+    else:
+        product = await loader.load(product_id)
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found"
+            )
+        
+        # Get manually set related products (one batched query)
+        related_products = [
+            related for related in await loader.load_many(product.related_product_ids)
+            if related and related.is_active
         ]
-    }
+        
+        # If no manual related products, find by category
+        if not related_products:
+            related_products = await Product.find(
+                Product.category == product.category,
+                Product.id != product.id,
+                Product.is_active == True
+            ).limit(limit).to_list()
+    
+    return json_response({"related_products": serialize_products(related_products, field_list)})
 
 # ==================== PROTECTED ROUTES (USER) ====================
 
@@ -357,57 +422,24 @@ async def track_product_view(
 @router.get("/recently-viewed/me")
 async def get_recently_viewed(
     current_user: User = Depends(get_current_active_user),
-    limit: int = 10
+    limit: int = 10,
+    fields: Optional[str] = None
 ):
     """Get user's recently viewed products"""
     
+    field_list = parse_fields(fields, PRODUCT_FIELD_SOURCES, PRODUCT_FIELD_PRESETS)
     views = await RecentlyViewed.find(
         RecentlyViewed.user_id == str(current_user.id)
     ).sort(-RecentlyViewed.viewed_at).limit(limit).to_list()
     
-    products = []
-    for view in views:
-        try:
-            product = await Product.get(PydanticObjectId(view.product_id))
-            if product and product.is_active:
-                products.append(
-                    ProductResponse(
-                        id=str(product.id),
-                        name=product.name,
-                        description=product.description,
-                        price=product.price,
-                        final_price=product.final_price,
-                        savings=product.savings,
-                        savings_percentage=product.savings_percentage,
-                        discount_active=product.discount_active,
-                        discount_percentage=product.discount_percentage,
-                        discount_amount=product.discount_amount,
-                        discount_starts_at=product.discount_starts_at,
-                        discount_ends_at=product.discount_ends_at,
-                        category=product.category,
-                        brand=product.brand,
-                        images=product.images,
-                        main_image=product.main_image,
-                        stock=product.stock,
-                        total_stock=product.total_stock,
-                        is_in_stock=product.is_in_stock,
-                        has_variants=product.has_variants,
-                        variants=product.variants,
-                        related_product_ids=product.related_product_ids,
-                        is_active=product.is_active,
-                        is_featured=product.is_featured,
-                        tags=product.tags,
-                        views_count=product.views_count,
-                        sales_count=product.sales_count,
-                        slug=product.slug,
-                        created_at=product.created_at,
-                        updated_at=product.updated_at
-                    ).dict()
-                )
-        except Exception:
-            continue
-    
-    return {"recently_viewed": products}
+    loader = ProductLoader(field_list, extra=("is_active",))
+    products = [
+        serialize_product(product, field_list)
+        for product in await loader.load_many(view.product_id for view in views)
+        if product and product.is_active
+    ]
+    
+    return json_response({"recently_viewed": products})
 
 # ==================== ADMIN ROUTES ====================
 
@@ -505,41 +537,10 @@ async def create_product(
     )
     await product.insert()
     
-    # Clear cache
-    cache_clear_pattern("products:*")
-    
-    return ProductResponse(
-        id=str(product.id),
-        name=product.name,
-        description=product.description,
-        price=product.price,
-        final_price=product.final_price,
-        savings=product.savings,
-        savings_percentage=product.savings_percentage,
-        discount_active=product.discount_active,
-        discount_percentage=product.discount_percentage,
-        discount_amount=product.discount_amount,
-        discount_starts_at=product.discount_starts_at,
-        discount_ends_at=product.discount_ends_at,
-        category=product.category,
-        brand=product.brand,
-        images=product.images,
-        main_image=product.main_image,
-        stock=product.stock,
-        total_stock=product.total_stock,
-        is_in_stock=product.is_in_stock,
-        has_variants=product.has_variants,
-        variants=product.variants,
-        related_product_ids=product.related_product_ids,
-        is_active=product.is_active,
-        is_featured=product.is_featured,
-        tags=product.tags,
-        views_count=product.views_count,
-        sales_count=product.sales_count,
-        slug=product.slug,
-        created_at=product.created_at,
-        updated_at=product.updated_at
-    )
+    # Invalidate cached listings this product can appear in
+    await invalidate_product(product)
+    
+    return serialize_product(product)
 
 @router.put("/{product_id}", response_model=ProductResponse)
 async def update_product(
@@ -574,75 +575,54 @@ async def update_product(
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
         
+        previous_namespaces = product_namespaces(product)
+        
+        edits = {}
         if name:
-            product.name = name
+            edits["name"] = name
         if description is not None:
-            product.description = description
+            edits["description"] = description
         if price:
-            product.price = price
+            edits["price"] = price
         if category is not None:
-            product.category = category
+            edits["category"] = category
         if brand is not None:
-            product.brand = brand
+            edits["brand"] = brand
         if stock is not None:
-            product.stock = stock
+            edits["stock"] = stock
         if is_featured is not None:
-            product.is_featured = is_featured
+            edits["is_featured"] = is_featured
         if is_active is not None:
-            product.is_active = is_active
+            edits["is_active"] = is_active
         if tags is not None:
-            product.tags = [t.strip() for t in tags.split(",") if t.strip()]
+            edits["tags"] = [t.strip() for t in tags.split(",") if t.strip()]
         if discount_percentage is not None:
-            product.discount_percentage = discount_percentage
+            edits["discount_percentage"] = discount_percentage
         if discount_amount is not None:
-            product.discount_amount = discount_amount
+            edits["discount_amount"] = discount_amount
         if sale_price is not None:
-            product.sale_price = sale_price
+            edits["sale_price"] = sale_price
         if discount_active is not None:
-            product.discount_active = discount_active
+            edits["discount_active"] = discount_active
         if discount_starts_at is not None:
-            product.discount_starts_at = datetime.fromisoformat(discount_starts_at)
+            edits["discount_starts_at"] = datetime.fromisoformat(discount_starts_at)
         if discount_ends_at is not None:
-            product.discount_ends_at = datetime.fromisoformat(discount_ends_at)
+            edits["discount_ends_at"] = datetime.fromisoformat(discount_ends_at)
         
-        product.updated_at = datetime.utcnow()
-        await product.save()
+        # Only the edited fields are written; stock counters moved by
+        # checkouts since the load are left alone
+        for field, value in edits.items():
+            setattr(product, field, value)
+        product = await save_product_fields(product, *edits)
         
-        # Clear cache
-        cache_clear_pattern("products:*")
+        # Invalidate old and new listings (category/tags may have changed)
+        await invalidate_product(product, previous_namespaces)
         
-        return ProductResponse(
-            id=str(product.id),
-            name=product.name,
-            description=product.description,
-            price=product.price,
-            final_price=product.final_price,
-            savings=product.savings,
-            savings_percentage=product.savings_percentage,
-            discount_active=product.discount_active,
-            discount_percentage=product.discount_percentage,
-            discount_amount=product.discount_amount,
-            discount_starts_at=product.discount_starts_at,
-            discount_ends_at=product.discount_ends_at,
-            category=product.category,
-            brand=product.brand,
-            images=product.images,
-            main_image=product.main_image,
-            stock=product.stock,
-            total_stock=product.total_stock,
-            is_in_stock=product.is_in_stock,
-            has_variants=product.has_variants,
-            variants=product.variants,
-            related_product_ids=product.related_product_ids,
-            is_active=product.is_active,
-            is_featured=product.is_featured,
-            tags=product.tags,
-            views_count=product.views_count,
-            sales_count=product.sales_count,
-            slug=product.slug,
-            created_at=product.created_at,
-            updated_at=product.updated_at
-        )
+        # A stock cut must not leave flash sale tokens above real stock
+        if stock is not None and product.flash_sale:
+            await flash_sale.cap_tokens([str(product.id)])
+        
+        return serialize_product(product)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid product ID")
 
@@ -692,44 +672,12 @@ async def add_product_images(
             uploaded_image_urls.append(image_url)
     
     product.images.extend(uploaded_image_urls)
-    product.updated_at = datetime.utcnow()
-    await product.save()
-    
-    # Clear cache
-    cache_clear_pattern("products:*")
-    
-    return ProductResponse(
-        id=str(product.id),
-        name=product.name,
-        description=product.description,
-        price=product.price,
-        final_price=product.final_price,
-        savings=product.savings,
-        savings_percentage=product.savings_percentage,
-        discount_active=product.discount_active,
-        discount_percentage=product.discount_percentage,
-        discount_amount=product.discount_amount,
-        discount_starts_at=product.discount_starts_at,
-        discount_ends_at=product.discount_ends_at,
-        category=product.category,
-        brand=product.brand,
-        images=product.images,
-        main_image=product.main_image,
-        stock=product.stock,
-        total_stock=product.total_stock,
-        is_in_stock=product.is_in_stock,
-        has_variants=product.has_variants,
-        variants=product.variants,
-        related_product_ids=product.related_product_ids,
-        is_active=product.is_active,
-        is_featured=product.is_featured,
-        tags=product.tags,
-        views_count=product.views_count,
-        sales_count=product.sales_count,
-        slug=product.slug,
-        created_at=product.created_at,
-        updated_at=product.updated_at
-    )
+    product = await save_product_fields(product, "images")
+    
+    # Invalidate cached listings this product appears in
+    await invalidate_product(product)
+    
+    return serialize_product(product)
 
 @router.delete("/{product_id}/images/{image_index}")
 async def delete_product_image(
@@ -765,11 +713,10 @@ async def delete_product_image(
         )
     
     product.images.pop(image_index)
-    product.updated_at = datetime.utcnow()
-    await product.save()
+    product = await save_product_fields(product, "images")
     
-    # Clear cache
-    cache_clear_pattern("products:*")
+    # Invalidate cached listings this product appears in
+    await invalidate_product(product)
     
     return {"success": True, "message": "Image deleted"}
 
@@ -793,8 +740,8 @@ async def delete_product(
         
         await product.delete()
         
-        # Clear cache
-        cache_clear_pattern("products:*")
+        # Invalidate cached listings this product appeared in
+        await invalidate_product(product)
         
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid product ID")
@@ -824,11 +771,10 @@ async def add_product_variant(
     
     product.has_variants = True
     product.variants.append(variant)
-    product.updated_at = datetime.utcnow()
-    await product.save()
+    product = await save_product_fields(product, "has_variants", "variants")
     
-    # Clear cache
-    cache_clear_pattern("products:*")
+    # Invalidate cached listings this product appears in
+    await invalidate_product(product)
     
     return {"success": True, "message": "Variant added", "variants": product.variants}
 
@@ -852,8 +798,8 @@ async def add_related_product(
     
     if related_product_id not in product.related_product_ids:
         product.related_product_ids.append(related_product_id)
-        product.updated_at = datetime.utcnow()
-        await product.save()
+        product = await save_product_fields(product, "related_product_ids")
+        await invalidate_product(product)
     
     return {"success": True, "message": "Related product added"}
 
@@ -883,6 +829,7 @@ async def bulk_upload_products(
     csv_reader = csv.DictReader(io.StringIO(csv_content))
     
     created_count = 0
+    created_products = []
     errors = []
     
     for row in csv_reader:
@@ -897,12 +844,13 @@ async def bulk_upload_products(
                 images=[]
             )
             await product.insert()
+            created_products.append(product)
             created_count += 1
         except Exception as e:
             errors.append(f"Row {csv_reader.line_num}: {str(e)}")
     
-    # Clear cache
-    cache_clear_pattern("products:*")
+    # Invalidate only the listings the new products belong to
+    await invalidate_products(created_products)
     
     return {
         "success": True,
@@ -968,6 +916,7 @@ async def bulk_update_stock(
         )
     
     updated_count = 0
+    updated_products = []
     errors = []
     
     for update in updates:
@@ -975,16 +924,20 @@ async def bulk_update_stock(
             product = await Product.get(PydanticObjectId(update['product_id']))
             if product:
                 product.stock = update['stock']
-                product.updated_at = datetime.utcnow()
-                await product.save()
+                updated_products.append(await save_product_fields(product, "stock"))
                 updated_count += 1
             else:
                 errors.append(f"Product {update['product_id']} not found")
         except Exception as e:
             errors.append(f"Error: {update['product_id']}: {str(e)}")
     
-    # Clear cache
-    cache_clear_pattern("products:*")
+    # Invalidate only the listings the updated products belong to
+    await invalidate_products(updated_products)
+    
+    # A stock cut must not leave flash sale tokens above real stock
+    flash_ids = [str(product.id) for product in updated_products if product.flash_sale]
+    if flash_ids:
+        await flash_sale.cap_tokens(flash_ids)
     
     return {
         "success": True,
@@ -1,16 +1,24 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from beanie import PydanticObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
-from app.models.review import Review
+from app.models.review import Review, ReviewVote
 from app.models.product import Product
-from app.models.order import Order
 from app.models.user import User
 from app.schemas.review import ReviewCreate, ReviewResponse, ProductRatingStats
 from app.services.auth import get_current_active_user
+from app.services.pagination import keyset_filter, next_cursor, sort_spec
+from app.services.purchases import has_received_product
+from app.services.ratings import apply_rating_change, rating_stats
 
 router = APIRouter()
 
+# Listing sort -> review field (always descending, _id tie-break)
+REVIEW_SORT_FIELDS = {"newest": "created_at", "helpful": "helpful_count"}
+
 @router.post("/", response_model=ReviewResponse, status_code=status.HTTP_201_CREATED)
 async def create_review(
     review_data: ReviewCreate,
@@ -44,20 +52,8 @@ async def create_review(
             detail="You have already reviewed this product"
         )
     
-    # Check if user has purchased and received this product
-    user_orders = await Order.find(
-        Order.user_id == str(current_user.id),
-        Order.status == "delivered"
-    ).to_list()
-    
-    has_purchased = False
-    for order in user_orders:
-        for item in order.items:
-            if item.product_id == review_data.product_id:
-                has_purchased = True
-                break
-        if has_purchased:
-            break
+    # Check if user has purchased and received this product (one index probe)
+    has_purchased = await has_received_product(str(current_user.id), review_data.product_id)
     
     # Only allow reviews from verified purchases
     if not has_purchased:
@@ -78,14 +74,8 @@ async def create_review(
     )
     await review.insert()
     
-    # Update product rating and reviews count
-    all_reviews = await Review.find(Review.product_id == review_data.product_id).to_list()
-    total_rating = sum(r.rating for r in all_reviews)
-    avg_rating = total_rating / len(all_reviews) if all_reviews else 0
-    
-    product.rating = round(avg_rating, 1)
-    product.reviews_count = len(all_reviews)
-    await product.save()
+    # Update product rating aggregates
+    await apply_rating_change(review_data.product_id, added=review.rating)
     
     return ReviewResponse(
         id=str(review.id),
@@ -100,57 +90,55 @@ async def create_review(
         created_at=review.created_at
     )
 
-@router.get("/product/{product_id}", response_model=List[ReviewResponse])
-async def get_product_reviews(product_id: str):
-    """Get all reviews for a product"""
+@router.get("/product/{product_id}", response_model=dict)
+async def get_product_reviews(
+    product_id: str,
+    sort: str = Query("newest", pattern="^(newest|helpful)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Get a page of reviews for a product, newest or most helpful first"""
     
-    reviews = await Review.find(
-        Review.product_id == product_id
-    ).sort(-Review.created_at).to_list()
+    field = REVIEW_SORT_FIELDS[sort]
+    query = {"product_id": product_id}
+    if cursor:
+        query = {"$and": [query, keyset_filter(field, True, cursor)]}
+    reviews = await Review.find(query).sort(sort_spec(field, True)).limit(limit + 1).to_list()
+    reviews, cursor = next_cursor(reviews, limit, field)
     
-    return [
-        ReviewResponse(
-            id=str(review.id),
-            product_id=review.product_id,
-            user_id=review.user_id,
-            user_name=review.user_name,
-            rating=review.rating,
-            title=review.title,
-            comment=review.comment,
-            is_verified_purchase=review.is_verified_purchase,
-            helpful_count=review.helpful_count,
-            created_at=review.created_at
-        )
-        for review in reviews
-    ]
+    return {
+        "reviews": [
+            ReviewResponse(
+                id=str(review.id),
+                product_id=review.product_id,
+                user_id=review.user_id,
+                user_name=review.user_name,
+                rating=review.rating,
+                title=review.title,
+                comment=review.comment,
+                is_verified_purchase=review.is_verified_purchase,
+                helpful_count=review.helpful_count,
+                created_at=review.created_at
+            )
+            for review in reviews
+        ],
+        "has_more": cursor is not None,
+        "next_cursor": cursor
+    }
 
 @router.get("/product/{product_id}/stats", response_model=ProductRatingStats)
 async def get_product_rating_stats(product_id: str):
     """Get rating statistics for a product"""
     
-    reviews = await Review.find(Review.product_id == product_id).to_list()
-    
-    if not reviews:
-        return ProductRatingStats(
-            average_rating=0.0,
-            total_reviews=0,
-            rating_distribution={5: 0, 4: 0, 3: 0, 2: 0, 1: 0}
+    # Read straight from the stored aggregates
+    doc = None
+    if PydanticObjectId.is_valid(product_id):
+        doc = await Product.get_motor_collection().find_one(
+            {"_id": PydanticObjectId(product_id)},
+            {"rating_sum": 1, "reviews_count": 1, "rating_histogram": 1}
         )
     
-    total_reviews = len(reviews)
-    total_rating = sum(r.rating for r in reviews)
-    average_rating = round(total_rating / total_reviews, 1)
-    
-    # Calculate distribution
-    distribution = {5: 0, 4: 0, 3: 0, 2: 0, 1: 0}
-    for review in reviews:
-        distribution[review.rating] += 1
-    
-    return ProductRatingStats(
-        average_rating=average_rating,
-        total_reviews=total_reviews,
-        rating_distribution=distribution
-    )
+    return ProductRatingStats(**rating_stats(doc))
 
 @router.put("/{review_id}", response_model=ReviewResponse)
 async def update_review(
@@ -180,11 +168,28 @@ async def update_review(
             detail="Not authorized to update this review"
         )
     
+    # Swap the fields atomically and get the rating it replaced, so
+    # concurrent edits can't apply the same delta twice
+    previous = await Review.get_motor_collection().find_one_and_update(
+        {"_id": review.id},
+        {"$set": {
+            "rating": review_data.rating,
+            "title": review_data.title,
+            "comment": review_data.comment,
+            "updated_at": datetime.utcnow()
+        }},
+        return_document=ReturnDocument.BEFORE
+    )
+    if not previous:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Review not found"
+        )
+    await apply_rating_change(review.product_id, added=review_data.rating, removed=previous["rating"])
+    
     review.rating = review_data.rating
     review.title = review_data.title
     review.comment = review_data.comment
-    review.updated_at = datetime.utcnow()
-    await review.save()
     
     return ReviewResponse(
         id=str(review.id),
@@ -226,32 +231,23 @@ async def delete_review(
             detail="Not authorized to delete this review"
         )
     
-    product_id = review.product_id
-    await review.delete()
+    # Only the request that actually deleted it adjusts the aggregates
+    deleted = await Review.get_motor_collection().find_one_and_delete({"_id": review.id})
+    await ReviewVote.find(ReviewVote.review_id == str(review.id)).delete()
     
-    # Update product rating and reviews count after deletion
-    try:
-        product = await Product.get(PydanticObjectId(product_id))
-        if product:
-            all_reviews = await Review.find(Review.product_id == product_id).to_list()
-            if all_reviews:
-                total_rating = sum(r.rating for r in all_reviews)
-                avg_rating = total_rating / len(all_reviews)
-                product.rating = round(avg_rating, 1)
-                product.reviews_count = len(all_reviews)
-            else:
-                product.rating = 0.0
-                product.reviews_count = 0
-            await product.save()
-    except Exception:
-        pass  # If product update fails, at least review is deleted
+    # Update product rating aggregates after deletion
+    if deleted:
+        try:
+            await apply_rating_change(deleted["product_id"], removed=deleted["rating"])
+        except Exception:
+            pass  # If product update fails, at least review is deleted (the reconciler repairs it)
 
 @router.post("/{review_id}/helpful", response_model=ReviewResponse)
 async def mark_review_helpful(
     review_id: str,
     current_user: User = Depends(get_current_active_user)
 ):
-    """Mark review as helpful"""
+    """Mark review as helpful (once per user)"""
     
     try:
         review = await Review.get(PydanticObjectId(review_id))
@@ -261,8 +257,20 @@ async def mark_review_helpful(
                 detail="Review not found"
             )
         
-        review.helpful_count += 1
-        await review.save()
+        # The unique (review_id, user_id) index rejects repeat votes
+        try:
+            await ReviewVote(review_id=str(review.id), user_id=str(current_user.id)).insert()
+        except DuplicateKeyError:
+            pass  # Already voted; leave the count alone
+        else:
+            updated = await Review.get_motor_collection().find_one_and_update(
+                {"_id": review.id},
+                {"$inc": {"helpful_count": 1}},
+                projection={"helpful_count": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if updated:
+                review.helpful_count = updated["helpful_count"]
         
         return ReviewResponse(
             id=str(review.id),
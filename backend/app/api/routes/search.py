@@ -1,18 +1,74 @@
+import re
 from typing import List
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from app.models.product import Product
-from app.models.review import Review
 from app.schemas.product import ProductResponse
 from app.schemas.search import ProductSearch
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.search_index import search_index
+from app.services.suggest import TOP_K, suggestion_trie
+from app.services.serializers import json_response, serialize_products
 
 router = APIRouter()
 
+# sort_by -> Mongo sort (ties broken by _id so pages are stable)
+SEARCH_SORTS = {
+    "price_low": [("final_price", 1), ("_id", 1)],
+    "price_high": [("final_price", -1), ("_id", 1)],
+    "newest": [("created_at", -1), ("_id", 1)],
+    "rating": [("rating", -1), ("reviews_count", -1), ("_id", 1)],
+    "popular": [("sales_count", -1), ("_id", 1)],
+}
+
+def search_snapshot(search_params: ProductSearch) -> List[Product]:
+    """Run a search against the in-memory index and catalog snapshot"""
+    
+    if search_params.query:
+        ranked = search_index.search(search_params.query)
+        products = [catalog_snapshot.products[product_id] for product_id, _ in ranked]
+    else:
+        products = [p for p in catalog_snapshot.products.values() if p.is_active]
+    
+    if search_params.category:
+        products = [p for p in products if p.category == search_params.category]
+    if search_params.min_price is not None:
+        products = [p for p in products if p.final_price >= search_params.min_price]
+    if search_params.max_price is not None:
+        products = [p for p in products if p.final_price <= search_params.max_price]
+    if search_params.in_stock_only:
+        products = [p for p in products if p.is_in_stock]
+    if search_params.on_sale_only:
+        products = [p for p in products if p.discount_active]
+    if search_params.min_rating is not None:
+        products = [p for p in products if p.rating >= search_params.min_rating]
+    
+    # Stable sorts keep relevance order among ties
+    if search_params.sort_by == "price_low":
+        products.sort(key=lambda p: p.final_price)
+    elif search_params.sort_by == "price_high":
+        products.sort(key=lambda p: p.final_price, reverse=True)
+    elif search_params.sort_by == "newest":
+        products.sort(key=lambda p: p.created_at, reverse=True)
+    elif search_params.sort_by == "rating":
+        products.sort(key=lambda p: (p.rating, p.reviews_count), reverse=True)
+    elif search_params.sort_by == "popular":
+        products.sort(key=lambda p: p.sales_count, reverse=True)
+    elif not search_params.query:
+        products.sort(key=lambda p: p.created_at, reverse=True)
+    
+    start = (search_params.page - 1) * search_params.limit
+    return products[start:start + search_params.limit]
+
 @router.post("/", response_model=List[ProductResponse])
 async def search_products(search_params: ProductSearch):
     """Advanced product search with filters"""
     
+    # Served from memory whenever the catalog snapshot is usable
+    if await catalog_snapshot.ensure_fresh():
+        return json_response(serialize_products(search_snapshot(search_params)))
+    
     # Build query
-    query_conditions = []
+    query_conditions = [{"is_active": True}]
     
     # Text search
     if search_params.query:
@@ -31,85 +87,59 @@ async def search_products(search_params: ProductSearch):
     
     # Price range
     if search_params.min_price is not None:
-        query_conditions.append({"price": {"$gte": search_params.min_price}})
+        query_conditions.append({"final_price": {"$gte": search_params.min_price}})
     if search_params.max_price is not None:
-        query_conditions.append({"price": {"$lte": search_params.max_price}})
+        query_conditions.append({"final_price": {"$lte": search_params.max_price}})
     
     # Stock filter
     if search_params.in_stock_only:
-        query_conditions.append({"stock": {"$gt": 0}})
+        query_conditions.append({"is_in_stock": True})
     
     # On sale filter
     if search_params.on_sale_only:
         query_conditions.append({"discount_active": True})
     
-    # Build final query
-    if query_conditions:
-        final_query = {"$and": query_conditions}
-    else:
-        final_query = {}
-    
-    # Execute query
-    products = await Product.find(final_query).to_list()
-    
-    # Filter by rating if needed
+    # Rating filter on the stored aggregate (kept current by review writes)
     if search_params.min_rating is not None:
-        filtered_products = []
-        for product in products:
-            reviews = await Review.find(Review.product_id == str(product.id)).to_list()
-            if reviews:
-                avg_rating = sum(r.rating for r in reviews) / len(reviews)
-                if avg_rating >= search_params.min_rating:
-                    filtered_products.append(product)
-            elif search_params.min_rating == 0:
-                filtered_products.append(product)
-        products = filtered_products
-    
-    # Sort products
-    if search_params.sort_by == "price_low":
-        products.sort(key=lambda p: p.final_price)
-    elif search_params.sort_by == "price_high":
-        products.sort(key=lambda p: p.final_price, reverse=True)
-    elif search_params.sort_by == "newest":
-        products.sort(key=lambda p: p.created_at, reverse=True)
-    elif search_params.sort_by == "rating":
-        # Sort by rating (requires calculating for each)
-        async def get_product_rating(product):
-            reviews = await Review.find(Review.product_id == str(product.id)).to_list()
-            if reviews:
-                return sum(r.rating for r in reviews) / len(reviews)
-            return 0
-        
-        # This is inefficient for large datasets - consider caching ratings
-        products_with_ratings = []
-        for product in products:
-            rating = await get_product_rating(product)
-            products_with_ratings.append((product, rating))
-        products_with_ratings.sort(key=lambda x: x[1], reverse=True)
-        products = [p[0] for p in products_with_ratings]
-    
-    # Pagination
-    start = (search_params.page - 1) * search_params.limit
-    end = start + search_params.limit
-    products = products[start:end]
+        query_conditions.append({"rating": {"$gte": search_params.min_rating}})
+    
+    # Filter, sort and paginate inside MongoDB
+    query = Product.find({"$and": query_conditions})
+    sort = SEARCH_SORTS.get(search_params.sort_by)
+    if sort:
+        query = query.sort(sort)
+    products = await query.skip(
+        (search_params.page - 1) * search_params.limit
+    ).limit(search_params.limit).to_list()
     
     # Convert to response
-    return [
-        ProductResponse(
-            id=str(product.id),
-            name=product.name,
-            description=product.description,
-            price=product.price,
-            final_price=product.final_price,
-            discount_percentage=product.savings_percentage,
-            savings=product.savings,
-            discount_active=product.discount_active,
-            category=product.category,
-            image_url=product.image_url,
-            stock=product.stock
-        )
-        for product in products
-    ]
+    return json_response(serialize_products(products))
+
+@router.get("/suggest")
+async def suggest(q: str, limit: int = Query(8, ge=1, le=TOP_K)):
+    """Autocomplete for the search box: top products, tags, categories and brands"""
+    
+    if await catalog_snapshot.ensure_fresh():
+        return {"suggestions": suggestion_trie.suggest(q, limit)}
+    
+    # Fallback: anchored name prefix, most sold first
+    q = q.strip()
+    if not q:
+        return {"suggestions": []}
+    products = await Product.find(
+        {"is_active": True, "name": {"$regex": f"^{re.escape(q)}", "$options": "i"}}
+    ).sort([("sales_count", -1)]).limit(limit).to_list()
+    return {"suggestions": [
+        {
+            "text": p.name,
+            "type": "product",
+            "id": str(p.id),
+            "slug": p.slug,
+            "category": p.category,
+            "price": p.final_price,
+        }
+        for p in products
+    ]}
 
 @router.get("/categories")
 async def get_categories():
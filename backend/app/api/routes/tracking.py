@@ -167,7 +167,7 @@ async def get_product_recommendations(
         Product.final_price >= price_min,
         Product.final_price <= price_max,
         Product.is_active == True,
-        Product.stock > 0
+        Product.is_in_stock == True
     ).limit(limit).to_list()
     
     # If not enough, get from same category
@@ -176,7 +176,7 @@ async def get_product_recommendations(
             Product.id != PydanticObjectId(product_id),
             Product.category == product.category,
             Product.is_active == True,
-            Product.stock > 0
+            Product.is_in_stock == True
         ).limit(limit - len(similar_products)).to_list()
         similar_products.extend(additional)
     
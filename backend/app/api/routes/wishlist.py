@@ -8,6 +8,10 @@ from app.models.product import Product
 from app.models.user import User
 from app.schemas.wishlist import AddToWishlist, WishlistItemResponse
 from app.services.auth import get_current_active_user
+from app.services.product_loader import ProductLoader
+from app.services.serializers import json_response, serialize_product
+
+WISHLIST_PRODUCT_FIELDS = ["id", "name", "price", "final_price", "savings_percentage", "main_image", "is_in_stock"]
 
 router = APIRouter()
 
@@ -19,28 +23,29 @@ async def get_wishlist(current_user: User = Depends(get_current_active_user)):
         WishlistItem.user_id == str(current_user.id)
     ).sort(-WishlistItem.added_at).to_list()
     
+    # Only the fields the wishlist card shows, in one query
+    loader = ProductLoader(WISHLIST_PRODUCT_FIELDS)
+    products = await loader.load_many(item.product_id for item in wishlist_items)
+    
     response = []
-    for item in wishlist_items:
-        # Get product details
-        try:
-            product = await Product.get(PydanticObjectId(item.product_id))
-            if product:
-                response.append(WishlistItemResponse(
-                    id=str(item.id),
-                    product_id=item.product_id,
-                    product_name=product.name,
-                    product_price=product.price,
-                    final_price=product.final_price,
-                    discount_percentage=product.savings_percentage,
-                    image_url=product.main_image or "",
-                    in_stock=product.is_in_stock,
-                    added_at=item.added_at
-                ))
-        except Exception:
+    for item, product in zip(wishlist_items, products):
+        if not product:
             # Product deleted, skip
             continue
+        product = serialize_product(product, WISHLIST_PRODUCT_FIELDS)
+        response.append({
+            "id": str(item.id),
+            "product_id": item.product_id,
+            "product_name": product["name"],
+            "product_price": product["price"],
+            "final_price": product["final_price"],
+            "discount_percentage": product["savings_percentage"],
+            "image_url": product["main_image"] or "",
+            "in_stock": product["is_in_stock"],
+            "added_at": item.added_at
+        })
     
-    return response
+    return json_response(response)
 
 @router.post("/add", response_model=WishlistItemResponse)
 async def add_to_wishlist(
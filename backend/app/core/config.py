@@ -57,6 +57,32 @@ class Settings(BaseSettings):
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     
+    # Cache (L1 = in-process LRU, L2 = Redis when USE_REDIS is on)
+    CACHE_L1_MAX_BYTES: int = 16 * 1024 * 1024  # Per-worker memory ceiling
+    CACHE_L1_MAX_ITEMS: int = 5000
+    CACHE_DEFAULT_TTL: int = 300  # Seconds a value is served as fresh
+    CACHE_STALE_TTL: int = 60  # Extra seconds a stale value is served while rebuilding
+    CACHE_REDIS_TIMEOUT: float = 0.5
+    CACHE_GENERATION_TTL: float = 1.0  # Max delay before other workers see an invalidation
+
+    # In-process catalog snapshot (public product reads served from memory)
+    CATALOG_SNAPSHOT_ENABLED: bool = True
+    CATALOG_SNAPSHOT_REFRESH_INTERVAL: int = 300  # Resync even without a version change
+    CATALOG_SNAPSHOT_FULL_REBUILD_INTERVAL: int = 3600
+    CATALOG_SNAPSHOT_MAX_STALENESS: int = 900  # Older than this -> fall back to MongoDB
+    
+    # Product view counter (batched $inc writes)
+    VIEW_COUNTER_FLUSH_INTERVAL: float = 10.0
+    VIEW_COUNTER_MAX_PENDING: int = 5000  # Flush early once this many products are pending
+    
+    # Inventory holds for orders awaiting online payment
+    INVENTORY_HOLD_MINUTES: int = 15
+    INVENTORY_HOLD_SWEEP_INTERVAL: int = 60
+    
+    # Flash-sale mode (stock tokens in Redis, or in-process when USE_REDIS is off)
+    FLASH_SALE_BATCH_WINDOW: float = 0.02  # Seconds of flash-sale stock writes merged per batch
+    FLASH_SALE_REFRESH_INTERVAL: int = 30  # Registry reload + token reconciliation
+    
     # Frontend URL
     FRONTEND_URL: str = "http://localhost:3000"
     
@@ -5,10 +5,11 @@ from app.models.order import Order
 from app.models.user import User
 from app.models.cart import CartItem
 from app.models.wishlist import WishlistItem
-from app.models.review import Review
+from app.models.review import Review, ReviewVote
 from app.models.notification import Notification
 from app.models.tracking import RecentlyViewed
 from app.models.return_request import ReturnRequest
+from app.models.inventory import InventoryHold
 
 async def init_indexes():
     """Create all database indexes"""
@@ -24,7 +25,17 @@ async def init_indexes():
         # Order indexes
         await Order.get_motor_collection().create_index("user_id")
         await Order.get_motor_collection().create_index("order_number", unique=True)
-        await Order.get_motor_collection().create_index([("user_id", 1), ("created_at", -1)])
+        # Keyset-paginated order history and admin search (newest first).
+        # (user_id, created_at) is a prefix of the history index; drop it
+        await Order.get_motor_collection().create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+        if "user_id_1_created_at_-1" in await Order.get_motor_collection().index_information():
+            await Order.get_motor_collection().drop_index("user_id_1_created_at_-1")
+        await Order.get_motor_collection().create_index([("created_at", -1), ("_id", -1)])
+        await Order.get_motor_collection().create_index([("status", 1), ("created_at", -1), ("_id", -1)])
+        await Order.get_motor_collection().create_index([("payment_status", 1), ("created_at", -1), ("_id", -1)])
+        # Multikey: verified-purchase probes and per-product purchase analytics
+        await Order.get_motor_collection().create_index([("user_id", 1), ("items.product_id", 1), ("status", 1)])
+        await Order.get_motor_collection().create_index([("items.product_id", 1), ("created_at", -1)])
         
         # User indexes
         await User.get_motor_collection().create_index("email", unique=True)
@@ -39,6 +50,11 @@ async def init_indexes():
         # Review indexes
         await Review.get_motor_collection().create_index("product_id")
         await Review.get_motor_collection().create_index([("product_id", 1), ("created_at", -1)])
+        # Keyset-paginated listings (newest / most helpful)
+        await Review.get_motor_collection().create_index([("product_id", 1), ("created_at", -1), ("_id", -1)])
+        await Review.get_motor_collection().create_index([("product_id", 1), ("helpful_count", -1), ("_id", -1)])
+        # One helpful vote per user per review
+        await ReviewVote.get_motor_collection().create_index([("review_id", 1), ("user_id", 1)], unique=True)
         
         # Notification indexes
         await Notification.get_motor_collection().create_index([("user_id", 1), ("created_at", -1)])
@@ -46,6 +62,17 @@ async def init_indexes():
         # Recently viewed indexes
         await RecentlyViewed.get_motor_collection().create_index([("user_id", 1), ("viewed_at", -1)])
         
+        # Inventory hold indexes: capture/cancel by order, expiry sweep,
+        # active holds per product, claimed batches, and a TTL purge of
+        # closed holds a week after conversion/release
+        holds = InventoryHold.get_motor_collection()
+        await holds.create_index([("order_number", 1), ("status", 1)])
+        await holds.create_index([("status", 1), ("expires_at", 1)])
+        await holds.create_index([("status", 1), ("product_id", 1)])
+        await holds.create_index("claim", sparse=True)
+        await holds.create_index("created_at")
+        await holds.create_index("closed_at", expireAfterSeconds=7 * 24 * 60 * 60)
+        
         # Return request indexes
         await ReturnRequest.get_motor_collection().create_index([("user_id", 1), ("created_at", -1)])
         
@@ -4,10 +4,10 @@ from beanie import init_beanie
 from app.core.config import settings
 from app.models.user import User
 from app.models.product import Product
-from app.models.cart import CartItem
+from app.models.cart import Cart, CartItem
 from app.models.order import Order
 from app.models.wishlist import WishlistItem
-from app.models.review import Review
+from app.models.review import Review, ReviewVote
 from app.models.coupon import Coupon
 from app.models.address import Address
 from app.models.notification import Notification
@@ -18,6 +18,8 @@ from app.models.banner import HeroBanner
 from app.models.newsletter import NewsletterSubscriber
 from app.models.contact import ContactSubmission
 from app.models.collection import Collection
+from app.models.inventory import InventoryHold
+from app.models.counter import Counter
 
 # MongoDB client
 client = None
@@ -35,10 +37,12 @@ async def init_db():
         document_models=[
             User,
             Product,
+            Cart,
             CartItem,
             Order,
             WishlistItem,
             Review,
+            ReviewVote,
             Coupon,
             Address,
             Notification,
@@ -50,6 +54,8 @@ async def init_db():
             ContactSubmission,
             NewsletterSubscriber,
             Collection,
+            InventoryHold,
+            Counter,
         ]
     )
 
@@ -7,12 +7,21 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
+import asyncio
 import os
 from pathlib import Path
 
 from app.core.config import settings
 from app.db.mongodb import init_db, close_db
 from app.db.init_indexes import init_indexes
+from app.services.cache import init_cache, close_cache
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.pricing import backfill_derived_fields, run_discount_scheduler
+from app.services.view_counter import view_counter
+from app.services.ratings import run_rating_reconciler
+from app.services.inventory import run_hold_sweeper, stock_writer
+from app.services.flash_sale import flash_sale
+from app.services.cart import migrate_legacy_cart_items
 
 # Import routes directly (no duplicates)
 from app.api.routes import auth
@@ -29,6 +38,7 @@ from app.api.routes import contact
 from app.api.routes import newsletter
 from app.api.routes import upload
 from app.api.routes import collections
+from app.api.routes import search
 
 # Optional routes
 try:
@@ -97,6 +107,29 @@ async def lifespan(app: FastAPI):
     await init_indexes()
     print("✅ Database indexes initialized")
     
+    # Initialize cache tiers
+    await init_cache()
+    
+    # Move carts from the legacy per-line collection
+    migrated = await migrate_legacy_cart_items()
+    if migrated:
+        print(f"✅ Migrated {migrated} legacy cart lines")
+    
+    # Persist derived price/stock fields, then keep discounts on schedule
+    backfilled = await backfill_derived_fields()
+    if backfilled:
+        print(f"✅ Refreshed derived price/stock fields on {backfilled} products")
+    discount_scheduler = asyncio.create_task(run_discount_scheduler())
+    view_counter.start()
+    rating_reconciler = asyncio.create_task(run_rating_reconciler())
+    hold_sweeper = asyncio.create_task(run_hold_sweeper())
+    stock_writer.start()
+    flash_sale.start()
+    
+    # Warm the in-process catalog snapshot
+    if await catalog_snapshot.ensure_fresh():
+        print(f"✅ Catalog snapshot loaded ({len(catalog_snapshot.products)} products)")
+    
     print(f"✅ {settings.PROJECT_NAME} v{settings.VERSION}")
     print(f"🌍 Environment: {settings.ENVIRONMENT}")
     print(f"🔗 Frontend URL: {settings.FRONTEND_URL}")
@@ -107,6 +140,13 @@ async def lifespan(app: FastAPI):
     yield  # Only ONE yield
     
     # Shutdown
+    discount_scheduler.cancel()
+    rating_reconciler.cancel()
+    hold_sweeper.cancel()
+    await flash_sale.stop()
+    await stock_writer.stop()
+    await view_counter.stop()
+    await close_cache()
     await close_db()
     print("✅ Closed MongoDB connection")
 
@@ -227,6 +267,7 @@ app.include_router(contact.router, prefix="/contact", tags=["Contact"])
 app.include_router(newsletter.router, prefix="/newsletter", tags=["Newsletter"])
 app.include_router(upload.router, prefix="/upload", tags=["Upload"])
 app.include_router(collections.router, prefix="/collections", tags=["Collections"])
+app.include_router(search.router, prefix="/search", tags=["Search"])
 
 # Register optional routers
 if payment:
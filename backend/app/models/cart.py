@@ -1,9 +1,38 @@
 from datetime import datetime
-from typing import Optional
-from beanie import Document
-from pydantic import Field
+from typing import List, Optional
+from beanie import Document, Indexed
+from bson import ObjectId
+from pydantic import BaseModel, Field
+
+class CartLine(BaseModel):
+    """One product line embedded in a Cart"""
+    id: str = Field(default_factory=lambda: str(ObjectId()))
+    product_id: str
+    product_name: str
+    product_price: float
+    quantity: int = Field(default=1, ge=1)
+    image_url: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
+
+    @property
+    def subtotal(self) -> float:
+        """Calculate subtotal for this cart line"""
+        return self.product_price * self.quantity
+
+class Cart(Document):
+    """A user's whole cart in one document (see app.services.cart)"""
+    user_id: Indexed(str, unique=True)
+    items: List[CartLine] = []
+    version: int = 0  # Bumped by every change, for optimistic concurrency
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
+
+    class Settings:
+        name = "carts"
 
 class CartItem(Document):
+    """Legacy one-document-per-line cart; migrated into Cart at startup"""
     user_id: str = Field(..., index=True)
     product_id: str
     product_name: str
@@ -12,10 +41,10 @@ class CartItem(Document):
     image_url: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: Optional[datetime] = None
-    
+
     class Settings:
         name = "cart_items"
-    
+
     @property
     def subtotal(self) -> float:
         """Calculate subtotal for this cart item"""
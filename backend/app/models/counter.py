@@ -0,0 +1,12 @@
+from datetime import datetime, timezone
+from beanie import Document
+from pydantic import Field
+
+class Counter(Document):
+    """Named sequence; _id is the sequence name (see app.services.order)"""
+    id: str
+    value: int = 0
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    
+    class Settings:
+        name = "counters"
@@ -0,0 +1,19 @@
+from datetime import datetime, timezone
+from typing import Optional
+from beanie import Document
+from pydantic import Field
+
+class InventoryHold(Document):
+    """Stock reserved for one product of an order awaiting online payment"""
+    order_number: str
+    product_id: str
+    quantity: int = Field(..., ge=1)
+    status: str = "active"  # active, converted (paid), released (expired/cancelled)
+    expires_at: datetime
+    flash: bool = False  # Backed by flash-sale stock tokens instead of reserved_stock
+    claim: Optional[str] = None  # Marks the holds one conversion/release flipped
+    closed_at: Optional[datetime] = None  # Converted/released; purged by TTL index
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    
+    class Settings:
+        name = "inventory_holds"
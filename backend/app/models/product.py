@@ -1,7 +1,12 @@
 from typing import List, Optional, Dict
 from datetime import datetime, timezone
-from beanie import Document, Indexed
-from pydantic import BaseModel, Field
+from beanie import Document, Indexed, before_event, Insert, Replace, Save, SaveChanges
+from pydantic import BaseModel, Field, model_validator
+
+def _aware(value: datetime) -> datetime:
+    """Mongo returns naive UTC datetimes"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
 
 # Product Variant Model
 class ProductVariant(BaseModel):
@@ -41,6 +46,7 @@ class Product(Document):
     # Metadata
     is_active: bool = True  # Don't use Indexed() with bool
     is_featured: bool = False
+    flash_sale: bool = False  # Checkout admitted by stock tokens (app.services.flash_sale)
     tags: List[str] = []
     
     # SEO
@@ -48,11 +54,25 @@ class Product(Document):
     meta_description: Optional[str] = None
     slug: Optional[str] = None
     
+    # Derived fields, persisted so they can be filtered, sorted and indexed.
+    # Recomputed on every save; discount windows are refreshed at their
+    # boundaries by app.services.pricing.
+    final_price: float = 0.0
+    total_stock: int = 0  # Available to sell: on hand minus reserved_stock
+    is_in_stock: bool = False
+    
+    # Units held for orders awaiting payment (sum of active InventoryHolds,
+    # maintained by app.services.inventory)
+    reserved_stock: int = 0
+    
     # Stats
     views_count: int = 0
     sales_count: int = 0
     rating: float = 0.0
     reviews_count: int = 0
+    # Review aggregates maintained with atomic deltas (app.services.ratings)
+    rating_sum: int = 0
+    rating_histogram: Dict[str, int] = Field(default_factory=lambda: {str(star): 0 for star in range(1, 6)})
     
     # Timestamps
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -94,6 +114,35 @@ class Product(Document):
             [
                 ("sales_count", -1),
             ],
+            # Search rating filter / sort
+            [
+                ("is_active", 1),
+                ("rating", -1),
+            ],
+            # Sell-price range / in-stock filters
+            [
+                ("is_active", 1),
+                ("final_price", 1),
+            ],
+            [
+                ("category", 1),
+                ("is_active", 1),
+                ("final_price", 1),
+            ],
+            [
+                ("is_active", 1),
+                ("is_in_stock", 1),
+                ("final_price", 1),
+            ],
+            # Discount boundary scheduler
+            [
+                ("discount_active", 1),
+                ("discount_starts_at", 1),
+            ],
+            [
+                ("discount_active", 1),
+                ("discount_ends_at", 1),
+            ],
         ]
     
     @property
@@ -101,16 +150,21 @@ class Product(Document):
         """Get first image as main image"""
         return self.images[0] if self.images else None
     
-    @property
-    def final_price(self) -> float:
-        """Calculate final price after discount"""
+    def discount_is_live(self, now: Optional[datetime] = None) -> bool:
+        """Whether the discount applies at the given time"""
         if not self.discount_active:
-            return self.price
+            return False
 
-        now = datetime.now(timezone.utc)
-        if self.discount_starts_at and now < self.discount_starts_at:
-            return self.price
-        if self.discount_ends_at and now > self.discount_ends_at:
+        now = now or datetime.now(timezone.utc)
+        if self.discount_starts_at and now < _aware(self.discount_starts_at):
+            return False
+        if self.discount_ends_at and now > _aware(self.discount_ends_at):
+            return False
+        return True
+    
+    def compute_final_price(self, now: Optional[datetime] = None) -> float:
+        """Calculate final price after discount"""
+        if not self.discount_is_live(now):
             return self.price
 
         candidates = [self.price]
@@ -143,19 +197,31 @@ class Product(Document):
             return 0
         return round((self.savings / self.price) * 100, 2)
     
-    @property
-    def is_in_stock(self) -> bool:
-        """Check if product is in stock"""
+    def compute_total_stock(self) -> int:
+        """Get total stock available to sell (including variants)"""
         if self.has_variants:
-            return any(variant.stock > 0 for variant in self.variants)
-        return self.stock > 0
+            on_hand = sum(variant.stock for variant in self.variants)
+        else:
+            on_hand = self.stock
+        return max(on_hand - self.reserved_stock, 0)
     
     @property
-    def total_stock(self) -> int:
-        """Get total stock (including variants)"""
-        if self.has_variants:
-            return sum(variant.stock for variant in self.variants)
-        return self.stock
+    def available_stock(self) -> int:
+        """Units that can still be sold: stock minus active holds"""
+        return max(self.stock - self.reserved_stock, 0)
+    
+    @model_validator(mode="after")
+    def _load_derived_fields(self):
+        """Derived fields are always current on a loaded document"""
+        self.sync_derived_fields()
+        return self
+    
+    @before_event(Insert, Replace, Save, SaveChanges)
+    def sync_derived_fields(self):
+        """Recompute final_price, total_stock and is_in_stock"""
+        self.final_price = self.compute_final_price()
+        self.total_stock = self.compute_total_stock()
+        self.is_in_stock = self.total_stock > 0
     
     def get_variant_by_attributes(self, attributes: Dict[str, str]) -> Optional[ProductVariant]:
         """Find variant by attributes"""
@@ -172,13 +238,16 @@ class Product(Document):
         return self.final_price
     
     async def increment_views(self):
-        """Increment product views"""
+        """Increment product views (batched; see app.services.view_counter)"""
+        from app.services.view_counter import view_counter
         self.views_count += 1
-        self.updated_at = datetime.now(timezone.utc)
-        await self.save()
+        view_counter.record(self.id)
     
     async def increment_sales(self, quantity: int = 1):
-        """Increment sales count"""
+        """Increment sales count (atomic $inc; a save() would overwrite stock)"""
         self.sales_count += quantity
         self.updated_at = datetime.now(timezone.utc)
-        await self.save()
+        await self.get_motor_collection().update_one(
+            {"_id": self.id},
+            {"$inc": {"sales_count": quantity}, "$set": {"updated_at": self.updated_at}},
+        )
@@ -18,3 +18,12 @@ class Review(Document):
     
     class Settings:
         name = "reviews"
+
+class ReviewVote(Document):
+    """One helpful vote; (review_id, user_id) is unique"""
+    review_id: str
+    user_id: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    
+    class Settings:
+        name = "review_votes"
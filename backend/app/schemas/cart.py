@@ -7,6 +7,7 @@ class AddToCart(BaseModel):
 
 class UpdateCartItem(BaseModel):
     quantity: int = Field(..., ge=0, le=100)
+    version: Optional[int] = None  # Cart version the client last saw (409 if it moved)
 
 class CartItemResponse(BaseModel):
     id: str
@@ -16,6 +17,11 @@ class CartItemResponse(BaseModel):
     quantity: int
     image_url: Optional[str] = None
     subtotal: float
+    # Set by the repricing cart view
+    added_price: Optional[float] = None  # Price when the line was added/last updated
+    price_changed: bool = False
+    stock_quantity: Optional[int] = None
+    out_of_stock: bool = False  # Unavailable, or not enough stock for the quantity
     
     class Config:
         from_attributes = True
@@ -24,3 +30,6 @@ class CartSummary(BaseModel):
     items: list[CartItemResponse]
     total_items: int
     total_price: float
+    version: int = 0
+    has_price_changes: bool = False
+    has_stock_issues: bool = False
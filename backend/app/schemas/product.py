@@ -124,3 +124,18 @@ class ProductResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+class ProductCard(BaseModel):
+    """Slim product shape for listing cards (fields=card)"""
+    id: str
+    name: str
+    slug: Optional[str] = None
+    price: float
+    final_price: float
+    savings_percentage: float
+    discount_active: bool
+    main_image: Optional[str] = None
+    category: Optional[str] = None
+    brand: Optional[str] = None
+    is_in_stock: bool
+    tags: List[str] = []
@@ -1,9 +1,8 @@
 from datetime import datetime
 from typing import List
-from beanie import PydanticObjectId
 
-from app.models.product import Product
 from app.models.wishlist import WishlistItem
+from app.services.product_loader import ProductLoader
 from app.services.notification import notify_price_drop, notify_low_stock
 
 async def check_price_drops():
@@ -12,10 +11,12 @@ async def check_price_drops():
     # Get all wishlist items
     wishlist_items = await WishlistItem.find_all().to_list()
     
-    for item in wishlist_items:
+    # One query for all distinct wishlisted products
+    loader = ProductLoader()
+    products = await loader.load_many(item.product_id for item in wishlist_items)
+    
+    for item, product in zip(wishlist_items, products):
         try:
-            product = await Product.get(PydanticObjectId(item.product_id))
-            
             if not product or not product.is_active:
                 continue
             
@@ -50,10 +51,11 @@ async def check_low_stock_alerts():
     
     wishlist_items = await WishlistItem.find_all().to_list()
     
-    for item in wishlist_items:
+    loader = ProductLoader()
+    products = await loader.load_many(item.product_id for item in wishlist_items)
+    
+    for item, product in zip(wishlist_items, products):
         try:
-            product = await Product.get(PydanticObjectId(item.product_id))
-            
             if not product or not product.is_active:
                 continue
             
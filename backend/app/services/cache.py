@@ -1,95 +1,485 @@
-import os
-from typing import Optional
+"""Two-tier cache: bounded in-process LRU (L1) in front of async Redis (L2).
+
+L1 is an LRU with a per-entry TTL and a byte budget so a busy worker can't
+grow past its memory ceiling. L2 is shared between workers through
+``redis.asyncio`` so a cache hit never blocks the event loop.
+
+``get_or_set`` is the main entry point for read paths: it coalesces
+concurrent builds of the same cold key (single-flight) and keeps serving a
+stale value for ``stale_ttl`` seconds while one background task rebuilds it.
+
+Invalidation is generation based: keys embed the current generation of the
+namespaces they depend on (``catalog``, ``category:<name>``...) and a write
+bumps those counters in O(1) instead of scanning for matching keys. Entries
+for old generations are never read again and age out of both tiers.
+
+Both tiers hold the JSON round-trip of a value (datetimes as ISO strings,
+ObjectIds as str), so a key reads back the same shape whichever tier
+answers, including the call that built it.
+"""
+
+import asyncio
+import fnmatch
 import json
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from app.core.config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+DEFAULT_TTL = settings.CACHE_DEFAULT_TTL
+DEFAULT_STALE_TTL = settings.CACHE_STALE_TTL
+GENERATION_PREFIX = "gen:"
+
+# Read-or-seed and bump scripts keep generation counters monotonic even if
+# Redis loses a key: a missing counter restarts at the current time in ms.
+_GET_GENERATIONS_LUA = """
+local out = {}
+for i, key in ipairs(KEYS) do
+    local v = redis.call('GET', key)
+    if not v then
+        redis.call('SET', key, ARGV[1], 'NX')
+        v = redis.call('GET', key)
+    end
+    out[i] = v
+end
+return out
+"""
+
+_BUMP_GENERATIONS_LUA = """
+local floor = tonumber(ARGV[1])
+local out = {}
+for i, key in ipairs(KEYS) do
+    local v = redis.call('INCR', key)
+    if v < floor then
+        redis.call('SET', key, floor)
+        v = floor
+    end
+    out[i] = v
+end
+return out
+"""
+
+
+def _json_default(value: Any):
+    """Encode the non-JSON types our cached payloads contain"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=_json_default, separators=(",", ":"))
+
+
+class _Entry:
+    __slots__ = ("value", "size", "fresh_until", "stale_until")
+
+    def __init__(self, value: Any, size: int, fresh_until: float, stale_until: float):
+        self.value = value
+        self.size = size
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class LRUCache:
+    """In-process LRU with TTL and a byte budget (sizes are serialized lengths)"""
+
+    def __init__(self, max_bytes: int, max_items: int):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.current_bytes = 0
+        self._data: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, now: float) -> Optional[_Entry]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.stale_until <= now:
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key: str, entry: _Entry):
+        if entry.size > self.max_bytes:
+            # Never let one oversized value flush the whole L1
+            self._remove(key)
+            return
+        self._remove(key)
+        self._data[key] = entry
+        self.current_bytes += entry.size
+        while self._data and (
+            self.current_bytes > self.max_bytes or len(self._data) > self.max_items
+        ):
+            _, evicted = self._data.popitem(last=False)
+            self.current_bytes -= evicted.size
+            self.evictions += 1
+
+    def delete(self, key: str):
+        self._remove(key)
+
+    def keys(self) -> List[str]:
+        return list(self._data.keys())
 
-# Mock Redis for development
-USE_REDIS = os.getenv("USE_REDIS", "false").lower() == "true"
+    def clear(self):
+        self._data.clear()
+        self.current_bytes = 0
+
+    def _remove(self, key: str):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry.size
+
+    def stats(self) -> dict:
+        return {
+            "items": len(self._data),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_l1 = LRUCache(settings.CACHE_L1_MAX_BYTES, settings.CACHE_L1_MAX_ITEMS)
+redis_client = None
+_inflight: Dict[str, "asyncio.Task"] = {}
+
+# Local view of generation counters: ns -> (generation, checked_at)
+_generations: Dict[str, tuple] = {}
+
+
+async def init_cache():
+    """Connect the shared Redis tier (called from the app lifespan)"""
+    global redis_client
+
+    if not settings.USE_REDIS:
+        print("⚠️  Redis disabled. Using in-memory cache only.")
+        return
+    if aioredis is None:
+        print("⚠️  redis package not installed. Using in-memory cache only.")
+        return
 
-if USE_REDIS:
     try:
-        import redis
-        redis_client = redis.Redis(
-            host=os.getenv("REDIS_HOST", "localhost"),
-            port=int(os.getenv("REDIS_PORT", 6379)),
+        client = aioredis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
             db=0,
-            decode_responses=True
+            decode_responses=True,
+            socket_timeout=settings.CACHE_REDIS_TIMEOUT,
+            socket_connect_timeout=settings.CACHE_REDIS_TIMEOUT,
         )
-        # Test connection
-        redis_client.ping()
+        await client.ping()
+        redis_client = client
         print("✅ Redis connected successfully")
     except Exception as e:
-        print(f"⚠️  Redis connection failed: {e}. Using in-memory cache.")
-        USE_REDIS = False
         redis_client = None
-else:
-    redis_client = None
-    print("⚠️  Redis disabled. Using in-memory cache.")
+        print(f"⚠️  Redis connection failed: {e}. Using in-memory cache only.")
 
-# In-memory cache fallback
-_memory_cache = {}
 
-def cache_get(key: str) -> Optional[str]:
-    """Get value from cache"""
-    if USE_REDIS and redis_client:
+async def close_cache():
+    """Close the Redis connection pool"""
+    global redis_client
+    if redis_client is not None:
         try:
-            return redis_client.get(key)
+            await redis_client.aclose()
         except Exception as e:
-            print(f"Redis get error: {e}")
-            return _memory_cache.get(key)
-    return _memory_cache.get(key)
+            print(f"Redis close error: {e}")
+        redis_client = None
+
+
+def _make_entry(value: Any, expire: int, stale_ttl: int) -> _Entry:
+    """Entry holding the JSON round-trip of value, the same shape L2 returns"""
+    now = time.time()
+    payload = _dumps(value)
+    return _Entry(json.loads(payload), len(payload), now + expire, now + expire + stale_ttl)
+
+
+def _envelope(entry: _Entry) -> str:
+    return _dumps({"v": entry.value, "f": entry.fresh_until, "s": entry.stale_until})
+
+
+def _from_envelope(raw: str) -> Optional[_Entry]:
+    try:
+        data = json.loads(raw)
+        return _Entry(data["v"], len(raw), data["f"], data["s"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+async def _l2_get_many(keys: List[str]) -> Dict[str, _Entry]:
+    if redis_client is None or not keys:
+        return {}
+    try:
+        raws = await redis_client.mget(keys)
+    except Exception as e:
+        print(f"Redis get error: {e}")
+        return {}
+
+    found = {}
+    for key, raw in zip(keys, raws):
+        if raw is None:
+            continue
+        entry = _from_envelope(raw)
+        if entry is not None:
+            found[key] = entry
+    return found
+
+
+async def _l2_set_many(entries: Dict[str, _Entry]):
+    if redis_client is None or not entries:
+        return
+    now = time.time()
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for key, entry in entries.items():
+                ttl = max(1, int(entry.stale_until - now))
+                pipe.set(key, _envelope(entry), ex=ttl)
+            await pipe.execute()
+    except Exception as e:
+        print(f"Redis set error: {e}")
 
-def cache_set(key: str, value: str, expire: int = 300):
+
+async def _lookup_many(keys: List[str]) -> Dict[str, _Entry]:
+    """Fetch entries (fresh or stale) from L1, then L2 for the L1 misses"""
+    now = time.time()
+    found = {}
+    missing = []
+    for key in keys:
+        entry = _l1.get(key, now)
+        if entry is not None:
+            found[key] = entry
+        else:
+            missing.append(key)
+
+    for key, entry in (await _l2_get_many(missing)).items():
+        if entry.stale_until > now:
+            _l1.set(key, entry)
+            found[key] = entry
+    return found
+
+
+async def cache_get(key: str) -> Optional[Any]:
+    """Get a fresh value from cache"""
+    entry = (await _lookup_many([key])).get(key)
+    if entry is not None and entry.fresh_until > time.time():
+        return entry.value
+    return None
+
+
+async def cache_get_many(keys: Iterable[str]) -> Dict[str, Any]:
+    """Get fresh values for many keys (one Redis MGET for all L1 misses)"""
+    now = time.time()
+    entries = await _lookup_many(list(keys))
+    return {key: e.value for key, e in entries.items() if e.fresh_until > now}
+
+
+async def cache_set(key: str, value: Any, expire: int = DEFAULT_TTL, stale_ttl: int = 0):
     """Set value in cache with expiration"""
-    if USE_REDIS and redis_client:
-        try:
-            redis_client.setex(key, expire, value)
-            return
-        except Exception as e:
-            print(f"Redis set error: {e}")
-    _memory_cache[key] = value
+    entry = _make_entry(value, expire, stale_ttl)
+    _l1.set(key, entry)
+    await _l2_set_many({key: entry})
+
+
+async def cache_set_many(mapping: Dict[str, Any], expire: int = DEFAULT_TTL, stale_ttl: int = 0):
+    """Set many values in one pipelined round trip"""
+    entries = {key: _make_entry(value, expire, stale_ttl) for key, value in mapping.items()}
+    for key, entry in entries.items():
+        _l1.set(key, entry)
+    await _l2_set_many(entries)
 
-def cache_delete(key: str):
-    """Delete key from cache"""
-    if USE_REDIS and redis_client:
+
+async def cache_delete(*keys: str):
+    """Delete keys from cache"""
+    for key in keys:
+        _l1.delete(key)
+    if redis_client is not None and keys:
         try:
-            redis_client.delete(key)
-            return
+            await redis_client.unlink(*keys)
         except Exception as e:
             print(f"Redis delete error: {e}")
-    if key in _memory_cache:
-        del _memory_cache[key]
 
-def cache_clear():
+
+async def cache_clear():
     """Clear all cache"""
-    if USE_REDIS and redis_client:
+    _l1.clear()
+    if redis_client is not None:
         try:
-            redis_client.flushdb()
-            return
+            await redis_client.flushdb(asynchronous=True)
         except Exception as e:
             print(f"Redis clear error: {e}")
-    _memory_cache.clear()
 
-def cache_clear_pattern(pattern: str):
-    """Clear cache keys matching pattern"""
-    if USE_REDIS and redis_client:
+
+async def cache_clear_pattern(pattern: str):
+    """Clear cache keys matching a glob pattern (incremental SCAN, never KEYS)"""
+    for key in _l1.keys():
+        if fnmatch.fnmatchcase(key, pattern):
+            _l1.delete(key)
+
+    if redis_client is None:
+        return
+    try:
+        batch = []
+        async for key in redis_client.scan_iter(match=pattern, count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                await redis_client.unlink(*batch)
+                batch = []
+        if batch:
+            await redis_client.unlink(*batch)
+    except Exception as e:
+        print(f"Redis clear pattern error: {e}")
+
+
+async def _build_and_store(key: str, builder: Callable[[], Awaitable[Any]], expire: int, stale_ttl: int):
+    entry = _make_entry(await builder(), expire, stale_ttl)
+    _l1.set(key, entry)
+    await _l2_set_many({key: entry})
+    return entry.value
+
+
+def _start_build(key: str, builder: Callable[[], Awaitable[Any]], expire: int, stale_ttl: int) -> "asyncio.Task":
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_build_and_store(key, builder, expire, stale_ttl))
+        _inflight[key] = task
+        task.add_done_callback(lambda t, k=key: _finish_build(k, t))
+    return task
+
+
+def _finish_build(key: str, task: "asyncio.Task"):
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Cache rebuild error for {key}: {task.exception()}")
+
+
+async def get_or_set(
+    key: str,
+    builder: Callable[[], Awaitable[Any]],
+    expire: int = DEFAULT_TTL,
+    stale_ttl: int = DEFAULT_STALE_TTL,
+) -> Any:
+    """Return the cached value for key, building it at most once per worker.
+
+    A stale entry is returned immediately while a single background task
+    refreshes it; a missing entry is built once and every concurrent caller
+    awaits that same build.
+    """
+    entry = (await _lookup_many([key])).get(key)
+    if entry is not None:
+        if entry.fresh_until > time.time():
+            return entry.value
+        _start_build(key, builder, expire, stale_ttl)
+        return entry.value
+
+    # shield() so a disconnecting client doesn't cancel the shared build
+    return await asyncio.shield(_start_build(key, builder, expire, stale_ttl))
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+async def get_generations(namespaces: Iterable[str]) -> Dict[str, int]:
+    """Current generation per namespace.
+
+    Values are re-read from Redis at most every CACHE_GENERATION_TTL seconds,
+    so other workers' bumps become visible within that window.
+    """
+    namespaces = list(dict.fromkeys(namespaces))
+    now = time.time()
+    result = {}
+    stale = []
+    for ns in namespaces:
+        cached = _generations.get(ns)
+        if cached is not None and (redis_client is None or now - cached[1] < settings.CACHE_GENERATION_TTL):
+            result[ns] = cached[0]
+        else:
+            stale.append(ns)
+
+    if not stale:
+        return result
+
+    if redis_client is not None:
+        try:
+            values = await redis_client.eval(
+                _GET_GENERATIONS_LUA,
+                len(stale),
+                *[GENERATION_PREFIX + ns for ns in stale],
+                _now_ms(),
+            )
+            for ns, value in zip(stale, values):
+                _generations[ns] = (int(value), now)
+                result[ns] = int(value)
+            return result
+        except Exception as e:
+            print(f"Redis generation read error: {e}")
+
+    for ns in stale:
+        cached = _generations.get(ns)
+        # Seed from the clock so keys never repeat across restarts
+        generation = cached[0] if cached is not None else _now_ms()
+        _generations[ns] = (generation, now)
+        result[ns] = generation
+    return result
+
+
+async def bump_generations(*namespaces: str):
+    """Invalidate every key built on these namespaces (O(1) per namespace)"""
+    namespaces = list(dict.fromkeys(ns for ns in namespaces if ns))
+    if not namespaces:
+        return
+    now = time.time()
+
+    if redis_client is not None:
         try:
-            keys = redis_client.keys(pattern)
-            if keys:
-                redis_client.delete(*keys)
+            values = await redis_client.eval(
+                _BUMP_GENERATIONS_LUA,
+                len(namespaces),
+                *[GENERATION_PREFIX + ns for ns in namespaces],
+                _now_ms(),
+            )
+            for ns, value in zip(namespaces, values):
+                _generations[ns] = (int(value), now)
             return
         except Exception as e:
-            print(f"Redis clear pattern error: {e}")
-    
-    # For in-memory cache, match pattern
-    keys_to_delete = []
-    # Convert Redis pattern to Python pattern
-    import re
-    regex_pattern = pattern.replace('*', '.*').replace('?', '.')
-    regex = re.compile(regex_pattern)
-    
-    for key in list(_memory_cache.keys()):
-        if regex.match(key):
-            keys_to_delete.append(key)
-    
-    for key in keys_to_delete:
-        del _memory_cache[key]
+            print(f"Redis generation bump error: {e}")
+
+    for ns in namespaces:
+        cached = _generations.get(ns)
+        generation = max(cached[0] + 1, _now_ms()) if cached is not None else _now_ms()
+        _generations[ns] = (generation, now)
+
+
+async def versioned_key(prefix: str, namespaces: Iterable[str], *parts: Any) -> str:
+    """Cache key stamped with the generations of the namespaces it depends on"""
+    generations = await get_generations(namespaces)
+    stamp = ",".join(f"{ns}@{gen}" for ns, gen in generations.items())
+    return ":".join([prefix, stamp, *(str(p) for p in parts)])
+
+
+def cache_stats() -> dict:
+    """Memory and hit-rate report for the in-process tier"""
+    return {
+        "l1": _l1.stats(),
+        "l2": "redis" if redis_client is not None else "disabled",
+        "inflight_builds": len(_inflight),
+        "generations": len(_generations),
+    }
@@ -0,0 +1,274 @@
+"""Atomic operations on the single-document cart.
+
+Each user has one Cart document (unique user_id) with embedded lines, so a
+cart read is one indexed fetch and clearing is one update. Every change is a
+single conditional $inc / $set / $push / $pull that also bumps `version`;
+callers holding a version can pass it back to make an update conditional on
+nobody having changed the cart in between (409 otherwise).
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.models.cart import Cart, CartItem, CartLine
+from app.models.product import Product
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.product_loader import ProductLoader
+
+
+def _collection():
+    return Cart.get_motor_collection()
+
+
+def _changed(now: datetime) -> dict:
+    return {"$inc": {"version": 1}, "$set": {"updated_at": now}}
+
+
+def _cart_filter(user_id: str, version: Optional[int] = None) -> dict:
+    query = {"user_id": user_id}
+    if version is not None:
+        query["version"] = version
+    return query
+
+
+async def _version_conflict_or_missing(user_id: str, version: Optional[int], detail: str):
+    """Raise 409 if the cart moved past `version`, else 404 with detail"""
+    if version is not None:
+        current = await _collection().find_one({"user_id": user_id}, {"version": 1})
+        if current and current.get("version", 0) != version:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Cart was changed by another request; reload and retry"
+            )
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+
+
+async def get_user_cart(user_id: str) -> Cart:
+    """The user's cart (an unsaved empty one if they have none)"""
+    cart = await Cart.find_one(Cart.user_id == user_id)
+    return cart or Cart(user_id=user_id)
+
+
+def _line_from_doc(doc: dict, product_id: str) -> CartLine:
+    for line in doc.get("items", []):
+        if line["product_id"] == product_id:
+            return CartLine(**line)
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cart item not found")
+
+
+async def add_item(user_id: str, line: CartLine, max_quantity: int) -> CartLine:
+    """Add a line, or add to an existing line's quantity up to max_quantity"""
+    now = datetime.utcnow()
+
+    # Existing line with room for the extra quantity
+    doc = await _collection().find_one_and_update(
+        {
+            "user_id": user_id,
+            "items": {"$elemMatch": {
+                "product_id": line.product_id,
+                "quantity": {"$lte": max_quantity - line.quantity},
+            }},
+        },
+        {
+            "$inc": {"items.$.quantity": line.quantity, "version": 1},
+            "$set": {"items.$.updated_at": now, "updated_at": now},
+        },
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc:
+        return _line_from_doc(doc, line.product_id)
+
+    # New line (creating the cart if needed)
+    line.created_at = now
+    try:
+        doc = await _collection().find_one_and_update(
+            {"user_id": user_id, "items.product_id": {"$ne": line.product_id}},
+            {
+                "$push": {"items": line.model_dump()},
+                "$inc": {"version": 1},
+                "$set": {"updated_at": now},
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        doc = None
+    if doc:
+        return _line_from_doc(doc, line.product_id)
+
+    # The line exists but the new total would exceed stock
+    cart = await get_user_cart(user_id)
+    existing = next((item for item in cart.items if item.product_id == line.product_id), None)
+    in_cart = existing.quantity if existing else 0
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Cannot add {line.quantity} more. Only {max(max_quantity - in_cart, 0)} items available"
+    )
+
+
+async def set_line_quantity(
+    user_id: str,
+    line_id: str,
+    quantity: int,
+    product_price: float,
+    version: Optional[int] = None,
+) -> CartLine:
+    """Set one line's quantity and refresh its price"""
+    now = datetime.utcnow()
+    doc = await _collection().find_one_and_update(
+        {**_cart_filter(user_id, version), "items.id": line_id},
+        {
+            "$inc": {"version": 1},
+            "$set": {
+                "items.$.quantity": quantity,
+                "items.$.product_price": product_price,
+                "items.$.updated_at": now,
+                "updated_at": now,
+            },
+        },
+        return_document=ReturnDocument.AFTER,
+    )
+    if not doc:
+        await _version_conflict_or_missing(user_id, version, "Cart item not found")
+    return next(CartLine(**item) for item in doc["items"] if item["id"] == line_id)
+
+
+async def remove_line(user_id: str, line_id: str, version: Optional[int] = None):
+    """Remove one line; 404 if it isn't in the cart"""
+    result = await _collection().update_one(
+        {**_cart_filter(user_id, version), "items.id": line_id},
+        {"$pull": {"items": {"id": line_id}}, **_changed(datetime.utcnow())},
+    )
+    if not result.modified_count:
+        await _version_conflict_or_missing(user_id, version, "Cart item not found")
+
+
+async def remove_lines(user_id: str, line_ids: Iterable[str]):
+    """Remove the given lines in one update (e.g. the ones just ordered)"""
+    line_ids = list(line_ids)
+    if line_ids:
+        await _collection().update_one(
+            {"user_id": user_id},
+            {"$pull": {"items": {"id": {"$in": line_ids}}}, **_changed(datetime.utcnow())},
+        )
+
+
+async def remove_products(user_id: str, product_ids: Iterable[str]):
+    """Remove every line for the given products in one update"""
+    product_ids = list(product_ids)
+    if product_ids:
+        await _collection().update_one(
+            {"user_id": user_id},
+            {"$pull": {"items": {"product_id": {"$in": product_ids}}}, **_changed(datetime.utcnow())},
+        )
+
+
+async def clear_cart(user_id: str):
+    """Empty the cart in one update"""
+    await _collection().update_one(
+        {"user_id": user_id},
+        {"$set": {"items": [], "updated_at": datetime.utcnow()}, "$inc": {"version": 1}},
+    )
+
+
+# ==================== REPRICING ====================
+
+async def load_line_products(lines: List[CartLine]) -> Dict[str, Optional[Product]]:
+    """Current product for every line: catalog snapshot, else one $in query"""
+    product_ids = list(dict.fromkeys(line.product_id for line in lines))
+    if await catalog_snapshot.ensure_fresh():
+        return {product_id: catalog_snapshot.get(product_id) for product_id in product_ids}
+    products = await ProductLoader().load_many(product_ids)
+    return dict(zip(product_ids, products))
+
+
+def reprice_line(line: CartLine, product: Optional[Product]) -> Dict:
+    """Line priced at the current sell price, with stale-line flags"""
+    available = product is not None and product.is_active
+    price = product.final_price if available else line.product_price
+    stock = product.available_stock if available else 0
+    return {
+        "id": line.id,
+        "product_id": line.product_id,
+        "product_name": product.name if available else line.product_name,
+        "product_price": price,
+        "quantity": line.quantity,
+        "image_url": line.image_url,
+        "subtotal": round(price * line.quantity, 2),
+        "added_price": line.product_price,
+        "price_changed": round(price, 2) != round(line.product_price, 2),
+        "stock_quantity": stock,
+        "out_of_stock": stock < line.quantity,
+    }
+
+
+# ==================== MIGRATION ====================
+
+async def migrate_legacy_cart_items() -> int:
+    """Fold the old one-document-per-line cart_items into carts; returns lines moved.
+
+    Safe to run on several workers at once: a line is only pushed when its
+    product isn't already in the cart, and legacy documents are deleted only
+    after their lines are in place. Legacy lines that don't make a valid
+    CartLine (e.g. quantity 0) are dropped and counted, never fatal.
+    """
+    legacy = CartItem.get_motor_collection()
+    if not await legacy.estimated_document_count():
+        return 0
+
+    moved = 0
+    dropped = 0
+    groups = legacy.aggregate([
+        {"$sort": {"created_at": 1}},
+        {"$group": {"_id": "$user_id", "items": {"$push": "$$ROOT"}}},
+    ])
+    async for group in groups:
+        user_id = group["_id"]
+        lines = {}
+        for doc in group["items"]:
+            try:
+                line = CartLine(
+                    id=str(doc["_id"]),
+                    product_id=doc["product_id"],
+                    product_name=doc["product_name"],
+                    product_price=doc["product_price"],
+                    quantity=doc.get("quantity", 1),
+                    image_url=doc.get("image_url"),
+                    created_at=doc.get("created_at") or datetime.utcnow(),
+                    updated_at=doc.get("updated_at"),
+                )
+            except (KeyError, ValidationError):
+                dropped += 1
+                continue
+            existing = lines.get(line.product_id)
+            if existing:
+                existing.quantity += line.quantity
+                continue
+            lines[line.product_id] = line
+
+        now = datetime.utcnow()
+        try:
+            await _collection().update_one(
+                {"user_id": user_id},
+                {"$setOnInsert": {"items": [], "version": 0, "created_at": now}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            pass  # Another worker created it first
+        for line in lines.values():
+            await _collection().update_one(
+                {"user_id": user_id, "items.product_id": {"$ne": line.product_id}},
+                {"$push": {"items": line.model_dump()}, **_changed(now)},
+            )
+        await legacy.delete_many({"_id": {"$in": [doc["_id"] for doc in group["items"]]}})
+        moved += len(group["items"])
+
+    if dropped:
+        print(f"⚠️ Dropped {dropped} invalid legacy cart lines during migration")
+    return moved - dropped
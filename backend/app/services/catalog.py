@@ -0,0 +1,184 @@
+"""Catalog cache namespaces, invalidation and HTTP validators.
+
+Every product belongs to a handful of cache namespaces; a write bumps the
+generations of exactly those namespaces so only listings that could contain
+the product go cold.
+
+Generations are write timestamps in milliseconds (see cache.bump_generations),
+so they double as the catalog version: public catalog reads send an ETag and
+Last-Modified built from them and answer conditional requests with 304 before
+touching MongoDB.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from beanie import PydanticObjectId
+from fastapi import HTTPException, Request, Response, status
+
+from app.models.product import Product
+from app.services.cache import bump_generations, get_generations
+
+CATALOG = "catalog"  # Unfiltered listings, featured, trending, taxonomies
+COLLECTIONS = "collections"  # Collection documents (list/detail)
+BANNERS = "banners"  # Hero banners
+# Review aggregates. No cached read or ETag shows them (only the
+# snapshot-served search filters and sorts on rating), so a review moves
+# this alone and the snapshot syncs just the products it changed.
+RATINGS = "ratings"
+
+
+def is_collection_tag(tag: str) -> bool:
+    """Tags that name a Special Edition collection (e.g. 'Marvel Edition')"""
+    return 'Edition' in tag or 'Collection' in tag or 'Special' in tag
+
+
+def _namespaces(product_id, category: Optional[str], brand: Optional[str], tags: Iterable[str]) -> List[str]:
+    namespaces = [CATALOG, f"product:{product_id}"]
+    if category:
+        namespaces.append(f"category:{category}")
+    if brand:
+        namespaces.append(f"brand:{brand}")
+    namespaces.extend(f"collection:{tag}" for tag in tags)
+    return namespaces
+
+
+def product_namespaces(product: Product) -> List[str]:
+    """Namespaces whose cached reads can include this product"""
+    return _namespaces(product.id, product.category, product.brand, product.tags)
+
+
+def listing_namespaces(
+    category: Optional[str] = None,
+    brand: Optional[str] = None,
+    tag: Optional[str] = None,
+    collection: Optional[str] = None,
+) -> List[str]:
+    """Namespace a product listing depends on.
+
+    A filtered listing only contains products that belong to every filter's
+    namespace, and any write to such a product bumps all of them, so keying
+    on the narrowest one is enough.
+    """
+    if collection:
+        return [f"collection:{collection}"]
+    if tag:
+        return [f"collection:{tag}"]
+    if category:
+        return [f"category:{category}"]
+    if brand:
+        return [f"brand:{brand}"]
+    return [CATALOG]
+
+
+async def invalidate_products(products: Iterable[Product], previous: Iterable[str] = ()):
+    """Bump the namespaces of the given products (plus any they just left)"""
+    namespaces = list(previous)
+    for product in products:
+        namespaces.extend(product_namespaces(product))
+    await bump_generations(*namespaces)
+
+
+async def invalidate_product(product: Product, previous: Iterable[str] = ()):
+    """Bump one product's namespaces; pass its pre-edit namespaces as previous"""
+    await invalidate_products([product], previous)
+
+
+async def invalidate_product_ids(product_ids: Iterable[str]):
+    """Bump namespaces for products known only by id (e.g. stock updates)"""
+    object_ids = []
+    for product_id in product_ids:
+        try:
+            object_ids.append(PydanticObjectId(product_id))
+        except Exception:
+            continue
+    if not object_ids:
+        return
+    products = await Product.find({"_id": {"$in": object_ids}}).to_list()
+    await invalidate_products(products)
+
+
+async def invalidate_product_docs(docs: Iterable[Dict]):
+    """Bump namespaces for products given as raw documents (_id, category,
+    brand, tags), e.g. returned by the stock update itself, without a refetch.
+
+    Listings, /batch, /facets and the snapshot all serve stock fields, so a
+    stock write moves the product's full namespace set like any other edit.
+    """
+    namespaces = []
+    for doc in docs:
+        namespaces.extend(_namespaces(doc["_id"], doc.get("category"), doc.get("brand"), doc.get("tags") or []))
+    await bump_generations(*namespaces)
+
+
+async def invalidate_collection(*names: str):
+    """Bump collection documents and the product listings tagged with them"""
+    await bump_generations(COLLECTIONS, *(f"collection:{name}" for name in names))
+
+
+async def invalidate_ratings():
+    """Bump the review aggregate namespace"""
+    await bump_generations(RATINGS)
+
+
+async def invalidate_banners():
+    """Bump the hero banner namespace"""
+    await bump_generations(BANNERS)
+
+
+# ==================== CONDITIONAL GET ====================
+
+async def catalog_validators(namespaces: Iterable[str]) -> Tuple[str, datetime]:
+    """ETag and Last-Modified for a read that depends on these namespaces"""
+    generations = await get_generations(namespaces)
+    token = ",".join(f"{ns}@{gen}" for ns, gen in generations.items())
+    etag = f'W/"{hashlib.blake2b(token.encode(), digest_size=8).hexdigest()}"'
+    last_modified = datetime.fromtimestamp(max(generations.values()) / 1000, tz=timezone.utc)
+    return etag, last_modified.replace(microsecond=0)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified <= since
+
+
+async def check_not_modified(request: Request, response: Response, namespaces: Iterable[str]):
+    """Raise 304 if the client's copy is current, else stamp the validators"""
+    etag, last_modified = await catalog_validators(namespaces)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "public, no-cache",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = bool(if_modified_since) and _not_modified_since(if_modified_since, last_modified)
+
+    if not_modified:
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+
+def conditional_get(*namespaces: str) -> Callable:
+    """Dependency answering If-None-Match / If-Modified-Since for fixed namespaces"""
+    async def dependency(request: Request, response: Response):
+        await check_not_modified(request, response, namespaces)
+    return dependency
@@ -0,0 +1,376 @@
+"""Memory-resident, read-only snapshot of the public catalog.
+
+The whole catalog (products, collections, hero banners) is small enough to
+keep in every worker. Public product reads are answered from the snapshot
+with no MongoDB round trip; the snapshot follows the catalog generations
+from app.services.catalog and refreshes incrementally (products updated
+since the last sync, plus deletions) whenever one of them moves.
+
+Documents held here are shared between requests and must never be mutated
+or saved by callers.
+"""
+
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.core.config import settings
+from app.models.banner import HeroBanner
+from app.models.collection import Collection
+from app.models.product import Product
+from app.services.cache import get_generations
+from app.services.catalog import BANNERS, CATALOG, COLLECTIONS, RATINGS
+from app.services.pagination import decode_cursor
+
+SNAPSHOT_NAMESPACES = (CATALOG, COLLECTIONS, BANNERS, RATINGS)
+
+# Products written within this window before a sync are re-read on the next
+# one, covering clock skew between workers and slow in-flight saves.
+SYNC_OVERLAP = timedelta(seconds=30)
+
+# Don't retry a failed refresh on every request
+REFRESH_RETRY_DELAY = 5.0
+
+
+def _sort_key(value):
+    # Mongo orders null before any value and stores naive UTC datetimes
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value is not None, value if value is not None else 0)
+
+
+def _order_key(product: Product, field: str):
+    """(sort field, _id) - the same order pagination.sort_spec asks Mongo for"""
+    return (_sort_key(getattr(product, field, None)), str(product.id))
+
+
+def after_cursor(products: List[Product], field: str, descending: bool, cursor: str) -> List[Product]:
+    """Products after a pagination cursor in a list sorted by _order_key"""
+    sort_value, doc_id = decode_cursor(cursor)
+    position = (_sort_key(sort_value), str(doc_id))
+    for index, product in enumerate(products):
+        key = _order_key(product, field)
+        if (key < position) if descending else (key > position):
+            return products[index:]
+    return []
+
+
+def _deep_sizeof(obj, seen: Set[int]) -> int:
+    """Approximate retained size of an object graph in bytes"""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += _deep_sizeof(obj.__dict__, seen)
+    return size
+
+
+class CatalogSnapshot:
+    """Products indexed by id, slug, category, brand and tag"""
+
+    def __init__(self):
+        self.products: Dict[str, Product] = {}
+        self.by_slug: Dict[str, str] = {}
+        self.by_category: Dict[str, Set[str]] = {}
+        self.by_brand: Dict[str, Set[str]] = {}
+        self.by_tag: Dict[str, Set[str]] = {}
+        self.collections: List[Collection] = []
+        self.banners: List[HeroBanner] = []
+
+        self.generations: Optional[Dict[str, int]] = None
+        self.synced_until: Optional[datetime] = None
+        self.refreshed_at: float = 0.0  # monotonic time of last successful refresh
+        self.full_rebuild_at: float = 0.0
+        self.failed_at: float = 0.0
+        self._refresh_task: Optional["asyncio.Task"] = None
+        self._listeners: List = []
+
+    def subscribe(self, listener):
+        """Keep a derived index in step with the snapshot.
+
+        The listener gets clear() before a full rebuild, add(product) for
+        every product (re)loaded and remove(product_id) for every product
+        dropped. Products already loaded are replayed immediately.
+        """
+        self._listeners.append(listener)
+        for product in self.products.values():
+            listener.add(product)
+
+    # ==================== FRESHNESS ====================
+
+    @property
+    def loaded(self) -> bool:
+        return self.generations is not None
+
+    def is_usable(self) -> bool:
+        """Loaded and not stale beyond CATALOG_SNAPSHOT_MAX_STALENESS"""
+        return (
+            self.loaded
+            and time.monotonic() - self.refreshed_at <= settings.CATALOG_SNAPSHOT_MAX_STALENESS
+        )
+
+    async def ensure_fresh(self) -> bool:
+        """Bring the snapshot up to the current catalog version.
+
+        Returns False when callers should fall back to MongoDB.
+        """
+        if not settings.CATALOG_SNAPSHOT_ENABLED:
+            return False
+
+        generations = await get_generations(SNAPSHOT_NAMESPACES)
+        now = time.monotonic()
+        due = (
+            generations != self.generations
+            or now - self.refreshed_at > settings.CATALOG_SNAPSHOT_REFRESH_INTERVAL
+        )
+        if due and now - self.failed_at > REFRESH_RETRY_DELAY:
+            if self._refresh_task is None:
+                self._refresh_task = asyncio.ensure_future(self._refresh(generations))
+            try:
+                await asyncio.shield(self._refresh_task)
+            except Exception as e:
+                print(f"⚠️ Catalog snapshot refresh failed: {e}")
+        return self.is_usable()
+
+    async def _refresh(self, generations: Dict[str, int]):
+        try:
+            started = datetime.now(timezone.utc)
+            now = time.monotonic()
+            full = (
+                not self.loaded
+                or now - self.full_rebuild_at > settings.CATALOG_SNAPSHOT_FULL_REBUILD_INTERVAL
+            )
+
+            if full:
+                await self._load_all_products()
+                self.full_rebuild_at = now
+            else:
+                await self._load_changed_products()
+
+            if full or self.generations is None or (
+                generations.get(COLLECTIONS) != self.generations.get(COLLECTIONS)
+            ):
+                self.collections = await Collection.find_all().sort([("position", 1)]).to_list()
+            if full or self.generations is None or (
+                generations.get(BANNERS) != self.generations.get(BANNERS)
+            ):
+                self.banners = await HeroBanner.find_all().sort([("position", 1)]).to_list()
+
+            self.synced_until = started - SYNC_OVERLAP
+            self.generations = generations
+            self.refreshed_at = now
+        except Exception:
+            self.failed_at = time.monotonic()
+            raise
+        finally:
+            self._refresh_task = None
+
+    async def _load_all_products(self):
+        products = await Product.find_all().to_list()
+        self.products = {}
+        self.by_slug = {}
+        self.by_category = {}
+        self.by_brand = {}
+        self.by_tag = {}
+        for listener in self._listeners:
+            listener.clear()
+        for product in products:
+            self._index(product)
+
+    async def _load_changed_products(self):
+        changed = await Product.find({"updated_at": {"$gte": self.synced_until}}).to_list()
+        live_ids = await Product.get_motor_collection().distinct("_id")
+
+        live = {str(oid) for oid in live_ids}
+        for product_id in [pid for pid in self.products if pid not in live]:
+            self._unindex(product_id)
+        for product in changed:
+            self._unindex(str(product.id))
+            self._index(product)
+
+    def _index(self, product: Product):
+        product_id = str(product.id)
+        self.products[product_id] = product
+        if product.slug:
+            self.by_slug[product.slug] = product_id
+        if product.category:
+            self.by_category.setdefault(product.category, set()).add(product_id)
+        if product.brand:
+            self.by_brand.setdefault(product.brand, set()).add(product_id)
+        for tag in product.tags:
+            self.by_tag.setdefault(tag, set()).add(product_id)
+        for listener in self._listeners:
+            listener.add(product)
+
+    def _unindex(self, product_id: str):
+        product = self.products.pop(product_id, None)
+        if product is None:
+            return
+        for listener in self._listeners:
+            listener.remove(product_id)
+        if product.slug and self.by_slug.get(product.slug) == product_id:
+            del self.by_slug[product.slug]
+        for index, keys in (
+            (self.by_category, [product.category]),
+            (self.by_brand, [product.brand]),
+            (self.by_tag, product.tags),
+        ):
+            for key in keys:
+                members = index.get(key)
+                if members is None:
+                    continue
+                members.discard(product_id)
+                if not members:
+                    del index[key]
+
+    # ==================== PRODUCT READS ====================
+
+    def get(self, product_id_or_slug: str) -> Optional[Product]:
+        """Look up a product by id or slug"""
+        product = self.products.get(product_id_or_slug)
+        if product is None:
+            product_id = self.by_slug.get(product_id_or_slug)
+            if product_id is not None:
+                product = self.products.get(product_id)
+        return product
+
+    def _active(self, ids: Iterable[str]) -> List[Product]:
+        products = (self.products.get(pid) for pid in ids)
+        return [p for p in products if p is not None and p.is_active]
+
+    def list_products(
+        self,
+        category: Optional[str] = None,
+        brand: Optional[str] = None,
+        tags: Iterable[Optional[str]] = (),
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: Optional[bool] = None,
+        sort_by: Optional[str] = "created_at",
+        sort_order: Optional[str] = "desc",
+    ) -> List[Product]:
+        """Active products matching the filters, sorted like the DB query
+        (pass sort_by=None when the order doesn't matter)"""
+        candidate_sets = []
+        if category:
+            candidate_sets.append(self.by_category.get(category, set()))
+        if brand:
+            candidate_sets.append(self.by_brand.get(brand, set()))
+        for tag in tags:
+            if tag:
+                candidate_sets.append(self.by_tag.get(tag, set()))
+
+        if candidate_sets:
+            candidate_sets.sort(key=len)
+            ids = set(candidate_sets[0]).intersection(*candidate_sets[1:])
+        else:
+            ids = self.products.keys()
+
+        products = self._active(ids)
+        if min_price is not None:
+            products = [p for p in products if p.final_price >= min_price]
+        if max_price is not None:
+            products = [p for p in products if p.final_price <= max_price]
+        if in_stock is not None:
+            products = [p for p in products if p.is_in_stock == in_stock]
+
+        if sort_by is None:
+            return products
+
+        field = sort_by if sort_by in Product.model_fields else "created_at"
+        products.sort(key=lambda p: _order_key(p, field), reverse=sort_order != "asc")
+        return products
+
+    def featured(self, limit: int) -> List[Product]:
+        products = [p for p in self.products.values() if p.is_active and p.is_featured]
+        products.sort(key=lambda p: str(p.id))
+        return products[:limit]
+
+    def trending(self, limit: int) -> List[Product]:
+        return self.list_products(sort_by="sales_count", sort_order="desc")[:limit]
+
+    def related(self, product: Product, limit: int) -> List[Product]:
+        related = self._active(product.related_product_ids)
+        if related:
+            return related
+        if not product.category:
+            return []
+        same_category = [
+            p for p in self._active(self.by_category.get(product.category, ()))
+            if p.id != product.id
+        ]
+        same_category.sort(key=lambda p: str(p.id))
+        return same_category[:limit]
+
+    # ==================== TAXONOMY ====================
+
+    def categories(self) -> List[str]:
+        return sorted(c for c, ids in self.by_category.items() if self._active(ids))
+
+    def brands(self) -> List[str]:
+        return sorted(b for b, ids in self.by_brand.items() if self._active(ids))
+
+    def tags(self) -> List[str]:
+        return sorted(t for t, ids in self.by_tag.items() if self._active(ids))
+
+    def collection_product_count(self, name: str) -> int:
+        return len(self._active(self.by_tag.get(name, ())))
+
+    # ==================== COLLECTIONS & BANNERS ====================
+
+    def active_collections(self) -> List[Collection]:
+        return [c for c in self.collections if c.is_active]
+
+    def get_collection(self, collection_id: str) -> Optional[Collection]:
+        for collection in self.collections:
+            if str(collection.id) == collection_id:
+                return collection
+        return None
+
+    def active_banners(self) -> List[HeroBanner]:
+        return [b for b in self.banners if b.is_active]
+
+    # ==================== ACCOUNTING ====================
+
+    def memory_report(self) -> dict:
+        """Approximate bytes held by each part of the snapshot"""
+        seen: Set[int] = set()
+        sections = {
+            "products": self.products,
+            "slug_index": self.by_slug,
+            "category_index": self.by_category,
+            "brand_index": self.by_brand,
+            "tag_index": self.by_tag,
+            "collections": self.collections,
+            "banners": self.banners,
+        }
+        sizes = {name: _deep_sizeof(value, seen) for name, value in sections.items()}
+        age = time.monotonic() - self.refreshed_at if self.loaded else None
+        return {
+            "enabled": settings.CATALOG_SNAPSHOT_ENABLED,
+            "loaded": self.loaded,
+            "usable": self.is_usable(),
+            "age_seconds": round(age, 1) if age is not None else None,
+            "generations": self.generations,
+            "counts": {
+                "products": len(self.products),
+                "slugs": len(self.by_slug),
+                "categories": len(self.by_category),
+                "brands": len(self.by_brand),
+                "tags": len(self.by_tag),
+                "collections": len(self.collections),
+                "banners": len(self.banners),
+            },
+            "bytes": sizes,
+            "total_bytes": sum(sizes.values()),
+        }
+
+
+catalog_snapshot = CatalogSnapshot()
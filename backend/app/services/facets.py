@@ -0,0 +1,212 @@
+"""Faceted product search.
+
+One call returns a page of results plus category, brand, tag, collection and
+price-bucket counts. Facets are disjunctive: each facet's counts apply every
+active filter except its own, so the storefront can show how many products
+picking another category/brand/... would give.
+
+Served from the in-process catalog snapshot when it is usable, otherwise from
+a single $facet aggregation.
+"""
+
+from bisect import bisect_right
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.product import Product
+from app.services.catalog import is_collection_tag
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.pagination import sort_spec
+
+# Lower bounds of the price buckets (₹); the last bucket is open-ended
+PRICE_BUCKETS = [0, 500, 1000, 2000, 5000, 10000]
+
+DIMENSIONS = ("category", "brand", "tag", "collection", "price")
+
+
+def normalize_filters(
+    category: Optional[str] = None,
+    brand: Optional[str] = None,
+    tag: Optional[str] = None,
+    collection: Optional[str] = None,
+    search: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Canonical filter set, so equivalent requests share one cache entry"""
+    def clean(value: Optional[str]) -> Optional[str]:
+        value = (value or "").strip()
+        return value or None
+
+    search = clean(search)
+    return {
+        "category": clean(category),
+        "brand": clean(brand),
+        "tag": clean(tag),
+        "collection": clean(collection),
+        "search": " ".join(search.lower().split()) if search else None,
+        "min_price": round(min_price, 2) if min_price is not None else None,
+        "max_price": round(max_price, 2) if max_price is not None else None,
+        "in_stock": in_stock,
+    }
+
+
+def _empty_facets() -> Dict[str, Any]:
+    return {"categories": [], "brands": [], "tags": [], "collections": [], "price_buckets": [], "price_range": None}
+
+
+def _value_counts(counts: Dict[str, int]) -> List[Dict[str, Any]]:
+    ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return [{"value": value, "count": count} for value, count in ordered if value]
+
+
+def _price_buckets(counts: Dict[float, int]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "min": low,
+            "max": PRICE_BUCKETS[i + 1] if i + 1 < len(PRICE_BUCKETS) else None,
+            "count": counts.get(low, 0),
+        }
+        for i, low in enumerate(PRICE_BUCKETS)
+    ]
+
+
+# ==================== MONGO ====================
+
+def _dimension_matches(filters: Dict[str, Any]) -> Dict[str, Dict]:
+    matches = {}
+    if filters["category"]:
+        matches["category"] = {"category": filters["category"]}
+    if filters["brand"]:
+        matches["brand"] = {"brand": filters["brand"]}
+    if filters["tag"]:
+        matches["tag"] = {"tags": filters["tag"]}
+    if filters["collection"]:
+        matches["collection"] = {"tags": filters["collection"]}
+    price = {}
+    if filters["min_price"] is not None:
+        price["$gte"] = filters["min_price"]
+    if filters["max_price"] is not None:
+        price["$lte"] = filters["max_price"]
+    if price:
+        matches["price"] = {"final_price": price}
+    return matches
+
+
+def _match_stage(matches: Dict[str, Dict], exclude: Optional[str] = None) -> List[Dict]:
+    conditions = [m for dim, m in matches.items() if dim != exclude]
+    return [{"$match": {"$and": conditions}}] if conditions else []
+
+
+def _group_count(field: str) -> Dict:
+    return {"$group": {"_id": f"${field}", "count": {"$sum": 1}}}
+
+
+async def _mongo_facets(
+    filters: Dict[str, Any], sort_by: str, descending: bool, skip: int, limit: int
+) -> Tuple[List[Product], int, Dict[str, Any]]:
+    base: Dict[str, Any] = {"is_active": True}
+    if filters["search"]:
+        base["$text"] = {"$search": filters["search"]}
+    if filters["in_stock"] is not None:
+        base["is_in_stock"] = filters["in_stock"]
+
+    matches = _dimension_matches(filters)
+    pipeline = [
+        {"$match": base},
+        {"$facet": {
+            "results": _match_stage(matches) + [
+                {"$sort": dict(sort_spec(sort_by, descending))},
+                {"$skip": skip},
+                {"$limit": limit},
+            ],
+            "total": _match_stage(matches) + [{"$count": "count"}],
+            "categories": _match_stage(matches, "category") + [_group_count("category")],
+            "brands": _match_stage(matches, "brand") + [_group_count("brand")],
+            "tags": _match_stage(matches, "tag") + [{"$unwind": "$tags"}, _group_count("tags")],
+            "collections": _match_stage(matches, "collection") + [{"$unwind": "$tags"}, _group_count("tags")],
+            "price_buckets": _match_stage(matches, "price") + [{"$bucket": {
+                "groupBy": "$final_price",
+                "boundaries": PRICE_BUCKETS,
+                "default": PRICE_BUCKETS[-1],
+                "output": {"count": {"$sum": 1}},
+            }}],
+            "price_range": _match_stage(matches, "price") + [{"$group": {
+                "_id": None, "min": {"$min": "$final_price"}, "max": {"$max": "$final_price"},
+            }}],
+        }},
+    ]
+    docs = await Product.get_motor_collection().aggregate(pipeline).to_list(length=1)
+    if not docs:
+        return [], 0, _empty_facets()
+    doc = docs[0]
+
+    def counts(name: str) -> Dict[Any, int]:
+        return {row["_id"]: row["count"] for row in doc[name]}
+
+    price_range = doc["price_range"][0] if doc["price_range"] else None
+    facets = {
+        "categories": _value_counts(counts("categories")),
+        "brands": _value_counts(counts("brands")),
+        "tags": _value_counts(counts("tags")),
+        "collections": _value_counts({t: c for t, c in counts("collections").items() if t and is_collection_tag(t)}),
+        "price_buckets": _price_buckets(counts("price_buckets")),
+        "price_range": {"min": price_range["min"], "max": price_range["max"]} if price_range else None,
+    }
+    products = [Product.model_validate(raw) for raw in doc["results"]]
+    total = doc["total"][0]["count"] if doc["total"] else 0
+    return products, total, facets
+
+
+# ==================== SNAPSHOT ====================
+
+def _snapshot_facets(
+    filters: Dict[str, Any], sort_by: str, descending: bool, skip: int, limit: int
+) -> Tuple[List[Product], int, Dict[str, Any]]:
+    def matching(exclude: Optional[str] = None, sort: Optional[str] = None) -> List[Product]:
+        keep_price = exclude != "price"
+        return catalog_snapshot.list_products(
+            category=filters["category"] if exclude != "category" else None,
+            brand=filters["brand"] if exclude != "brand" else None,
+            tags=(
+                filters["tag"] if exclude != "tag" else None,
+                filters["collection"] if exclude != "collection" else None,
+            ),
+            min_price=filters["min_price"] if keep_price else None,
+            max_price=filters["max_price"] if keep_price else None,
+            in_stock=filters["in_stock"],
+            sort_by=sort,
+            sort_order="desc" if descending else "asc",
+        )
+
+    results = matching(sort=sort_by)
+
+    def tag_counts(products: List[Product]) -> Counter:
+        return Counter(tag for p in products for tag in p.tags)
+
+    priced = matching("price")
+    buckets = Counter(PRICE_BUCKETS[max(bisect_right(PRICE_BUCKETS, p.final_price) - 1, 0)] for p in priced)
+    prices = [p.final_price for p in priced]
+
+    facets = {
+        "categories": _value_counts(Counter(p.category for p in matching("category"))),
+        "brands": _value_counts(Counter(p.brand for p in matching("brand"))),
+        "tags": _value_counts(tag_counts(matching("tag"))),
+        "collections": _value_counts(
+            {t: c for t, c in tag_counts(matching("collection")).items() if is_collection_tag(t)}
+        ),
+        "price_buckets": _price_buckets(buckets),
+        "price_range": {"min": min(prices), "max": max(prices)} if prices else None,
+    }
+    return results[skip:skip + limit], len(results), facets
+
+
+async def faceted_search(
+    filters: Dict[str, Any], sort_by: str, descending: bool, skip: int, limit: int
+) -> Tuple[List[Product], int, Dict[str, Any]]:
+    """Result page, total and disjunctive facet counts for a normalized filter set"""
+    # $text search needs Mongo's text index
+    if not filters["search"] and await catalog_snapshot.ensure_fresh():
+        return _snapshot_facets(filters, sort_by, descending, skip, limit)
+    return await _mongo_facets(filters, sort_by, descending, skip, limit)
@@ -0,0 +1,132 @@
+"""Sparse fieldsets (`?fields=a,b,c`) for product and order reads.
+
+A requested field list is validated against the response model, turned into
+a MongoDB projection covering just the document fields those response fields
+are computed from, and used to emit a response holding only those fields.
+List pages then transfer and decode a fraction of each document.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.models.product import Product
+from app.schemas.order import OrderResponse, OrderSummary
+from app.schemas.product import ProductCard, ProductResponse
+
+# Response field -> document fields it is computed from
+PRODUCT_FIELD_SOURCES: Dict[str, Tuple[str, ...]] = {
+    **{name: (name,) for name in ProductResponse.model_fields},
+    "id": ("_id",),
+    "savings": ("price", "final_price"),
+    "savings_percentage": ("price", "final_price"),
+    "main_image": ("images",),
+}
+
+ORDER_FIELD_SOURCES: Dict[str, Tuple[str, ...]] = {
+    **{name: (name,) for name in OrderResponse.model_fields},
+    "id": ("_id",),
+    "items_count": (),  # computed by the projection itself
+}
+
+PRODUCT_FIELD_PRESETS = {"card": list(ProductCard.model_fields)}
+ORDER_FIELD_PRESETS = {"summary": list(OrderSummary.model_fields)}
+
+
+def parse_fields(
+    fields: Optional[str],
+    sources: Dict[str, Any],
+    presets: Optional[Dict[str, List[str]]] = None,
+) -> Optional[List[str]]:
+    """Validated field list from a comma-separated `fields` parameter.
+
+    None means "everything". Preset names expand to their field lists and
+    `id` is always included.
+    """
+    if not fields:
+        return None
+
+    requested = ["id"]
+    for name in (part.strip() for part in fields.split(",")):
+        if not name:
+            continue
+        requested.extend((presets or {}).get(name, [name]))
+
+    unknown = sorted({name for name in requested if name not in sources})
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown field(s): {', '.join(unknown)}"
+        )
+    return list(dict.fromkeys(requested))
+
+
+def projection(fields: Iterable[str], sources: Dict[str, Tuple[str, ...]], extra: Iterable[str] = ()) -> Dict[str, Any]:
+    """Mongo projection for the given response fields (plus extra doc fields)"""
+    spec: Dict[str, Any] = {}
+    for name in fields:
+        for source in sources[name]:
+            spec[source] = 1
+    for name in extra:
+        spec[name] = 1
+    return spec
+
+
+# ==================== PRODUCTS ====================
+
+def product_projection(fields: Iterable[str], extra: Iterable[str] = ()) -> Dict[str, Any]:
+    return projection(fields, PRODUCT_FIELD_SOURCES, extra)
+
+
+async def find_products(
+    query,
+    fields: Optional[List[str]],
+    sort: Optional[List[Tuple[str, int]]] = None,
+    skip: int = 0,
+    limit: int = 0,
+    extra: Iterable[str] = (),
+) -> List[Product]:
+    """Run a Beanie Product query, loading only what `fields` needs.
+
+    Projected documents are built with model_construct: they are partial, so
+    callers must only read the requested fields (serialize_product does).
+    """
+    if fields is None:
+        if sort:
+            query = query.sort(sort)
+        if skip:
+            query = query.skip(skip)
+        if limit:
+            query = query.limit(limit)
+        return await query.to_list()
+
+    cursor = Product.get_motor_collection().find(
+        query.get_filter_query(), product_projection(fields, extra)
+    )
+    if sort:
+        cursor = cursor.sort(sort)
+    if skip:
+        cursor = cursor.skip(skip)
+    if limit:
+        cursor = cursor.limit(limit)
+    return [Product.model_construct(**doc) for doc in await cursor.to_list(length=None)]
+
+
+# ==================== ORDERS ====================
+
+def order_projection(fields: Iterable[str], extra: Iterable[str] = ()) -> Dict[str, Any]:
+    spec = projection(fields, ORDER_FIELD_SOURCES, extra)
+    if "items_count" in fields:
+        spec["items_count"] = {"$size": {"$ifNull": ["$items", []]}}
+    return spec
+
+
+def serialize_order_doc(doc: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Requested fields from a projected raw order document"""
+    result = {}
+    for name in fields:
+        if name == "id":
+            result["id"] = str(doc["_id"])
+        else:
+            result[name] = doc.get(name)
+    return result
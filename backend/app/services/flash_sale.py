@@ -0,0 +1,362 @@
+"""Flash-sale mode for hot products (special-edition drops).
+
+A product on flash sale (Product.flash_sale) keeps a counter of sellable
+units - stock tokens - in Redis, or in an in-process stand-in when Redis is
+off. Checkout admits a buyer by atomically taking tokens for every flash
+line in one Lua call, before the product document is touched, so thousands
+of concurrent buyers contend on a Redis counter instead of one MongoDB
+document. Stock writes for admitted buyers are then coalesced by
+app.services.inventory.stock_writer (one update per product per batch).
+
+Online-payment holds on flash products are backed by the tokens rather than
+Product.reserved_stock: an expired or cancelled hold gives its tokens back,
+and a captured one only then takes the stock.
+
+Whether a line goes through tokens is decided by the counter itself: the
+take script reports products that have no counter, and those take the
+regular conditional update. Every worker therefore switches the moment a
+sale is enabled or ended. `products` is only this worker's view of what is
+on sale, refreshed from Product.flash_sale, and is used to re-seed counters
+that went missing.
+
+Tokens are seeded from MongoDB (stock - reserved_stock - active flash holds)
+when a product is put on sale, or when its counter is missing, e.g. after a
+Redis restart. The refresh loop reconciles every counter against real stock
+and only ever lowers it, because tokens taken by in-flight checkouts are
+not in MongoDB yet. Admin stock edits and short stock writes lower a
+counter straight away (cap_tokens). Put a product on sale again to raise
+its counter after a restock. Tokens are admission control only: the
+coalesced stock writes stay conditional on stock, so a counter that is too
+high fails sales rather than overselling. The in-process stand-in is per
+worker, so it is only safe with a single worker; use Redis for multi-worker
+deployments.
+"""
+
+import asyncio
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from beanie import PydanticObjectId
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.models.inventory import InventoryHold
+from app.models.product import Product
+from app.services import cache
+
+TOKEN_PREFIX = "flash:tokens:"
+
+# Per key: 1 = taken, 0 = no counter (not seeded), -1 = not enough tokens.
+# ARGV[1] = '1' for all-or-nothing: nothing is taken if any key is short.
+_TAKE_LUA = """
+local strict = ARGV[1] == '1'
+local out = {}
+local short = false
+for i, key in ipairs(KEYS) do
+    local v = redis.call('GET', key)
+    if not v then
+        out[i] = 0
+    elseif tonumber(v) < tonumber(ARGV[i + 1]) then
+        out[i] = -1
+        short = true
+    else
+        out[i] = 1
+    end
+end
+if short and strict then
+    return out
+end
+for i, key in ipairs(KEYS) do
+    if out[i] == 1 then
+        redis.call('DECRBY', key, ARGV[i + 1])
+    end
+end
+return out
+"""
+
+# Give tokens back, but never recreate a counter the sale has dropped
+_RETURN_LUA = """
+for i, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('INCRBY', key, ARGV[i])
+    end
+end
+return 1
+"""
+
+_LOWER_LUA = """
+for i, key in ipairs(KEYS) do
+    local v = redis.call('GET', key)
+    if v and tonumber(v) > tonumber(ARGV[i]) then
+        redis.call('SET', key, ARGV[i])
+    end
+end
+return 1
+"""
+
+
+def _busy(e: Exception):
+    print(f"⚠️ Flash sale token store error: {e}")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Flash sale is busy right now. Please try again"
+    )
+
+
+class FlashSale:
+    """Registry of flash-sale products and their stock tokens"""
+
+    def __init__(self):
+        self.products: Set[str] = set()
+        self._local: Dict[str, int] = {}
+        self._task: Optional["asyncio.Task"] = None
+
+    # ==================== TOKEN STORE ====================
+
+    async def _take(self, quantities: Dict[str, int], all_or_nothing: bool) -> Dict[str, int]:
+        product_ids = list(quantities)
+        if cache.redis_client is not None:
+            results = await cache.redis_client.eval(
+                _TAKE_LUA, len(product_ids),
+                *(TOKEN_PREFIX + product_id for product_id in product_ids),
+                "1" if all_or_nothing else "0",
+                *(quantities[product_id] for product_id in product_ids),
+            )
+            return {product_id: int(result) for product_id, result in zip(product_ids, results)}
+
+        results = {}
+        for product_id in product_ids:
+            tokens = self._local.get(product_id)
+            if tokens is None:
+                results[product_id] = 0
+            else:
+                results[product_id] = 1 if tokens >= quantities[product_id] else -1
+        if all_or_nothing and -1 in results.values():
+            return results
+        for product_id, result in results.items():
+            if result == 1:
+                self._local[product_id] -= quantities[product_id]
+        return results
+
+    async def return_tokens(self, quantities: Dict[str, int]):
+        """Give tokens back (failed checkout, released hold, cancelled order)"""
+        quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+        if not quantities:
+            return
+        if cache.redis_client is not None:
+            try:
+                await cache.redis_client.eval(
+                    _RETURN_LUA, len(quantities),
+                    *(TOKEN_PREFIX + product_id for product_id in quantities),
+                    *quantities.values(),
+                )
+            except Exception as e:
+                print(f"⚠️ Could not return flash sale tokens {quantities}: {e}")
+            return
+        for product_id, quantity in quantities.items():
+            if product_id in self._local:
+                self._local[product_id] += quantity
+
+    async def _set_tokens(self, tokens: Dict[str, int], only_if_missing: bool = False):
+        if cache.redis_client is not None:
+            try:
+                async with cache.redis_client.pipeline(transaction=False) as pipe:
+                    for product_id, count in tokens.items():
+                        pipe.set(TOKEN_PREFIX + product_id, count, nx=only_if_missing)
+                    await pipe.execute()
+            except Exception as e:
+                raise _busy(e)
+            return
+        for product_id, count in tokens.items():
+            if not only_if_missing or product_id not in self._local:
+                self._local[product_id] = count
+
+    async def _lower_tokens(self, tokens: Dict[str, int]):
+        if cache.redis_client is not None:
+            await cache.redis_client.eval(
+                _LOWER_LUA, len(tokens), *(TOKEN_PREFIX + product_id for product_id in tokens), *tokens.values()
+            )
+            return
+        for product_id, count in tokens.items():
+            if product_id in self._local and self._local[product_id] > count:
+                self._local[product_id] = count
+
+    async def _get_tokens(self, product_ids: List[str]) -> Dict[str, Optional[int]]:
+        if cache.redis_client is not None:
+            values = await cache.redis_client.mget([TOKEN_PREFIX + product_id for product_id in product_ids])
+            return {
+                product_id: int(value) if value is not None else None
+                for product_id, value in zip(product_ids, values)
+            }
+        return {product_id: self._local.get(product_id) for product_id in product_ids}
+
+    # ==================== SEEDING ====================
+
+    async def expected_tokens(self, product_ids: Iterable[str]) -> Dict[str, int]:
+        """Sellable units per flash product according to MongoDB"""
+        object_ids = []
+        for product_id in product_ids:
+            try:
+                object_ids.append(PydanticObjectId(product_id))
+            except Exception:
+                continue
+        if not object_ids:
+            return {}
+        docs = await Product.get_motor_collection().find(
+            {"_id": {"$in": object_ids}, "flash_sale": True}, {"stock": 1, "reserved_stock": 1}
+        ).to_list(length=None)
+        held = {
+            row["_id"]: row["quantity"]
+            async for row in InventoryHold.get_motor_collection().aggregate([
+                {"$match": {"status": "active", "product_id": {"$in": [str(doc["_id"]) for doc in docs]}, "flash": True}},
+                {"$group": {"_id": "$product_id", "quantity": {"$sum": "$quantity"}}},
+            ])
+        }
+        return {
+            str(doc["_id"]): max(
+                doc.get("stock", 0) - (doc.get("reserved_stock") or 0) - held.get(str(doc["_id"]), 0), 0
+            )
+            for doc in docs
+        }
+
+    async def _seed_missing(self, product_ids: List[str]):
+        """Create counters lost from the store; forget products no longer on sale"""
+        expected = await self.expected_tokens(product_ids)
+        self.products.difference_update(set(product_ids) - set(expected))
+        if expected:
+            await self._set_tokens(expected, only_if_missing=True)
+
+    # ==================== CHECKOUT ====================
+
+    async def take_tokens(
+        self, quantities: Dict[str, int], all_or_nothing: bool = True
+    ) -> Tuple[Dict[str, int], List[str]]:
+        """Admit a checkout: (tokens taken per flash product, flash products short of tokens)
+
+        Products without a token counter are not on flash sale and are left
+        out of both. With all_or_nothing nothing is taken when any flash
+        product is short.
+        """
+        flash = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+        if not flash or (cache.redis_client is None and not self._local):
+            return {}, []
+
+        try:
+            results = await self._take(flash, all_or_nothing)
+        except Exception as e:
+            if self.products.isdisjoint(flash):
+                # Most likely no sale at all; the conditional update still guards stock
+                print(f"⚠️ Flash sale token store error, checking out without tokens: {e}")
+                return {}, []
+            raise _busy(e)
+        if all_or_nothing and -1 in results.values():
+            return {}, [product_id for product_id, result in results.items() if result == -1]
+
+        # Counters lost from the store for products this worker knows are on sale
+        missing = [product_id for product_id, result in results.items() if result == 0 and product_id in self.products]
+        if missing:
+            await self._seed_missing(missing)
+            retry = {product_id: flash[product_id] for product_id in missing if product_id in self.products}
+            try:
+                retried = await self._take(retry, all_or_nothing) if retry else {}
+            except Exception as e:
+                await self.return_tokens({
+                    product_id: flash[product_id] for product_id, result in results.items() if result == 1
+                })
+                raise _busy(e)
+            if all_or_nothing and -1 in retried.values():
+                # Give back what the first call took
+                await self.return_tokens({
+                    product_id: flash[product_id] for product_id, result in results.items() if result == 1
+                })
+                return {}, [product_id for product_id, result in retried.items() if result == -1]
+            results.update(retried)
+
+        taken = {product_id: flash[product_id] for product_id, result in results.items() if result == 1}
+        return taken, [product_id for product_id, result in results.items() if result == -1]
+
+    # ==================== ADMIN ====================
+
+    async def enable(self, product_ids: List[str]) -> Dict[str, int]:
+        """Put products on flash sale and (re)seed their tokens from stock"""
+        object_ids = [PydanticObjectId(product_id) for product_id in product_ids]
+        await Product.get_motor_collection().update_many(
+            {"_id": {"$in": object_ids}}, {"$set": {"flash_sale": True}}
+        )
+        tokens = await self.expected_tokens(product_ids)
+        await self._set_tokens(tokens)
+        self.products.update(tokens)
+        return tokens
+
+    async def disable(self, product_ids: List[str]) -> Dict[str, int]:
+        """End the sale; returns product_id -> units of open flash holds handed to reserved_stock"""
+        object_ids = [PydanticObjectId(product_id) for product_id in product_ids]
+        await Product.get_motor_collection().update_many(
+            {"_id": {"$in": object_ids}}, {"$set": {"flash_sale": False}}
+        )
+        self.products.difference_update(product_ids)
+        if cache.redis_client is not None:
+            try:
+                await cache.redis_client.unlink(*(TOKEN_PREFIX + product_id for product_id in product_ids))
+            except Exception as e:
+                raise _busy(e)
+        for product_id in product_ids:
+            self._local.pop(product_id, None)
+
+        # Open holds become regular reservations so MongoDB accounts for them
+        from app.services.inventory import hand_over_flash_holds
+        return await hand_over_flash_holds(product_ids)
+
+    async def cap_tokens(self, product_ids: Iterable[str]):
+        """Lower counters above real stock now rather than at the next refresh"""
+        try:
+            expected = await self.expected_tokens(product_ids)
+            if expected:
+                await self._lower_tokens(expected)
+        except Exception as e:
+            print(f"⚠️ Could not lower flash sale tokens: {e}")
+
+    async def report(self) -> List[Dict]:
+        product_ids = sorted(self.products)
+        if not product_ids:
+            return []
+        tokens = await self._get_tokens(product_ids)
+        expected = await self.expected_tokens(product_ids)
+        return [
+            {"product_id": product_id, "tokens": tokens[product_id], "stock_available": expected.get(product_id)}
+            for product_id in product_ids
+        ]
+
+    # ==================== REFRESH LOOP ====================
+
+    async def refresh(self):
+        """Reload the registry from MongoDB and lower counters above real stock"""
+        docs = await Product.get_motor_collection().find({"flash_sale": True}, {"_id": 1}).to_list(length=None)
+        self.products = {str(doc["_id"]) for doc in docs}
+        if not self.products:
+            return
+        expected = await self.expected_tokens(self.products)
+        await self._set_tokens(expected, only_if_missing=True)
+        await self._lower_tokens(expected)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+                await asyncio.sleep(settings.FLASH_SALE_REFRESH_INTERVAL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Flash sale refresh error: {e}")
+                await asyncio.sleep(settings.FLASH_SALE_REFRESH_INTERVAL)
+
+
+flash_sale = FlashSale()
@@ -0,0 +1,482 @@
+"""Atomic stock decrements and TTL holds for checkout.
+
+Each of an order's lines is one conditional update (available = stock -
+reserved_stock >= qty), so two checkouts racing for the last units can
+never both succeed. The lines are sent concurrently and a line whose update
+matched nothing (not enough stock, or the product is gone) counts as failed.
+Each update also returns the product's category, brand and tags, so the
+cache namespaces serving its stock are bumped without another fetch.
+
+COD orders take stock at checkout (decrement_stock). Orders paid online
+place an InventoryHold per product instead (place_holds), which raises
+Product.reserved_stock until the payment is captured (convert_holds turns
+the reservation into a sale), the order is cancelled (release_holds) or the
+hold expires (run_hold_sweeper releases expired holds in bulk). Holds are
+flipped with a claim token, so capture and expiry racing for the same hold
+apply it exactly once. reserved_stock is a materialized sum of active
+holds; the sweeper periodically recomputes it from the holds collection.
+
+Products on flash sale (app.services.flash_sale) are admitted by stock
+tokens instead of the conditional update, and their holds are backed by the
+tokens rather than reserved_stock; stock_writer coalesces their writes.
+Those writes are still conditional on stock, so a token counter that ran
+ahead of real stock fails the sale instead of driving stock negative.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from beanie import PydanticObjectId
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.models.inventory import InventoryHold
+from app.models.product import Product
+from app.services.catalog import invalidate_product_docs, invalidate_product_ids
+from app.services.flash_sale import flash_sale
+from app.services.pricing import derived_stock_stage, stock_update_pipeline
+
+ACTIVE = "active"
+CONVERTED = "converted"
+RELEASED = "released"
+
+# Recompute reserved_stock from the holds every this many sweeps
+RECONCILE_EVERY_SWEEPS = 60
+
+Line = Tuple[str, PydanticObjectId, int]  # (product id, object id, quantity)
+Delta = Tuple[int, int, int]  # (stock, sales, reserved)
+
+# What an update needs back to know which cache namespaces to bump
+NAMESPACE_PROJECTION = {"category": 1, "brand": 1, "tags": 1}
+
+
+def stock_quantities(lines: Iterable) -> Dict[str, int]:
+    """product_id -> total quantity for cart lines or order items"""
+    quantities: Dict[str, int] = {}
+    for line in lines:
+        quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+    return quantities
+
+
+def _object_ids(quantities: Dict[str, int]) -> Tuple[List[Line], List[str]]:
+    valid, invalid = [], []
+    for product_id, quantity in quantities.items():
+        try:
+            valid.append((product_id, PydanticObjectId(product_id), quantity))
+        except Exception:
+            invalid.append(product_id)
+    return valid, invalid
+
+
+def _stock_at_least(quantity: int) -> Dict:
+    return {"stock": {"$gte": quantity}}
+
+
+def _available_at_least(quantity: int) -> Dict:
+    available = {"$subtract": ["$stock", {"$ifNull": ["$reserved_stock", 0]}]}
+    return {"$expr": {"$gte": [available, quantity]}}
+
+
+async def _update_stock(updates: List[Tuple[str, PydanticObjectId, Dict, Delta]]) -> List[Optional[Dict]]:
+    """Apply (product id, object id, condition, delta) updates concurrently.
+
+    Returns each product's namespace fields, or None where the condition
+    (or the product) didn't match.
+
+    One find_one_and_update per line rather than one bulk_write: a bulk
+    result only counts matches, so telling which lines failed would take
+    upserts (stub products when one was deleted) or a re-read that races
+    other checkouts, and the cache namespaces would need another fetch.
+    Sent together they cost about one round trip of latency, for N
+    operations on the server; an all-or-nothing checkout that loses some
+    lines undoes the others with compensating updates (decrement_stock).
+    """
+    collection = Product.get_motor_collection()
+    docs = await asyncio.gather(*(
+        collection.find_one_and_update(
+            {"_id": object_id, **condition}, stock_update_pipeline(*delta), projection=NAMESPACE_PROJECTION
+        )
+        for _, object_id, condition, delta in updates
+    ))
+    await invalidate_product_docs(doc for doc in docs if doc is not None)
+    return docs
+
+
+async def _conditional_updates(lines: List[Line], delta: Callable[[int], Delta]) -> Set[int]:
+    """Apply delta(qty) where enough stock is available; returns failed indexes"""
+    docs = await _update_stock([
+        (product_id, object_id, _available_at_least(quantity), delta(quantity))
+        for product_id, object_id, quantity in lines
+    ])
+    return {index for index, doc in enumerate(docs) if doc is None}
+
+
+async def _apply(changes: Dict[str, Delta], conditional: bool = False) -> List[str]:
+    """(stock, sales, reserved) deltas per product; returns the ids not written.
+
+    Unconditional by default. With conditional, a stock decrement only
+    applies while it leaves stock at or above zero.
+    """
+    changes = {product_id: delta for product_id, delta in changes.items() if any(delta)}
+    lines, invalid = _object_ids({product_id: 0 for product_id in changes})
+    if not lines:
+        return invalid
+    docs = await _update_stock([
+        (
+            product_id,
+            object_id,
+            _stock_at_least(-changes[product_id][0]) if conditional and changes[product_id][0] < 0 else {},
+            changes[product_id],
+        )
+        for product_id, object_id, _ in lines
+    ])
+    return invalid + [product_id for (product_id, _, _), doc in zip(lines, docs) if doc is None]
+
+
+class StockWriter:
+    """Coalesces stock deltas for flash-sale products into one update per product per batch.
+
+    Deltas queued within FLASH_SALE_BATCH_WINDOW are summed per product and
+    written in one round of updates; every caller awaits the batch its delta
+    went out in. Buyers were admitted by stock tokens, but the writes stay
+    conditional on stock: when a product's summed decrement doesn't fit,
+    its callers are retried one by one in queue order, the ones that still
+    don't fit are told their product was short, and its token counter is
+    lowered to real stock.
+    """
+
+    def __init__(self):
+        self._queue: Optional["asyncio.Queue"] = None
+        self._task: Optional["asyncio.Task"] = None
+        self._batch: List[Tuple[Dict[str, Delta], "asyncio.Future"]] = []
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker and write whatever is still queued"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        while not self._queue.empty():
+            self._batch.append(self._queue.get_nowait())
+        await self._write()
+
+    async def apply(self, changes: Dict[str, Delta]) -> List[str]:
+        """Queue (stock, sales, reserved) deltas and wait until they are written;
+        returns the ids whose stock was short"""
+        if self._task is None:
+            short = await _apply(changes, conditional=True)
+            if short:
+                await _report_short(short)
+            return short
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((changes, future))
+        return await future
+
+    async def _write(self):
+        batch, self._batch = self._batch, []
+        merged: Dict[str, Delta] = {}
+        for changes, _ in batch:
+            for product_id, delta in changes.items():
+                merged[product_id] = tuple(a + b for a, b in zip(merged.get(product_id, (0, 0, 0)), delta))
+        short: List[List[str]] = [[] for _ in batch]
+        try:
+            error = None
+            merged_short = await _apply(merged, conditional=True)
+            for product_id in merged_short:
+                for index, (changes, _) in enumerate(batch):
+                    if product_id in changes and await _apply({product_id: changes[product_id]}, conditional=True):
+                        short[index].append(product_id)
+            if merged_short:
+                await _report_short(merged_short)
+        except Exception as e:
+            error = e
+        for index, (_, future) in enumerate(batch):
+            if not future.done():
+                if error is None:
+                    future.set_result(short[index])
+                else:
+                    future.set_exception(error)
+
+    async def _run(self):
+        while True:
+            self._batch.append(await self._queue.get())
+            await asyncio.sleep(settings.FLASH_SALE_BATCH_WINDOW)
+            while not self._queue.empty():
+                self._batch.append(self._queue.get_nowait())
+            await self._write()
+
+
+stock_writer = StockWriter()
+
+
+async def _report_short(product_ids: List[str]):
+    """Tokens outran stock (e.g. an admin stock edit): lower the counters now"""
+    print(f"⚠️ Flash sale stock ran short on {', '.join(sorted(product_ids))}; lowering tokens")
+    await flash_sale.cap_tokens(product_ids)
+
+
+# ==================== STOCK ====================
+
+async def decrement_stock(quantities: Dict[str, int], all_or_nothing: bool = True) -> List[str]:
+    """Take stock (and count the sale) for every product; returns the ids that failed"""
+    # Flash-sale products are admitted by tokens before MongoDB is touched
+    flash, failed = await flash_sale.take_tokens(quantities, all_or_nothing)
+    if failed and all_or_nothing:
+        return failed
+
+    lines, invalid = _object_ids({
+        product_id: quantity for product_id, quantity in quantities.items()
+        if product_id not in flash and product_id not in failed
+    })
+    failed += invalid
+    failed_indexes: Set[int] = set()
+    if lines and not (failed and all_or_nothing):
+        failed_indexes = await _conditional_updates(lines, lambda quantity: (-quantity, quantity, 0))
+        failed += [lines[index][0] for index in sorted(failed_indexes)]
+    taken = {
+        product_id: quantity
+        for index, (product_id, _, quantity) in enumerate(lines)
+        if index not in failed_indexes
+    }
+    if failed and all_or_nothing:
+        if failed_indexes:
+            await _apply({product_id: (quantity, -quantity, 0) for product_id, quantity in taken.items()})
+        await flash_sale.return_tokens(flash)
+        return failed
+
+    if flash:
+        try:
+            short = await stock_writer.apply({product_id: (-quantity, quantity, 0) for product_id, quantity in flash.items()})
+        except Exception:
+            await flash_sale.return_tokens(flash)
+            await _apply({product_id: (quantity, -quantity, 0) for product_id, quantity in taken.items()})
+            raise
+        if short:
+            failed += short
+            if all_or_nothing:
+                written = {product_id: quantity for product_id, quantity in flash.items() if product_id not in short}
+                await restore_stock({**taken, **written})
+    return failed
+
+
+async def restore_stock(quantities: Dict[str, int]):
+    """Put stock back (and uncount the sale), e.g. for a cancelled order"""
+    await _apply({product_id: (quantity, -quantity, 0) for product_id, quantity in quantities.items()})
+    # Products on flash sale get their tokens back too (a no-op for the rest)
+    await flash_sale.return_tokens(quantities)
+
+
+# ==================== HOLDS ====================
+
+async def place_holds(order_number: str, quantities: Dict[str, int]) -> List[str]:
+    """Reserve every product for an unpaid order, all-or-nothing; returns the ids that failed"""
+    # Flash-sale products are held by their tokens alone
+    flash, failed = await flash_sale.take_tokens(quantities)
+    if failed:
+        return failed
+    lines, failed = _object_ids({
+        product_id: quantity for product_id, quantity in quantities.items() if product_id not in flash
+    })
+    if failed:
+        await flash_sale.return_tokens(flash)
+        return failed
+
+    # Hold documents go in first, so reserved_stock never exceeds what the
+    # holds account for and reconciliation can only err towards reserving
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.INVENTORY_HOLD_MINUTES)
+    holds = [
+        InventoryHold(order_number=order_number, product_id=product_id, quantity=quantity, expires_at=expires_at)
+        for product_id, _, quantity in lines
+    ] + [
+        InventoryHold(order_number=order_number, product_id=product_id, quantity=quantity, expires_at=expires_at, flash=True)
+        for product_id, quantity in flash.items()
+    ]
+    if not holds:
+        return []
+
+    # Until the reservations are in, a failure must take the holds back out:
+    # left behind, their release or expiry would subtract reservations that
+    # were never added. Holds go first, then the reservation is undone, so
+    # an error half way leaves reserved_stock too high (safe; reconciled).
+    try:
+        await InventoryHold.insert_many(holds)
+        failed_indexes = set()
+        if lines:
+            failed_indexes = await _conditional_updates(lines, lambda quantity: (0, 0, quantity))
+    except Exception:
+        await _drop_holds(order_number, flash)
+        raise
+    if failed_indexes:
+        await _drop_holds(order_number, flash)
+        await _apply({
+            product_id: (0, 0, -quantity)
+            for index, (product_id, _, quantity) in enumerate(lines)
+            if index not in failed_indexes
+        })
+        return [lines[index][0] for index in sorted(failed_indexes)]
+    return []
+
+
+async def _drop_holds(order_number: str, flash: Dict[str, int]):
+    """Delete an order's just-placed holds and give back its flash tokens"""
+    await InventoryHold.get_motor_collection().delete_many({"order_number": order_number, "status": ACTIVE})
+    await flash_sale.return_tokens(flash)
+
+
+async def _claim_holds(query: Dict, status: str) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """Flip matching active holds to status.
+
+    Returns product_id -> quantity of the holds this call flipped, as
+    (regular holds, flash-sale holds).
+    """
+    collection = InventoryHold.get_motor_collection()
+    claim = str(ObjectId())
+    await collection.update_many(
+        {**query, "status": ACTIVE},
+        {"$set": {"status": status, "claim": claim, "closed_at": datetime.now(timezone.utc)}},
+    )
+    regular: Dict[str, int] = {}
+    flash: Dict[str, int] = {}
+    async for hold in collection.find({"claim": claim}, {"product_id": 1, "quantity": 1, "flash": 1}):
+        quantities = flash if hold.get("flash") else regular
+        quantities[hold["product_id"]] = quantities.get(hold["product_id"], 0) + hold["quantity"]
+    return regular, flash
+
+
+async def convert_holds(order_number: str, quantities: Dict[str, int]) -> List[str]:
+    """Turn a paid order's holds into sales; returns ids that could not be fulfilled"""
+    regular, flash = await _claim_holds({"order_number": order_number}, CONVERTED)
+    if regular:
+        await _apply({product_id: (-quantity, quantity, -quantity) for product_id, quantity in regular.items()})
+    short = []
+    if flash:
+        short = await stock_writer.apply({product_id: (-quantity, quantity, 0) for product_id, quantity in flash.items()})
+
+    # Lines whose hold expired before payment take stock directly, if any is left
+    held = {product_id: regular.get(product_id, 0) + flash.get(product_id, 0) for product_id in quantities}
+    remaining = {
+        product_id: quantity - held[product_id]
+        for product_id, quantity in quantities.items()
+        if quantity > held[product_id]
+    }
+    if remaining:
+        short += await decrement_stock(remaining, all_or_nothing=False)
+    return list(dict.fromkeys(short))
+
+
+async def _release(regular: Dict[str, int], flash: Dict[str, int]):
+    if regular:
+        await _apply({product_id: (0, 0, -quantity) for product_id, quantity in regular.items()})
+    if flash:
+        await flash_sale.return_tokens(flash)
+
+
+async def release_holds(order_number: str):
+    """Release an unpaid order's holds (e.g. it was cancelled)"""
+    await _release(*await _claim_holds({"order_number": order_number}, RELEASED))
+
+
+async def release_expired_holds() -> int:
+    """Release every expired hold in bulk; returns the units released"""
+    regular, flash = await _claim_holds({"expires_at": {"$lte": datetime.now(timezone.utc)}}, RELEASED)
+    await _release(regular, flash)
+    return sum(regular.values()) + sum(flash.values())
+
+
+async def hand_over_flash_holds(product_ids: List[str]) -> Dict[str, int]:
+    """Turn open flash-sale holds into regular reservations when a sale ends"""
+    collection = InventoryHold.get_motor_collection()
+    claim = str(ObjectId())
+    await collection.update_many(
+        {"product_id": {"$in": product_ids}, "status": ACTIVE, "flash": True},
+        {"$set": {"flash": False, "claim": claim}},
+    )
+    reserved: Dict[str, int] = {}
+    async for hold in collection.find({"claim": claim}, {"product_id": 1, "quantity": 1}):
+        reserved[hold["product_id"]] = reserved.get(hold["product_id"], 0) + hold["quantity"]
+    await _apply({product_id: (0, 0, quantity) for product_id, quantity in reserved.items()})
+    return reserved
+
+
+async def active_hold_quantities() -> Dict[str, int]:
+    """product_id -> units in active regular holds (served by the (status, product_id) index)"""
+    rows = InventoryHold.get_motor_collection().aggregate([
+        {"$match": {"status": ACTIVE, "flash": {"$ne": True}}},
+        {"$group": {"_id": "$product_id", "quantity": {"$sum": "$quantity"}}},
+    ])
+    return {row["_id"]: row["quantity"] async for row in rows}
+
+
+async def reconcile_reserved_stock() -> int:
+    """Recompute reserved_stock from active holds; returns products repaired.
+
+    Counters are read before the holds and only overwritten if unchanged
+    since (compare-and-set). Products with holds placed or closed in the last
+    minute are skipped, since their counter update may still be in flight.
+    """
+    stored = {
+        str(doc["_id"]): doc.get("reserved_stock") or 0
+        async for doc in Product.get_motor_collection().find(
+            {"reserved_stock": {"$nin": [0, None]}}, {"reserved_stock": 1}
+        )
+    }
+    expected = await active_hold_quantities()
+    recent = datetime.now(timezone.utc) - timedelta(minutes=1)
+    busy = set(await InventoryHold.get_motor_collection().distinct(
+        "product_id", {"$or": [{"created_at": {"$gte": recent}}, {"closed_at": {"$gte": recent}}]}
+    ))
+
+    operations = []
+    repaired = []
+    for product_id in (set(stored) | set(expected)) - busy:
+        reserved = expected.get(product_id, 0)
+        observed = stored.get(product_id, 0)
+        if observed == reserved:
+            continue
+        try:
+            object_id = PydanticObjectId(product_id)
+        except Exception:
+            continue
+        observed_filter = {"$in": [0, None]} if observed == 0 else observed
+        operations.append(UpdateOne(
+            {"_id": object_id, "reserved_stock": observed_filter},
+            [{"$set": {"reserved_stock": reserved, "updated_at": "$$NOW"}}, derived_stock_stage()],
+        ))
+        repaired.append(product_id)
+
+    if operations:
+        await Product.get_motor_collection().bulk_write(operations, ordered=False)
+        await invalidate_product_ids(repaired)
+    return len(repaired)
+
+
+async def run_hold_sweeper():
+    """Release expired holds every INVENTORY_HOLD_SWEEP_INTERVAL; reconcile now and then"""
+    sweeps = 0
+    while True:
+        try:
+            if sweeps % RECONCILE_EVERY_SWEEPS == 0:
+                repaired = await reconcile_reserved_stock()
+                if repaired:
+                    print(f"📦 Reconciled reserved stock on {repaired} products")
+            released = await release_expired_holds()
+            if released:
+                print(f"📦 Released {released} units from expired inventory holds")
+            sweeps += 1
+            await asyncio.sleep(settings.INVENTORY_HOLD_SWEEP_INTERVAL)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Inventory hold sweeper error: {e}")
+            await asyncio.sleep(60)
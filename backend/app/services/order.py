@@ -1,15 +1,57 @@
-import random
-import string
+import asyncio
 from datetime import datetime
-from typing import Optional
-
-def generate_order_number() -> str:
-    """Generate unique order number - Shorter format"""
-    # Use only date (YYMMDD) instead of full timestamp
-    date_str = datetime.utcnow().strftime("%y%m%d")
-    # Use 4 random chars instead of 6
-    random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-    return f"ORD{date_str}{random_str}"
+from typing import Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from app.models.counter import Counter
+
+# Order numbers are ORD + YYMMDD + a zero-padded per-day sequence, e.g.
+# ORD26101700042. Each worker reserves ORDER_NUMBER_BLOCK numbers at a time
+# with one atomic $inc on that day's counter document, so numbers are unique
+# without retries and inserts land at the right-hand end of the
+# order_number index instead of at random positions. Numbers left unused in
+# a block when a worker stops are skipped (gaps, never duplicates).
+ORDER_NUMBER_BLOCK = 20
+ORDER_SEQUENCE_DIGITS = 5
+
+
+class OrderNumberAllocator:
+    """Hands out numbers from this worker's block of the day's sequence"""
+
+    def __init__(self, block: int = ORDER_NUMBER_BLOCK):
+        self.block = block
+        self._day: Optional[str] = None
+        self._next = 0
+        self._end = 0  # Last number in the current block
+        self._lock = asyncio.Lock()
+
+    async def _reserve_block(self, day: str) -> Tuple[int, int]:
+        counter = await Counter.get_motor_collection().find_one_and_update(
+            {"_id": f"order_number:{day}"},
+            {"$inc": {"value": self.block}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return counter["value"] - self.block + 1, counter["value"]
+
+    async def next(self) -> str:
+        day = datetime.utcnow().strftime("%y%m%d")
+        async with self._lock:
+            if day != self._day or self._next > self._end:
+                self._next, self._end = await self._reserve_block(day)
+                self._day = day
+            sequence = self._next
+            self._next += 1
+        return f"ORD{day}{sequence:0{ORDER_SEQUENCE_DIGITS}d}"
+
+
+order_numbers = OrderNumberAllocator()
+
+
+async def generate_order_number() -> str:
+    """Generate unique order number - ORD + date + per-day sequence"""
+    return await order_numbers.next()
 
 def calculate_order_totals(subtotal: float) -> dict:
     """Calculate shipping, platform fee and total"""
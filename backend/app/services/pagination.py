@@ -0,0 +1,96 @@
+"""Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token holding the sort value and _id of the
+last item on a page. The next page is everything strictly after that pair in
+(sort field, _id) order, which an index on the sort field serves directly -
+no skip, so deep pages cost the same as the first one.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from beanie import PydanticObjectId
+from fastapi import HTTPException, status
+
+from app.services.cache import get_or_set, versioned_key
+
+COUNT_TTL = 300  # Cached totals; writes bump the namespaces anyway
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(sort_value: Any, doc_id: Any) -> str:
+    """Opaque cursor pointing just after (sort_value, doc_id)"""
+    payload = json.dumps([_encode_value(sort_value), str(doc_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, PydanticObjectId]:
+    """Inverse of encode_cursor; 400 on anything malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return _decode_value(sort_value), PydanticObjectId(doc_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def sort_spec(field: str, descending: bool) -> List[Tuple[str, int]]:
+    """Sort on field with _id as the tie-breaker, both in the same direction"""
+    direction = -1 if descending else 1
+    return [(field, direction), ("_id", direction)]
+
+
+def keyset_filter(field: str, descending: bool, cursor: str) -> Dict:
+    """Mongo filter for documents after the cursor in sort_spec order"""
+    sort_value, doc_id = decode_cursor(cursor)
+    after = "$lt" if descending else "$gt"
+    tie = {field: sort_value, "_id": {after: doc_id}}
+
+    # Mongo orders null/missing before every other value
+    if sort_value is None:
+        if descending:
+            return tie
+        return {"$or": [{field: {"$ne": None}}, tie]}
+
+    beyond = {field: {after: sort_value}}
+    if descending:
+        beyond = {"$or": [beyond, {field: None}]}
+    return {"$or": [beyond, tie]}
+
+
+def next_cursor(items: List[Any], limit: int, field: str) -> Tuple[List[Any], Optional[str]]:
+    """Trim a limit+1 fetch (documents or raw dicts) to the page and build the next cursor"""
+    if len(items) <= limit:
+        return items, None
+    page = items[:limit]
+    last = page[-1]
+    if isinstance(last, dict):
+        return page, encode_cursor(last.get(field), last["_id"])
+    return page, encode_cursor(getattr(last, field, None), last.id)
+
+
+async def cached_count(
+    prefix: str,
+    namespaces: Iterable[str],
+    counter: Callable[[], Awaitable[int]],
+    *parts: Any,
+) -> int:
+    """Count for a filter set, cached until one of its namespaces is bumped"""
+    key = await versioned_key(f"{prefix}:count", namespaces, *parts)
+    return await get_or_set(key, counter, expire=COUNT_TTL)
@@ -0,0 +1,170 @@
+"""Keep the materialized price/stock fields on Product current.
+
+Product.sync_derived_fields recomputes final_price, total_stock and
+is_in_stock on every save. Two things bypass it:
+
+* raw stock updates (``$inc`` through motor) - use stock_update_pipeline so
+  the derived stock fields are recomputed inside the same update;
+* time passing - a scheduled discount starts or ends without any write, so
+  run_discount_scheduler reprices the affected products at each boundary.
+
+Repricing never re-saves a product: checkouts change stock, sales_count and
+reserved_stock with atomic updates, and a whole-document save would undo any
+that landed after the load. Only the derived fields are $set, and only while
+the price inputs are still the ones the new final_price was computed from.
+Admin edits to loaded products go through save_product_fields for the same
+reason.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument, UpdateOne
+
+from app.models.product import Product
+from app.services.catalog import invalidate_products
+
+# Upper bound on how long the scheduler sleeps, so discounts created or
+# edited on another worker are still picked up promptly
+MAX_SCHEDULER_SLEEP = 300
+
+# Inputs of Product.compute_final_price
+PRICE_FIELDS = (
+    "price", "sale_price", "discount_percentage", "discount_amount",
+    "discount_active", "discount_starts_at", "discount_ends_at",
+)
+
+
+def derived_stock_stage() -> Dict:
+    """Pipeline stage recomputing total_stock / is_in_stock from stock fields"""
+    on_hand = {"$cond": ["$has_variants", {"$sum": "$variants.stock"}, "$stock"]}
+    total = {"$max": [{"$subtract": [on_hand, {"$ifNull": ["$reserved_stock", 0]}]}, 0]}
+    return {"$set": {"total_stock": total, "is_in_stock": {"$gt": [total, 0]}}}
+
+
+def stock_update_pipeline(stock_delta: int, sales_delta: int = 0, reserved_delta: int = 0) -> List[Dict]:
+    """Update pipeline adding to stock (sales, holds) that keeps derived fields in sync"""
+    return [
+        {
+            "$set": {
+                "stock": {"$add": ["$stock", stock_delta]},
+                "sales_count": {"$add": [{"$ifNull": ["$sales_count", 0]}, sales_delta]},
+                "reserved_stock": {"$add": [{"$ifNull": ["$reserved_stock", 0]}, reserved_delta]},
+                "updated_at": "$$NOW",
+            }
+        },
+        derived_stock_stage(),
+    ]
+
+
+async def save_product_fields(product: Product, *fields: str) -> Product:
+    """Persist only the named fields of an edited product; returns it as stored.
+
+    save() would write the whole loaded document back over stock,
+    reserved_stock, sales_count, views_count and the review aggregates,
+    which are updated atomically in the meantime. This $sets just the
+    edited fields and recomputes the derived fields in the same update.
+    """
+    values = product.model_dump(include=set(fields))
+    doc = await Product.get_motor_collection().find_one_and_update(
+        {"_id": product.id},
+        [
+            {
+                "$set": {
+                    # $literal: values starting with "$" are not field paths
+                    **{field: {"$literal": value} for field, value in values.items()},
+                    "final_price": product.compute_final_price(),
+                    "updated_at": "$$NOW",
+                }
+            },
+            derived_stock_stage(),
+        ],
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    return Product.model_validate(doc)
+
+
+async def reprice_products(query: Dict) -> List[Product]:
+    """Write the current final_price (and derived stock fields) where stale; returns products changed"""
+    operations = []
+    repriced = []
+    async for doc in Product.get_motor_collection().find(query):
+        # Loading recomputes the derived fields for the current time
+        product = Product.model_validate(doc)
+        if doc.get("final_price") == product.final_price and "total_stock" in doc:
+            continue
+        operations.append(UpdateOne(
+            {"_id": doc["_id"], **{field: doc.get(field) for field in PRICE_FIELDS}},
+            [{"$set": {"final_price": product.final_price, "updated_at": "$$NOW"}}, derived_stock_stage()],
+        ))
+        repriced.append(product)
+
+    if operations:
+        await Product.get_motor_collection().bulk_write(operations, ordered=False)
+        await invalidate_products(repriced)
+    return repriced
+
+
+async def refresh_discount_boundaries(since: datetime, until: datetime) -> int:
+    """Reprice products whose discount started or ended in (since, until]"""
+    repriced = await reprice_products({
+        "discount_active": True,
+        "$or": [
+            {"discount_starts_at": {"$gt": since, "$lte": until}},
+            {"discount_ends_at": {"$gt": since, "$lte": until}},
+        ],
+    })
+    return len(repriced)
+
+
+async def next_discount_boundary(after: datetime) -> Optional[datetime]:
+    """Earliest discount start/end strictly after the given time"""
+    boundaries = []
+    for field in ("discount_starts_at", "discount_ends_at"):
+        product = await Product.find(
+            {"discount_active": True, field: {"$gt": after}}
+        ).sort([(field, 1)]).first_or_none()
+        if product:
+            value = getattr(product, field)
+            boundaries.append(value if value.tzinfo else value.replace(tzinfo=timezone.utc))
+    return min(boundaries) if boundaries else None
+
+
+async def backfill_derived_fields() -> int:
+    """Startup pass: products saved before the derived fields existed, plus
+    scheduled discounts whose boundary passed while the service was down"""
+    missing = await reprice_products({"final_price": {"$exists": False}})
+    # Only products whose stored final_price is stale are written
+    scheduled = await reprice_products({
+        "discount_active": True,
+        "$or": [{"discount_starts_at": {"$ne": None}}, {"discount_ends_at": {"$ne": None}}],
+    })
+    return len(missing) + len(scheduled)
+
+
+async def run_discount_scheduler():
+    """Refresh final_price at every discount_starts_at / discount_ends_at"""
+    last_run = datetime.now(timezone.utc)
+    while True:
+        try:
+            upcoming = await next_discount_boundary(last_run)
+            sleep_for = MAX_SCHEDULER_SLEEP
+            if upcoming is not None:
+                sleep_for = min(sleep_for, (upcoming - datetime.now(timezone.utc)).total_seconds())
+            # Boundaries are compared with $gt, so wake just after them
+            await asyncio.sleep(max(sleep_for, 0) + 0.5)
+
+            now = datetime.now(timezone.utc)
+            repriced = await refresh_discount_boundaries(last_run, now)
+            if repriced:
+                print(f"💰 Repriced {repriced} products at discount boundaries")
+            last_run = now
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Discount scheduler error: {e}")
+            await asyncio.sleep(30)
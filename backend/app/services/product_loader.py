@@ -0,0 +1,85 @@
+"""Request-scoped batching loader for products (DataLoader pattern).
+
+Every `load()` made in the same event-loop tick is coalesced into a single
+`{"_id": {"$in": [...]}}` query. Ids are deduplicated and results cached for
+the lifetime of the loader, so a route looping over cart lines or wishlist
+items costs one round trip instead of one per item.
+
+Use one loader per request (the `get_product_loader` dependency is cached by
+FastAPI for the duration of a request) or per background job run; never share
+one across requests, as it would serve stale documents.
+"""
+
+import asyncio
+from typing import Dict, Iterable, List, Optional
+
+from beanie import PydanticObjectId
+
+from app.models.product import Product
+from app.services.fieldsets import find_products
+
+
+class ProductLoader:
+    """Batches and caches Product lookups by id.
+
+    With `fields`, documents are loaded through the sparse-fieldset
+    projection (plus any `extra` document fields) and are partial.
+    """
+
+    def __init__(self, fields: Optional[List[str]] = None, extra: Iterable[str] = ()):
+        self.fields = fields
+        self.extra = tuple(extra)
+        self._cache: Dict[str, "asyncio.Future[Optional[Product]]"] = {}
+        self._queue: List[str] = []
+
+    def load(self, product_id) -> "asyncio.Future[Optional[Product]]":
+        """Awaitable resolving to the product, or None if missing/invalid"""
+        key = str(product_id)
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._cache[key] = future
+            if not self._queue:
+                # Dispatch once the current tick has queued everything
+                loop.call_soon(self._dispatch)
+            self._queue.append(key)
+        return future
+
+    async def load_many(self, product_ids: Iterable) -> List[Optional[Product]]:
+        """Products in the order requested (None where missing)"""
+        return list(await asyncio.gather(*(self.load(product_id) for product_id in product_ids)))
+
+    def _dispatch(self):
+        batch, self._queue = self._queue, []
+        asyncio.ensure_future(self._fetch(batch))
+
+    async def _fetch(self, keys: List[str]):
+        object_ids = []
+        for key in keys:
+            try:
+                object_ids.append(PydanticObjectId(key))
+            except Exception:
+                continue
+
+        try:
+            products = await find_products(
+                Product.find({"_id": {"$in": object_ids}}), self.fields, extra=self.extra
+            ) if object_ids else []
+        except Exception as e:
+            for key in keys:
+                future = self._cache.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        found = {str(product.id): product for product in products}
+        for key in keys:
+            future = self._cache[key]
+            if not future.done():
+                future.set_result(found.get(key))
+
+
+def get_product_loader() -> ProductLoader:
+    """FastAPI dependency: one full-document loader per request"""
+    return ProductLoader()
@@ -0,0 +1,68 @@
+"""Purchase lookups answered from the orders collection's item indexes.
+
+Orders carry a multikey compound index on (user_id, items.product_id,
+status), so "has this user received this product" is a single index probe
+via $elemMatch instead of loading and walking the user's order history.
+(items.product_id, created_at) serves per-product analytics.
+"""
+
+from typing import Dict, List
+
+from app.models.order import Order
+
+# Orders that count as a purchase for analytics
+PAID_STATUSES = ["paid", "cod"]
+
+
+async def has_received_product(user_id: str, product_id: str) -> bool:
+    """Whether the user has a delivered order containing the product"""
+    order = await Order.get_motor_collection().find_one(
+        {
+            "user_id": user_id,
+            "status": "delivered",
+            "items": {"$elemMatch": {"product_id": product_id}},
+        },
+        {"_id": 1},
+    )
+    return order is not None
+
+
+async def purchased_product_ids(user_id: str, limit: int = 20) -> List[str]:
+    """Products from the user's delivered orders, most recently ordered first"""
+    rows = await Order.get_motor_collection().aggregate([
+        {"$match": {"user_id": user_id, "status": "delivered"}},
+        {"$unwind": "$items"},
+        {"$group": {"_id": "$items.product_id", "last_ordered": {"$max": "$created_at"}}},
+        {"$sort": {"last_ordered": -1, "_id": 1}},
+        {"$limit": limit},
+    ]).to_list(length=limit)
+    return [row["_id"] for row in rows]
+
+
+async def product_purchase_summary(product_id: str) -> Dict:
+    """Paid orders, units and distinct buyers for one product"""
+    rows = await Order.get_motor_collection().aggregate([
+        {"$match": {
+            "items.product_id": product_id,
+            "payment_status": {"$in": PAID_STATUSES},
+        }},
+        {"$unwind": "$items"},
+        {"$match": {"items.product_id": product_id}},
+        {"$group": {
+            "_id": None,
+            "orders": {"$addToSet": "$_id"},
+            "buyers": {"$addToSet": "$user_id"},
+            "units": {"$sum": "$items.quantity"},
+            "revenue": {"$sum": "$items.subtotal"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "orders": {"$size": "$orders"},
+            "buyers": {"$size": "$buyers"},
+            "units": 1,
+            "revenue": 1,
+        }},
+    ]).to_list(length=1)
+    summary = rows[0] if rows else {"orders": 0, "buyers": 0, "units": 0, "revenue": 0.0}
+    summary["revenue"] = round(summary["revenue"], 2)
+    return {"product_id": product_id, **summary}
@@ -0,0 +1,162 @@
+"""Incrementally maintained review aggregates on Product.
+
+Each product stores rating_sum, reviews_count and a per-star
+rating_histogram ({"1": n, ..., "5": n}). Every review write applies its
+delta in one atomic update pipeline that also recomputes the rounded
+`rating` search filters and sorts on (see the (is_active, rating) index).
+Stats reads are a single projected lookup regardless of review volume.
+
+Deltas can drift if a process dies between the review write and the product
+update, so run_rating_reconciler periodically recomputes the aggregates from
+the reviews collection and repairs any product that disagrees.
+"""
+
+import asyncio
+from typing import Dict, List, Optional
+
+from beanie import PydanticObjectId
+from pymongo import UpdateOne
+
+from app.models.product import Product
+from app.models.review import Review
+from app.services.catalog import invalidate_ratings
+
+STARS = ("1", "2", "3", "4", "5")
+
+# Reconciliation period
+RECONCILE_INTERVAL = 6 * 60 * 60
+
+
+def empty_histogram() -> Dict[str, int]:
+    return {star: 0 for star in STARS}
+
+
+def rating_update_pipeline(added: Optional[int] = None, removed: Optional[int] = None) -> List[Dict]:
+    """Update pipeline adding one rating and/or removing another"""
+    sum_delta = (added or 0) - (removed or 0)
+    count_delta = (added is not None) - (removed is not None)
+    star_deltas: Dict[str, int] = {}
+    if added is not None:
+        star_deltas[str(added)] = star_deltas.get(str(added), 0) + 1
+    if removed is not None:
+        star_deltas[str(removed)] = star_deltas.get(str(removed), 0) - 1
+
+    histogram = {
+        star: {"$add": [{"$ifNull": [f"$rating_histogram.{star}", 0]}, star_deltas.get(star, 0)]}
+        for star in STARS
+    }
+    return [
+        {
+            "$set": {
+                "rating_sum": {"$add": [{"$ifNull": ["$rating_sum", 0]}, sum_delta]},
+                "reviews_count": {"$add": [{"$ifNull": ["$reviews_count", 0]}, count_delta]},
+                "rating_histogram": histogram,
+                "updated_at": "$$NOW",
+            }
+        },
+        {
+            "$set": {
+                "rating": {
+                    "$cond": [
+                        {"$gt": ["$reviews_count", 0]},
+                        {"$round": [{"$divide": ["$rating_sum", "$reviews_count"]}, 1]},
+                        0.0,
+                    ]
+                }
+            }
+        },
+    ]
+
+
+async def apply_rating_change(product_id: str, added: Optional[int] = None, removed: Optional[int] = None):
+    """Apply a review create (added), delete (removed) or edit (both)"""
+    if added == removed:
+        return
+    try:
+        object_id = PydanticObjectId(product_id)
+    except Exception:
+        return
+    await Product.get_motor_collection().update_one(
+        {"_id": object_id}, rating_update_pipeline(added, removed)
+    )
+    await invalidate_ratings()
+
+
+def rating_stats(doc: Optional[Dict]) -> Dict:
+    """average / total / distribution from a product's stored aggregates"""
+    count = (doc or {}).get("reviews_count") or 0
+    total = (doc or {}).get("rating_sum") or 0
+    histogram = {**empty_histogram(), **((doc or {}).get("rating_histogram") or {})}
+    return {
+        "average_rating": round(total / count, 1) if count else 0.0,
+        "total_reviews": count,
+        "rating_distribution": {int(star): histogram[star] for star in reversed(STARS)},
+    }
+
+
+# ==================== RECONCILIATION ====================
+
+async def reconcile_rating_aggregates() -> int:
+    """Recompute every product's aggregates from reviews; returns products repaired.
+
+    Counters are read before the reviews are grouped and only overwritten if
+    unchanged since (compare-and-set), so a review delta applied during the
+    pass turns that product's repair into a no-op until the next pass.
+    """
+    stored = [
+        doc async for doc in Product.get_motor_collection().find(
+            {}, {"rating_sum": 1, "reviews_count": 1, "rating_histogram": 1, "rating": 1}
+        )
+    ]
+
+    actual: Dict[str, Dict] = {}
+    cursor = Review.get_motor_collection().aggregate([
+        {"$group": {"_id": {"product_id": "$product_id", "rating": "$rating"}, "count": {"$sum": 1}}},
+    ])
+    async for row in cursor:
+        product_id = row["_id"]["product_id"]
+        rating = row["_id"]["rating"]
+        stats = actual.setdefault(product_id, {"rating_sum": 0, "reviews_count": 0, "rating_histogram": empty_histogram()})
+        stats["rating_sum"] += rating * row["count"]
+        stats["reviews_count"] += row["count"]
+        stats["rating_histogram"][str(rating)] = row["count"]
+
+    operations = []
+    for doc in stored:
+        product_id = str(doc["_id"])
+        expected = actual.get(product_id) or {
+            "rating_sum": 0, "reviews_count": 0, "rating_histogram": empty_histogram()
+        }
+        count = expected["reviews_count"]
+        expected["rating"] = round(expected["rating_sum"] / count, 1) if count else 0.0
+        if any(doc.get(field) != value for field, value in expected.items()):
+            operations.append(UpdateOne(
+                {
+                    "_id": doc["_id"],
+                    "reviews_count": doc.get("reviews_count"),
+                    "rating_sum": doc.get("rating_sum"),
+                },
+                {"$set": expected, "$currentDate": {"updated_at": True}},
+            ))
+
+    if operations:
+        result = await Product.get_motor_collection().bulk_write(operations, ordered=False)
+        if result.modified_count:
+            await invalidate_ratings()
+        return result.modified_count
+    return 0
+
+
+async def run_rating_reconciler():
+    """Repair aggregate drift at startup and every RECONCILE_INTERVAL"""
+    while True:
+        try:
+            repaired = await reconcile_rating_aggregates()
+            if repaired:
+                print(f"⭐ Reconciled review aggregates on {repaired} products")
+            await asyncio.sleep(RECONCILE_INTERVAL)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Rating reconciler error: {e}")
+            await asyncio.sleep(60)
@@ -0,0 +1,221 @@
+"""Memory-resident full-text search over the catalog snapshot.
+
+An inverted index over product name, description, category, brand and tags,
+ranked with BM25 (field matches weighted by FIELD_WEIGHTS). The last query
+token also matches as a prefix (search-as-you-type) and tokens of
+MIN_FUZZY_LENGTH or more tolerate one typo (insertion, deletion,
+substitution or transposition), found through a deletion-neighbourhood
+index instead of scanning the vocabulary.
+
+The index subscribes to app.services.catalog_snapshot, so it is rebuilt and
+updated incrementally by the same refreshes that keep the snapshot current.
+Only active products are indexed.
+"""
+
+import math
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+from app.models.product import Product
+from app.services.catalog_snapshot import catalog_snapshot, _deep_sizeof
+
+FIELD_WEIGHTS = {"name": 3.0, "tags": 2.0, "category": 2.0, "brand": 2.0, "description": 1.0}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Score multipliers for terms that only approximately match a query token
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.6
+
+MIN_PREFIX_LENGTH = 2
+MIN_FUZZY_LENGTH = 4
+MAX_PREFIX_EXPANSIONS = 50
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text) -> List[str]:
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def _deletes(term: str) -> Set[str]:
+    """Every string one deletion away from term"""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Optimal string alignment distance <= 1"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return (
+            len(diffs) == 2
+            and diffs[1] == diffs[0] + 1
+            and a[diffs[0]] == b[diffs[1]]
+            and a[diffs[1]] == b[diffs[0]]
+        )
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+class SearchIndex:
+    """BM25 inverted index with prefix and single-typo term expansion"""
+
+    def __init__(self):
+        self.clear()
+
+    # ==================== SNAPSHOT LISTENER ====================
+
+    def clear(self):
+        self.postings: Dict[str, Dict[str, float]] = {}  # term -> {product id: weighted tf}
+        self.doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self.doc_lengths: Dict[str, float] = {}
+        self.total_length = 0.0
+        self.terms: List[str] = []  # sorted vocabulary, for prefix lookups
+        self.deletes: Dict[str, Set[str]] = {}  # one-deletion variant -> terms
+
+    def add(self, product: Product):
+        product_id = str(product.id)
+        self.remove(product_id)
+        if not product.is_active:
+            return
+
+        frequencies: Dict[str, float] = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            value = getattr(product, field, None)
+            for text in value if isinstance(value, list) else [value]:
+                for token in tokenize(text):
+                    frequencies[token] += weight
+        if not frequencies:
+            return
+
+        self.doc_terms[product_id] = tuple(frequencies)
+        length = sum(frequencies.values())
+        self.doc_lengths[product_id] = length
+        self.total_length += length
+        for term, frequency in frequencies.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self._add_term(term)
+            postings[product_id] = frequency
+
+    def remove(self, product_id: str):
+        terms = self.doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+        self.total_length -= self.doc_lengths.pop(product_id)
+        for term in terms:
+            postings = self.postings[term]
+            postings.pop(product_id, None)
+            if not postings:
+                del self.postings[term]
+                self._remove_term(term)
+
+    def _add_term(self, term: str):
+        insort(self.terms, term)
+        if len(term) >= MIN_FUZZY_LENGTH - 1:
+            for variant in _deletes(term):
+                self.deletes.setdefault(variant, set()).add(term)
+
+    def _remove_term(self, term: str):
+        index = bisect_left(self.terms, term)
+        if index < len(self.terms) and self.terms[index] == term:
+            del self.terms[index]
+        if len(term) >= MIN_FUZZY_LENGTH - 1:
+            for variant in _deletes(term):
+                terms = self.deletes.get(variant)
+                if terms is not None:
+                    terms.discard(term)
+                    if not terms:
+                        del self.deletes[variant]
+
+    # ==================== QUERIES ====================
+
+    def expand(self, token: str, prefix: bool = False) -> Dict[str, float]:
+        """Indexed terms matching a query token, with their score multiplier"""
+        expansions: Dict[str, float] = {}
+        if token in self.postings:
+            expansions[token] = 1.0
+
+        if prefix and len(token) >= MIN_PREFIX_LENGTH:
+            index = bisect_left(self.terms, token)
+            end = min(index + MAX_PREFIX_EXPANSIONS, len(self.terms))
+            while index < end and self.terms[index].startswith(token):
+                expansions.setdefault(self.terms[index], PREFIX_WEIGHT)
+                index += 1
+
+        if len(token) >= MIN_FUZZY_LENGTH:
+            candidates = set(self.deletes.get(token, ()))  # token is missing a letter
+            for variant in _deletes(token):
+                if variant in self.postings:  # token has an extra letter
+                    candidates.add(variant)
+                candidates.update(self.deletes.get(variant, ()))  # wrong or swapped letter
+            for term in candidates:
+                if term not in expansions and _within_one_edit(token, term):
+                    expansions[term] = FUZZY_WEIGHT
+        return expansions
+
+    def search(self, query: str) -> List[Tuple[str, float]]:
+        """(product id, score) for products matching every query token, best first"""
+        tokens = tokenize(query)
+        if not tokens or not self.doc_lengths:
+            return []
+
+        count = len(self.doc_lengths)
+        doc_lengths = self.doc_lengths
+        # BM25 length normalisation: k1 * (1 - b + b * length / average)
+        length_base = BM25_K1 * (1 - BM25_B)
+        length_scale = BM25_K1 * BM25_B * count / self.total_length
+
+        scores: Dict[str, float] = {}
+        for position, token in enumerate(dict.fromkeys(tokens)):
+            token_scores: Dict[str, float] = {}
+            is_last = token == tokens[-1]
+            for term, multiplier in self.expand(token, prefix=is_last).items():
+                postings = self.postings[term]
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                weight = multiplier * idf * (BM25_K1 + 1)
+                for product_id, frequency in postings.items():
+                    score = weight * frequency / (frequency + length_base + length_scale * doc_lengths[product_id])
+                    # Best-matching expansion counts once per token
+                    if score > token_scores.get(product_id, 0.0):
+                        token_scores[product_id] = score
+
+            if position == 0:
+                scores = token_scores
+            else:
+                scores = {
+                    product_id: score + token_scores[product_id]
+                    for product_id, score in scores.items()
+                    if product_id in token_scores
+                }
+            if not scores:
+                return []
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def memory_report(self) -> Dict[str, int]:
+        return {
+            "documents": len(self.doc_lengths),
+            "terms": len(self.postings),
+            "approx_bytes": _deep_sizeof(
+                (self.postings, self.doc_terms, self.doc_lengths, self.terms, self.deletes), set()
+            ),
+        }
+
+
+search_index = SearchIndex()
+catalog_snapshot.subscribe(search_index)
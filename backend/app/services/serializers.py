@@ -0,0 +1,116 @@
+"""Fast serialization for product documents read from the database.
+
+Documents coming out of MongoDB are already valid, so running them back
+through ProductResponse (and again through the route's response_model)
+only burns CPU. serialize_product builds the response dict straight from the
+document, computing the pricing fields once, and json_response renders it
+with orjson. The output matches ProductResponse field for field.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+from app.models.product import Product, ProductVariant
+
+
+def serialize_variant(variant: ProductVariant) -> Dict[str, Any]:
+    return {
+        "sku": variant.sku,
+        "name": variant.name,
+        "attributes": variant.attributes,
+        "price_adjustment": variant.price_adjustment,
+        "stock": variant.stock,
+        "image_url": variant.image_url,
+    }
+
+
+def _savings(product: Product) -> float:
+    return round(product.price - product.final_price, 2)
+
+
+def _savings_percentage(product: Product) -> float:
+    return round(_savings(product) / product.price * 100, 2) if product.price else 0
+
+
+def _variants(product: Product) -> List[Dict[str, Any]]:
+    # Projected documents (model_construct) keep variants as raw dicts
+    return [v if isinstance(v, dict) else serialize_variant(v) for v in product.variants]
+
+
+# Per-field getters for sparse fieldsets; anything else is a plain attribute
+_FIELD_GETTERS: Dict[str, Callable[[Product], Any]] = {
+    "id": lambda p: str(p.id),
+    "savings": _savings,
+    "savings_percentage": _savings_percentage,
+    "main_image": lambda p: p.images[0] if p.images else None,
+    "variants": _variants,
+}
+
+
+def serialize_product(product: Product, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """ProductResponse-shaped dict for a trusted Product document.
+
+    With `fields`, only those keys are emitted (see app.services.fieldsets).
+    """
+    if fields is not None:
+        return {
+            name: _FIELD_GETTERS[name](product) if name in _FIELD_GETTERS else getattr(product, name)
+            for name in fields
+        }
+
+    price = product.price
+    final_price = product.final_price
+    savings = round(price - final_price, 2)
+    images = product.images
+    return {
+        "id": str(product.id),
+        "name": product.name,
+        "description": product.description,
+        "price": price,
+        "final_price": final_price,
+        "savings": savings,
+        "savings_percentage": round(savings / price * 100, 2) if price else 0,
+        "category": product.category,
+        "brand": product.brand,
+        "images": images,
+        "main_image": images[0] if images else None,
+        "stock": product.stock,
+        "total_stock": product.total_stock,
+        "is_in_stock": product.is_in_stock,
+        "has_variants": product.has_variants,
+        "variants": [serialize_variant(v) for v in product.variants],
+        "related_product_ids": product.related_product_ids,
+        "discount_active": product.discount_active,
+        "discount_percentage": product.discount_percentage,
+        "discount_amount": product.discount_amount,
+        "discount_starts_at": product.discount_starts_at,
+        "discount_ends_at": product.discount_ends_at,
+        "is_active": product.is_active,
+        "is_featured": product.is_featured,
+        "tags": product.tags,
+        "views_count": product.views_count,
+        "sales_count": product.sales_count,
+        "slug": product.slug,
+        "created_at": product.created_at,
+        "updated_at": product.updated_at,
+    }
+
+
+def serialize_products(products: Iterable[Product], fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    return [serialize_product(product, fields) for product in products]
+
+
+def json_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> ORJSONResponse:
+    """Render content with orjson, bypassing response_model validation.
+
+    Returning a Response skips the headers FastAPI would otherwise copy from
+    the injected `response` (e.g. ETag from conditional_get), so pass it in.
+    """
+    rendered = ORJSONResponse(content, status_code=status_code)
+    if response is not None:
+        for name, value in response.headers.items():
+            if name not in ("content-length", "content-type"):
+                rendered.headers[name] = value
+    return rendered
@@ -0,0 +1,220 @@
+"""Prefix autocomplete over product names, tags, categories and brands.
+
+Suggestions live in a character trie in which every node caches its TOP_K
+best completions, so a lookup is one walk down the typed prefix and no
+scan. Each phrase is inserted from every word start, which means "desk"
+also completes "Walnut Desk Organizer". Paths stop at MAX_PREFIX_LENGTH
+characters to keep the trie compact.
+
+A product is weighted by its sales and views. A tag, category or brand is
+weighted by the sum of its products' weights. The trie subscribes to
+app.services.catalog_snapshot, so it follows the same incremental
+refreshes. Changed weights only mark their paths dirty, and the cached
+top-k lists are recomputed bottom-up on the next lookup; a full rebuild
+costs a single pass. View counts are written without touching updated_at,
+so they reach the weights on the snapshot's periodic full rebuild.
+"""
+
+import heapq
+import sys
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.models.product import Product
+from app.services.catalog_snapshot import catalog_snapshot, _deep_sizeof
+from app.services.search_index import tokenize
+
+TOP_K = 10
+MAX_PREFIX_LENGTH = 24
+
+SALES_WEIGHT = 10.0
+VIEWS_WEIGHT = 1.0
+
+Key = Tuple[str, str]  # (type, product id or name)
+
+
+def normalize(text: Optional[str]) -> str:
+    return " ".join(tokenize(text))
+
+
+def product_weight(product: Product) -> float:
+    return 1.0 + product.sales_count * SALES_WEIGHT + product.views_count * VIEWS_WEIGHT
+
+
+class _Node:
+    __slots__ = ("children", "entries", "top", "depth")
+
+    def __init__(self, depth: int):
+        self.children: Dict[str, "_Node"] = {}
+        self.entries: Set[Key] = set()  # keys whose phrase ends (or is cut off) here
+        self.top: List[Key] = []
+        self.depth = depth
+
+
+class SuggestionTrie:
+    """Weighted top-k prefix completions"""
+
+    def __init__(self):
+        self.clear()
+
+    # ==================== SNAPSHOT LISTENER ====================
+
+    def clear(self):
+        self.root = _Node(0)
+        self.weights: Dict[Key, float] = {}
+        self.labels: Dict[Key, Dict[str, Any]] = {}
+        self.phrases: Dict[Key, List[str]] = {}
+        self.contributions: Dict[str, List[Tuple[Key, float]]] = {}  # product id -> group weights added
+        self._dirty: Set[_Node] = set()
+
+    def add(self, product: Product):
+        product_id = str(product.id)
+        self.remove(product_id)
+        if not product.is_active or not product.name:
+            return
+
+        weight = product_weight(product)
+        key = ("product", product_id)
+        self.labels[key] = {
+            "text": product.name,
+            "type": "product",
+            "id": product_id,
+            "slug": product.slug,
+            "category": product.category,
+            "price": product.final_price,
+        }
+        self._set_weight(key, weight, product.name)
+
+        groups = [("tag", tag) for tag in product.tags]
+        if product.category:
+            groups.append(("category", product.category))
+        if product.brand:
+            groups.append(("brand", product.brand))
+        contributions = []
+        for group in dict.fromkeys(groups):
+            if group not in self.labels:
+                self.labels[group] = {"text": group[1], "type": group[0]}
+            self._set_weight(group, self.weights.get(group, 0.0) + weight, group[1])
+            contributions.append((group, weight))
+        self.contributions[product_id] = contributions
+
+    def remove(self, product_id: str):
+        contributions = self.contributions.pop(product_id, None)
+        if contributions is None:
+            return
+        self._set_weight(("product", product_id), None)
+        for group, weight in contributions:
+            remaining = self.weights.get(group, 0.0) - weight
+            self._set_weight(group, remaining if remaining > 1e-9 else None)
+
+    # ==================== TRIE MAINTENANCE ====================
+
+    def _set_weight(self, key: Key, weight: Optional[float], text: Optional[str] = None):
+        """Set (or with None, drop) a key's weight and mark its paths dirty"""
+        if weight is None:
+            self.weights.pop(key, None)
+            self.labels.pop(key, None)
+            for phrase in self.phrases.pop(key, []):
+                self._unlink(key, phrase)
+            return
+
+        self.weights[key] = weight
+        if key not in self.phrases:
+            words = normalize(text).split()
+            phrases = list(dict.fromkeys(" ".join(words[i:])[:MAX_PREFIX_LENGTH] for i in range(len(words))))
+            self.phrases[key] = phrases
+            for phrase in phrases:
+                self._link(key, phrase)
+        else:
+            for phrase in self.phrases[key]:
+                self._dirty.update(self._path(phrase))
+
+    def _path(self, phrase: str) -> List[_Node]:
+        nodes = [self.root]
+        for char in phrase:
+            node = nodes[-1].children.get(char)
+            if node is None:
+                break
+            nodes.append(node)
+        return nodes
+
+    def _link(self, key: Key, phrase: str):
+        node = self.root
+        self._dirty.add(node)
+        for char in phrase:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _Node(node.depth + 1)
+            node = child
+            self._dirty.add(node)
+        node.entries.add(key)
+
+    def _unlink(self, key: Key, phrase: str):
+        nodes = self._path(phrase)
+        nodes[-1].entries.discard(key)
+        # Prune branches left empty, deepest first
+        attached = len(nodes)
+        for depth in range(len(nodes) - 1, 0, -1):
+            node = nodes[depth]
+            if node.entries or node.children:
+                break
+            del nodes[depth - 1].children[phrase[depth - 1]]
+            self._dirty.discard(node)
+            attached = depth
+        self._dirty.update(nodes[:attached])
+
+    def _flush(self):
+        """Recompute cached top-k lists of dirty nodes, children before parents"""
+        if not self._dirty:
+            return
+        weights = self.weights
+        for node in sorted(self._dirty, key=lambda n: n.depth, reverse=True):
+            candidates = set(node.entries)
+            for child in node.children.values():
+                candidates.update(child.top)
+            node.top = heapq.nlargest(TOP_K, candidates, key=lambda key: (weights.get(key, 0.0), key))
+        self._dirty = set()
+
+    # ==================== QUERIES ====================
+
+    def suggest(self, prefix: str, limit: int = TOP_K) -> List[Dict[str, Any]]:
+        """Best completions for a typed prefix"""
+        self._flush()
+        query = normalize(prefix)[:MAX_PREFIX_LENGTH]
+        if not query:
+            return []
+        node = self.root
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        suggestions, seen = [], set()
+        for key in node.top:
+            label = self.labels[key]
+            # Identically named products show up once
+            if (label["type"], label["text"]) in seen:
+                continue
+            seen.add((label["type"], label["text"]))
+            suggestions.append(label)
+            if len(suggestions) == limit:
+                break
+        return suggestions
+
+    def memory_report(self) -> Dict[str, int]:
+        return {
+            "keys": len(self.weights),
+            "approx_bytes": _deep_sizeof((self.weights, self.labels, self.phrases, self.contributions), set())
+            + self._trie_bytes(),
+        }
+
+    def _trie_bytes(self) -> int:
+        total = 0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            total += sys.getsizeof(node) + sys.getsizeof(node.children) + sys.getsizeof(node.entries) + sys.getsizeof(node.top)
+            stack.extend(node.children.values())
+        return total
+
+
+suggestion_trie = SuggestionTrie()
+catalog_snapshot.subscribe(suggestion_trie)
@@ -0,0 +1,92 @@
+"""Batched product view counting.
+
+Page views are aggregated in memory and written as `$inc` deltas in a single
+unordered bulk_write every VIEW_COUNTER_FLUSH_INTERVAL seconds (sooner when
+many products are pending) and once more on shutdown. `$inc` is commutative,
+so any number of workers can each flush their own deltas without
+coordinating or losing each other's counts.
+"""
+
+import asyncio
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+from beanie import PydanticObjectId
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.models.product import Product
+
+
+class ViewCounter:
+    """Per-worker buffer of counter deltas keyed by (product id, field)"""
+
+    def __init__(self):
+        self._pending: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._task: Optional["asyncio.Task"] = None
+        self._flush_lock = asyncio.Lock()
+
+    def record(self, product_id, field: str = "views_count", amount: int = 1):
+        """Count a view (or another counter field) without touching MongoDB"""
+        self._pending[(str(product_id), field)] += amount
+        if len(self._pending) >= settings.VIEW_COUNTER_MAX_PENDING:
+            asyncio.ensure_future(self.flush())
+
+    @property
+    def pending(self) -> int:
+        return sum(self._pending.values())
+
+    async def flush(self) -> int:
+        """Write all pending deltas; returns the number of products updated"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            # Swap before awaiting so views recorded during the write go to
+            # the next batch
+            batch, self._pending = self._pending, defaultdict(int)
+
+            increments: Dict[str, Dict[str, int]] = defaultdict(dict)
+            for (product_id, field), amount in batch.items():
+                increments[product_id][field] = amount
+
+            operations = []
+            for product_id, inc in increments.items():
+                try:
+                    operations.append(UpdateOne({"_id": PydanticObjectId(product_id)}, {"$inc": inc}))
+                except Exception:
+                    continue
+            if not operations:
+                return 0
+
+            try:
+                await Product.get_motor_collection().bulk_write(operations, ordered=False)
+            except Exception as e:
+                # Put the counts back; they'll go out with the next flush
+                for key, amount in batch.items():
+                    self._pending[key] += amount
+                print(f"⚠️ View counter flush failed: {e}")
+                return 0
+            return len(operations)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.VIEW_COUNTER_FLUSH_INTERVAL)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the periodic flush and write whatever is left"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+view_counter = ViewCounter()
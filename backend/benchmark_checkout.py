@@ -0,0 +1,135 @@
+"""
+Concurrency benchmark: checkout stock decrements under parallel load.
+
+Fires CHECKOUTS concurrent checkouts, each a random 1-3 line cart over a
+handful of low-stock products, and checks the final stock against what the
+successful checkouts took.
+
+read-check-save: the old create_order path - load each product, compare
+                 stock in Python, write back stock - qty. It loses updates
+                 and oversells.
+conditional:     app.services.inventory.decrement_stock - concurrent
+                 conditional decrements, one per line, with all-or-nothing
+                 compensation.
+flash:           the same call with the products on flash sale - buyers are
+                 admitted by stock tokens (in-process here unless USE_REDIS)
+                 and the writes are coalesced by stock_writer.
+
+For each strategy it reports the wall time, the units sold, and whether
+stock - sold == final stock with no negative stock and a matching
+sales_count. Needs MongoDB: it uses MONGODB_URL from the usual .env and a
+scratch database (DATABASE_NAME + "_checkout_benchmark") that is dropped
+afterwards. Run from backend/:  python benchmark_checkout.py
+"""
+import asyncio
+import random
+import time
+from typing import Dict, List
+
+from beanie import PydanticObjectId, init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.models.inventory import InventoryHold
+from app.models.product import Product
+from app.services.cache import close_cache, init_cache
+from app.services.flash_sale import flash_sale
+from app.services.inventory import decrement_stock, stock_writer
+
+PRODUCTS = 5
+STOCK = 40
+CHECKOUTS = 500
+
+
+def make_carts(product_ids: List[str]) -> List[Dict[str, int]]:
+    rng = random.Random(42)
+    return [
+        {product_id: rng.randint(1, 3) for product_id in rng.sample(product_ids, rng.randint(1, 3))}
+        for _ in range(CHECKOUTS)
+    ]
+
+
+async def read_check_save(quantities: Dict[str, int]) -> bool:
+    collection = Product.get_motor_collection()
+    docs = [await collection.find_one({"_id": PydanticObjectId(product_id)}) for product_id in quantities]
+    if any(doc["stock"] < quantities[str(doc["_id"])] for doc in docs):
+        return False
+    for doc in docs:
+        quantity = quantities[str(doc["_id"])]
+        await collection.update_one(
+            {"_id": doc["_id"]},
+            {"$set": {"stock": doc["stock"] - quantity, "sales_count": doc["sales_count"] + quantity}},
+        )
+    return True
+
+
+async def conditional(quantities: Dict[str, int]) -> bool:
+    return not await decrement_stock(quantities)
+
+
+async def seed() -> List[str]:
+    await Product.get_motor_collection().delete_many({})
+    products = [
+        Product(
+            name=f"Benchmark Product {i}",
+            description="Checkout benchmark",
+            price=999.0,
+            category="Benchmark",
+            stock=STOCK,
+        )
+        for i in range(PRODUCTS)
+    ]
+    for product in products:
+        await product.insert()
+    return [str(product.id) for product in products]
+
+
+async def run(name: str, checkout, flash: bool = False) -> None:
+    product_ids = await seed()
+    carts = make_carts(product_ids)
+    if flash:
+        await flash_sale.enable(product_ids)
+        stock_writer.start()
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(checkout(cart) for cart in carts))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if flash:
+        await stock_writer.stop()
+        await flash_sale.disable(product_ids)
+
+    sold = {product_id: 0 for product_id in product_ids}
+    for cart, succeeded in zip(carts, results):
+        if succeeded:
+            for product_id, quantity in cart.items():
+                sold[product_id] += quantity
+
+    consistent = True
+    async for doc in Product.get_motor_collection().find({}, {"stock": 1, "sales_count": 1}):
+        product_sold = sold[str(doc["_id"])]
+        if doc["stock"] < 0 or doc["stock"] != STOCK - product_sold or doc["sales_count"] != product_sold:
+            consistent = False
+
+    print(f"{name:<16}{elapsed_ms:>10.0f}{sum(results):>12}{sum(sold.values()):>8}"
+          f"{PRODUCTS * STOCK:>8}  {'ok' if consistent else 'OVERSOLD / LOST UPDATES'}")
+
+
+async def main():
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    database = client[f"{settings.DATABASE_NAME}_checkout_benchmark"]
+    await init_beanie(database=database, document_models=[Product, InventoryHold])
+    await init_cache()
+    try:
+        print(f"{CHECKOUTS} concurrent checkouts over {PRODUCTS} products with {STOCK} units each")
+        print(f"{'strategy':<16}{'ms':>10}{'checkouts':>12}{'units':>8}{'stock':>8}")
+        await run("read-check-save", read_check_save)
+        await run("conditional", conditional)
+        await run("flash", conditional, flash=True)
+    finally:
+        await client.drop_database(database.name)
+        client.close()
+        await close_cache()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
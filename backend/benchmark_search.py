@@ -0,0 +1,103 @@
+"""
+Micro-benchmark: /search text matching, regex scan vs in-memory index.
+
+regex: what the old search.py asked MongoDB to do - an unanchored,
+       case-insensitive regex over name, description and category of every
+       product (a collection scan), then loading every match. Run here in
+       Python against in-memory documents, so it is a lower bound: the real
+       path also pays the round trip and BSON decoding of every match.
+index: SearchIndex.search() (BM25 + prefix + one-typo expansion).
+
+Also reports how many products each query finds; typo queries find nothing
+with the regex. No database needed, but settings are loaded on import, so
+run from backend/ with the usual .env:  python benchmark_search.py
+"""
+import random
+import re
+import time
+from datetime import datetime, timezone
+from typing import List
+
+from beanie import PydanticObjectId
+
+from app.models.product import Product
+from app.services.search_index import SearchIndex
+
+PRODUCTS = 2000
+ROUNDS = 50
+QUERIES = ["walnut", "desk organizer", "leather mat", "monit", "organiser", "walnt desk", "marvel edition"]
+
+WORDS = (
+    "walnut oak maple leather felt aluminium desk mat organizer tray lamp monitor stand riser "
+    "cable clip pen holder keyboard wrist rest coaster shelf drawer charging dock headphone hook"
+).split()
+
+
+def make_products(count: int) -> List[Product]:
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    products = []
+    for i in range(count):
+        product = Product.model_construct(
+            id=PydanticObjectId(),
+            name=" ".join(rng.sample(WORDS, 3)).title(),
+            description=" ".join(rng.choices(WORDS, k=40)),
+            price=999.0 + i,
+            category=["Desk Mats", "Desk Accessories", "Lighting"][i % 3],
+            brand="Studioform",
+            images=[],
+            stock=5,
+            has_variants=False,
+            variants=[],
+            discount_active=False,
+            is_active=True,
+            tags=["Marvel Edition"] if i % 50 == 0 else ["Desk"],
+            sales_count=i % 17,
+            rating=0.0,
+            created_at=now,
+            updated_at=now,
+        )
+        product.sync_derived_fields()
+        products.append(product)
+    return products
+
+
+def regex_search(products: List[Product], query: str) -> List[Product]:
+    pattern = re.compile(query, re.IGNORECASE)
+    return [
+        p for p in products
+        if pattern.search(p.name) or pattern.search(p.description or "") or pattern.search(p.category or "")
+    ]
+
+
+def best_ms(fn) -> float:
+    fn()  # warm-up
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    products = make_products(PRODUCTS)
+
+    start = time.perf_counter()
+    index = SearchIndex()
+    for product in products:
+        index.add(product)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{PRODUCTS} products, index built in {build_ms:.0f} ms "
+          f"({len(index.postings)} terms), best of {ROUNDS} rounds")
+    print(f"{'query':<18}{'regex ms':>10}{'hits':>7}{'index ms':>10}{'hits':>7}")
+    for query in QUERIES:
+        regex_ms = best_ms(lambda: regex_search(products, query))
+        index_ms = best_ms(lambda: index.search(query))
+        print(f"{query:<18}{regex_ms:>10.3f}{len(regex_search(products, query)):>7}"
+              f"{index_ms:>10.3f}{len(index.search(query)):>7}")
+
+
+if __name__ == "__main__":
+    main()
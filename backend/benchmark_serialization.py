@@ -0,0 +1,164 @@
+"""
+Micro-benchmark: per-product cost of serializing a product listing.
+
+before: ProductResponse(...) built from the old computed properties (each of
+        final_price / savings / savings_percentage re-running the discount
+        check), .dict(), then response_model validation + jsonable_encoder +
+        json.dumps as FastAPI does for a List[ProductResponse] route.
+after:  serialize_product() straight from the document + orjson.
+
+No database needed. Run from backend/:  python benchmark_serialization.py
+"""
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import orjson
+from beanie import PydanticObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models.product import Product, ProductVariant
+from app.schemas.product import ProductResponse
+from app.services.serializers import serialize_products
+
+PRODUCTS = 500
+ROUNDS = 20
+
+
+def make_products(count: int) -> List[Product]:
+    now = datetime.now(timezone.utc)
+    products = []
+    for i in range(count):
+        has_variants = i % 3 == 0
+        product = Product.model_construct(
+            id=PydanticObjectId(),
+            name=f"Walnut Desk Organizer {i}",
+            description="Solid walnut organizer with three compartments and a phone slot. " * 4,
+            price=1499.0 + i,
+            category=["Desk Mats", "Desk Accessories", "Lighting"][i % 3],
+            brand="Studioform",
+            images=[f"https://images.example.com/{i}/{n}.jpg" for n in range(4)],
+            stock=10 + i % 7,
+            has_variants=has_variants,
+            variants=[
+                ProductVariant(sku=f"SKU-{i}-{n}", name=f"Color {n}", attributes={"color": str(n)}, stock=n)
+                for n in range(3)
+            ] if has_variants else [],
+            related_product_ids=[],
+            discount_percentage=10.0 if i % 2 else 0,
+            discount_amount=0,
+            sale_price=None,
+            discount_active=bool(i % 2),
+            discount_starts_at=now - timedelta(days=1),
+            discount_ends_at=now + timedelta(days=1),
+            is_active=True,
+            is_featured=i % 5 == 0,
+            tags=["Special Edition", "Desk"],
+            slug=f"walnut-desk-organizer-{i}",
+            views_count=i * 3,
+            sales_count=i,
+            rating=4.5,
+            reviews_count=12,
+            created_at=now,
+            updated_at=now,
+        )
+        product.sync_derived_fields()
+        products.append(product)
+    return products
+
+
+def legacy_final_price(p: Product) -> float:
+    """The removed Product.final_price property"""
+    if not p.discount_active:
+        return p.price
+    now = datetime.now(timezone.utc)
+    if p.discount_starts_at and now < p.discount_starts_at:
+        return p.price
+    if p.discount_ends_at and now > p.discount_ends_at:
+        return p.price
+    candidates = [p.price]
+    if p.sale_price is not None and p.sale_price > 0:
+        candidates.append(p.sale_price)
+    if p.discount_percentage > 0:
+        candidates.append(max(p.price * (1 - p.discount_percentage / 100), 0))
+    if p.discount_amount > 0:
+        candidates.append(max(p.price - p.discount_amount, 0))
+    return round(min(candidates), 2)
+
+
+def legacy_response(p: Product) -> dict:
+    savings = round(p.price - legacy_final_price(p), 2)
+    return ProductResponse(
+        id=str(p.id),
+        name=p.name,
+        description=p.description,
+        price=p.price,
+        final_price=legacy_final_price(p),
+        savings=savings,
+        savings_percentage=round((round(p.price - legacy_final_price(p), 2) / p.price) * 100, 2),
+        discount_active=p.discount_active,
+        discount_percentage=p.discount_percentage,
+        discount_amount=p.discount_amount,
+        discount_starts_at=p.discount_starts_at,
+        discount_ends_at=p.discount_ends_at,
+        category=p.category,
+        brand=p.brand,
+        images=p.images,
+        main_image=p.main_image,
+        stock=p.stock,
+        total_stock=p.total_stock,
+        is_in_stock=p.is_in_stock,
+        has_variants=p.has_variants,
+        variants=[v.model_dump() for v in p.variants],
+        related_product_ids=p.related_product_ids,
+        is_active=p.is_active,
+        is_featured=p.is_featured,
+        tags=p.tags,
+        views_count=p.views_count,
+        sales_count=p.sales_count,
+        slug=p.slug,
+        created_at=p.created_at,
+        updated_at=p.updated_at
+    ).dict()
+
+
+response_adapter = TypeAdapter(List[ProductResponse])
+
+
+def before(products: List[Product]) -> bytes:
+    content = [legacy_response(p) for p in products]
+    validated = response_adapter.validate_python(content)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def after(products: List[Product]) -> bytes:
+    return orjson.dumps(serialize_products(products))
+
+
+def per_product_us(fn, products: List[Product]) -> float:
+    fn(products)  # warm-up
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn(products)
+        best = min(best, time.perf_counter() - start)
+    return best / len(products) * 1_000_000
+
+
+def main():
+    products = make_products(PRODUCTS)
+
+    # Same payload either way
+    assert json.loads(before(products)) == json.loads(after(products))
+
+    old = per_product_us(before, products)
+    new = per_product_us(after, products)
+    print(f"{PRODUCTS} products, best of {ROUNDS} rounds")
+    print(f"before: {old:8.1f} µs/product")
+    print(f"after:  {new:8.1f} µs/product  ({old / new:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Check: catalog reads show new stock right after a checkout.
+
+Reads a product through every cached or snapshot-served path - the
+category listing, /products/batch, /products/{id}, the cart's repricing
+and the catalog ETag - then checks out part of its stock with
+app.services.inventory.decrement_stock and reads again. Every path must
+report the new stock and the ETag must change (a client holding the old
+one would otherwise get 304 with stale stock).
+
+Needs MongoDB: it uses MONGODB_URL from the usual .env and a scratch
+database (DATABASE_NAME + "_stock_freshness") that is dropped afterwards.
+Run from backend/:  python verify_stock_freshness.py
+"""
+import asyncio
+import json
+import sys
+from typing import Dict
+
+from beanie import init_beanie
+from fastapi import Response
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.api.routes.products import get_product, get_products, get_products_batch
+from app.core.config import settings
+from app.models.banner import HeroBanner
+from app.models.cart import CartLine
+from app.models.collection import Collection
+from app.models.inventory import InventoryHold
+from app.models.product import Product
+from app.services.cache import close_cache, init_cache
+from app.services.cart import load_line_products, reprice_line
+from app.services.catalog import catalog_validators, listing_namespaces
+from app.services.inventory import decrement_stock
+
+STOCK = 10
+CHECKOUT = 3
+CATEGORY = "Freshness Check"
+
+
+def body(response) -> Dict:
+    return json.loads(response.body)
+
+
+async def read(product: Product) -> Dict[str, int]:
+    """Stock as each read path reports it"""
+    product_id = str(product.id)
+    listing = body(await get_products(Response(), category=CATEGORY))
+    batch = body(await get_products_batch(Response(), ids=product_id))
+    detail = body(await get_product(product_id))
+    line = CartLine(product_id=product_id, product_name=product.name, product_price=product.price, quantity=1)
+    cart = reprice_line(line, (await load_line_products([line]))[product_id])
+    return {
+        "listing": listing["products"][0]["stock"],
+        "batch": batch["products"][0]["stock"],
+        "detail": detail["stock"],
+        "cart": cart["stock_quantity"],
+    }
+
+
+async def main() -> int:
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    database = client[f"{settings.DATABASE_NAME}_stock_freshness"]
+    await init_beanie(database=database, document_models=[Product, InventoryHold, Collection, HeroBanner])
+    await init_cache()
+    try:
+        product = Product(
+            name="Freshness Check Product",
+            description="Stock freshness check",
+            price=999.0,
+            category=CATEGORY,
+            stock=STOCK,
+        )
+        await product.insert()
+
+        before = await read(product)
+        etag_before, _ = await catalog_validators(listing_namespaces(category=CATEGORY))
+        failed = await decrement_stock({str(product.id): CHECKOUT})
+        after = await read(product)
+        etag_after, _ = await catalog_validators(listing_namespaces(category=CATEGORY))
+
+        ok = not failed and etag_before != etag_after
+        print(f"{'path':<10}{'before':>8}{'after':>8}")
+        for path in before:
+            fresh = before[path] == STOCK and after[path] == STOCK - CHECKOUT
+            ok = ok and fresh
+            print(f"{path:<10}{before[path]:>8}{after[path]:>8}  {'ok' if fresh else 'STALE'}")
+        print(f"{'etag':<10}{'changed' if etag_before != etag_after else 'UNCHANGED':>16}")
+        return 0 if ok else 1
+    finally:
+        await client.drop_database(database.name)
+        client.close()
+        await close_cache()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
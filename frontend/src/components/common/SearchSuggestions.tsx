@@ -54,23 +54,23 @@ export default function SearchSuggestions({ value, onChange, onSelect }: SearchS
   const fetchSuggestions = async (query: string) => {
     setIsLoading(true);
     try {
-      const response = await api.get('/products', {
+      const response = await api.get('/search/suggest', {
         params: {
-          search: query,
+          q: query,
           limit: 8,
         },
       });
 
-      let products: SearchResult[] = [];
-      if (Array.isArray(response.data)) {
-        products = response.data;
-      } else if (response.data.products) {
-        products = response.data.products;
-      } else if (response.data.items) {
-        products = response.data.items;
-      }
+      const suggestions: SearchResult[] = (response.data.suggestions || []).map(
+        (suggestion: { text: string; type: string; id?: string; category?: string; price?: number }) => ({
+          id: suggestion.id || `${suggestion.type}:${suggestion.text}`,
+          name: suggestion.text,
+          category: suggestion.type === 'product' ? suggestion.category : suggestion.type,
+          price: suggestion.price,
+        })
+      );
 
-      setSuggestions(products.slice(0, 8));
+      setSuggestions(suggestions);
     } catch (error) {
       console.error('Failed to fetch suggestions:', error);
       setSuggestions([]);
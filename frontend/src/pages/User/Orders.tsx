@@ -11,6 +11,8 @@ import { useToast } from '@/hooks/use-toast';
 export default function Orders() {
   const [orders, setOrders] = useState<OrderSummary[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const { toast } = useToast();
 
   useEffect(() => {
@@ -19,8 +21,9 @@ export default function Orders() {
 
   const loadOrders = async () => {
     try {
-      const data = await orderService.getMyOrders();
-      setOrders(data);
+      const page = await orderService.getMyOrdersPage();
+      setOrders(page.orders);
+      setNextCursor(page.has_more ? page.next_cursor : null);
     } catch (error) {
       console.error('Failed to load orders:', error);
       toast({
@@ -33,6 +36,25 @@ export default function Orders() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await orderService.getMyOrdersPage({ cursor: nextCursor });
+      setOrders((prev) => [...prev, ...page.orders]);
+      setNextCursor(page.has_more ? page.next_cursor : null);
+    } catch (error) {
+      console.error('Failed to load more orders:', error);
+      toast({
+        title: 'Error',
+        description: 'Failed to load more orders',
+        variant: 'destructive',
+      });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   /* const handleDownloadInvoice = async (orderId: string, orderNumber: string) => {
     try {
       const blob = await orderService.downloadInvoice(orderId);
@@ -159,6 +181,14 @@ export default function Orders() {
           </Card>
         ))}
       </div>
+
+      {nextCursor && (
+        <div className="mt-6 text-center">
+          <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load More Orders'}
+          </Button>
+        </div>
+      )}
     </div>
   );
 }
@@ -67,8 +67,8 @@ export default function AdminDashboard() {
       setStats(statsData.data);
 
       // Load recent orders
-      const ordersData = await api.get('/orders/admin/all');
-      setRecentOrders(ordersData.data.slice(0, 5));
+      const ordersData = await api.get('/orders/admin/all', { params: { limit: 5 } });
+      setRecentOrders(ordersData.data.orders);
 
       // Load low stock products
       const productsData = await api.get('/products/', { 
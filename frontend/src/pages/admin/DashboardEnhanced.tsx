@@ -83,8 +83,8 @@ export default function AdminDashboardEnhanced() {
       setStats(statsData.data);
 
       // Load recent orders
-      const ordersData = await api.get('/orders/admin/all');
-      setRecentOrders(ordersData.data.slice(0, 5));
+      const ordersData = await api.get('/orders/admin/all', { params: { limit: 5 } });
+      setRecentOrders(ordersData.data.orders);
 
       // Load low stock products
       const productsData = await api.get('/products/', { 
@@ -13,7 +13,7 @@ import { useToast } from '@/hooks/use-toast';
 interface Order {
   id: string;
   order_number: string;
-  user_email: string;
+  user_email?: string | null;
   total_amount: number;
   status: string;
   payment_status: string;
@@ -25,6 +25,9 @@ export default function AdminOrders() {
   const [orders, setOrders] = useState<Order[]>([]);
   const [loading, setLoading] = useState(true);
   const [searchQuery, setSearchQuery] = useState('');
+  const [statusFilter, setStatusFilter] = useState('all');
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedOrder, setSelectedOrder] = useState<Order | null>(null);
   const [showStatusDialog, setShowStatusDialog] = useState(false);
   const [newStatus, setNewStatus] = useState('');
@@ -32,13 +35,31 @@ export default function AdminOrders() {
   const { toast } = useToast();
 
   useEffect(() => {
-    loadOrders();
-  }, []);
+    const timer = setTimeout(() => loadOrders(), searchQuery ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [searchQuery, statusFilter]);
+
+  // Order numbers start with ORD; anything else is a customer email or id
+  const buildParams = (cursor?: string) => {
+    const params: Record<string, string> = {};
+    const query = searchQuery.trim();
+    if (query) {
+      if (query.toUpperCase().startsWith('ORD')) {
+        params.order_number = query;
+      } else {
+        params.customer = query;
+      }
+    }
+    if (statusFilter !== 'all') params.status = statusFilter;
+    if (cursor) params.cursor = cursor;
+    return params;
+  };
 
   const loadOrders = async () => {
     try {
-      const response = await api.get('/orders/admin/all');
-      setOrders(response.data);
+      const response = await api.get('/orders/admin/all', { params: buildParams() });
+      setOrders(response.data.orders);
+      setNextCursor(response.data.has_more ? response.data.next_cursor : null);
     } catch (error) {
       console.error('Failed to load orders:', error);
       toast({
@@ -51,6 +72,25 @@ export default function AdminOrders() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await api.get('/orders/admin/all', { params: buildParams(nextCursor) });
+      setOrders((prev) => [...prev, ...response.data.orders]);
+      setNextCursor(response.data.has_more ? response.data.next_cursor : null);
+    } catch (error) {
+      console.error('Failed to load more orders:', error);
+      toast({
+        title: 'Error',
+        description: 'Failed to load more orders',
+        variant: 'destructive',
+      });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleUpdateStatus = async () => {
     if (!selectedOrder || !newStatus) return;
 
@@ -86,11 +126,6 @@ export default function AdminOrders() {
     setShowStatusDialog(true);
   };
 
-  const filteredOrders = orders.filter((order) =>
-    order.order_number.toLowerCase().includes(searchQuery.toLowerCase()) ||
-    order.user_email.toLowerCase().includes(searchQuery.toLowerCase())
-  );
-
   const getStatusColor = (status: string) => {
     switch (status.toLowerCase()) {
       case 'delivered': return 'bg-green-100 text-green-700';
@@ -109,17 +144,30 @@ export default function AdminOrders() {
         <p className="text-muted-foreground">Manage customer orders</p>
       </div>
 
-      {/* Search */}
-      <div className="mb-6">
-        <div className="relative max-w-md">
+      {/* Search & Filter */}
+      <div className="mb-6 flex flex-col sm:flex-row gap-4">
+        <div className="relative flex-1 max-w-md">
           <Search className="absolute left-3 top-1/2 -translate-y-1/2 h-4 w-4 text-muted-foreground" />
           <Input
-            placeholder="Search orders..."
+            placeholder="Search by order number or customer email..."
             className="pl-10"
             value={searchQuery}
             onChange={(e) => setSearchQuery(e.target.value)}
           />
         </div>
+        <Select value={statusFilter} onValueChange={setStatusFilter}>
+          <SelectTrigger className="w-full sm:w-48">
+            <SelectValue placeholder="All statuses" />
+          </SelectTrigger>
+          <SelectContent>
+            <SelectItem value="all">All Statuses</SelectItem>
+            <SelectItem value="pending">Pending</SelectItem>
+            <SelectItem value="processing">Processing</SelectItem>
+            <SelectItem value="shipped">Shipped</SelectItem>
+            <SelectItem value="delivered">Delivered</SelectItem>
+            <SelectItem value="cancelled">Cancelled</SelectItem>
+          </SelectContent>
+        </Select>
       </div>
 
       {/* Orders Table */}
@@ -129,7 +177,7 @@ export default function AdminOrders() {
             <div className="p-8 text-center text-muted-foreground">
               Loading orders...
             </div>
-          ) : filteredOrders.length === 0 ? (
+          ) : orders.length === 0 ? (
             <div className="p-8 text-center text-muted-foreground">
               No orders found
             </div>
@@ -148,10 +196,10 @@ export default function AdminOrders() {
                   </tr>
                 </thead>
                 <tbody>
-                  {filteredOrders.map((order) => (
+                  {orders.map((order) => (
                     <tr key={order.id} className="border-b last:border-0 hover:bg-muted/50">
                       <td className="p-4 font-semibold">{order.order_number}</td>
-                      <td className="p-4">{order.user_email}</td>
+                      <td className="p-4">{order.user_email || '—'}</td>
                       <td className="p-4 font-semibold">₹{order.total_amount.toLocaleString()}</td>
                       <td className="p-4">
                         <Badge className={getStatusColor(order.status)}>
@@ -194,6 +242,14 @@ export default function AdminOrders() {
         </CardContent>
       </Card>
 
+      {nextCursor && (
+        <div className="mt-6 text-center">
+          <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load More Orders'}
+          </Button>
+        </div>
+      )}
+
       {/* Update Status Dialog */}
       <Dialog open={showStatusDialog} onOpenChange={setShowStatusDialog}>
         <DialogContent>
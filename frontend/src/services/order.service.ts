@@ -3,7 +3,14 @@ import type { OrderResponse, OrderSummary, ShippingAddress } from '@/types';
 
 export const orderService = {
   async getMyOrders(): Promise<OrderSummary[]> {
-    const { data } = await api.get('/orders/');
+    const page = await orderService.getMyOrdersPage();
+    return page.orders;
+  },
+
+  async getMyOrdersPage(
+    params?: { status?: string; limit?: number; cursor?: string }
+  ): Promise<{ orders: OrderSummary[]; has_more: boolean; next_cursor: string | null }> {
+    const { data } = await api.get('/orders/', { params });
     return data;
   },
 
@@ -29,6 +29,11 @@ export const productService = {
     return data;
   },
 
+  async getProductsBatch(ids: string[], fields?: string): Promise<{ products: Product[]; missing: string[] }> {
+    const { data } = await api.get('/products/batch', { params: { ids: ids.join(','), fields } });
+    return data;
+  },
+
   async getFeaturedProducts(limit: number = 8): Promise<Product[]> {
     const { data } = await api.get('/products/featured', { params: { limit } });
     return data;
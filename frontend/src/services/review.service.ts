@@ -33,7 +33,15 @@ const reviewService = {
   },
 
   getProductReviews: async (productId: string): Promise<Review[]> => {
-    const response = await api.get(`/reviews/product/${productId}`);
+    const page = await reviewService.getProductReviewsPage(productId);
+    return page.reviews;
+  },
+
+  getProductReviewsPage: async (
+    productId: string,
+    params?: { sort?: 'newest' | 'helpful'; limit?: number; cursor?: string }
+  ): Promise<{ reviews: Review[]; has_more: boolean; next_cursor: string | null }> => {
+    const response = await api.get(`/reviews/product/${productId}`, { params });
     return response.data;
   },
 
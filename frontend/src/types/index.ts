@@ -81,12 +81,18 @@ export interface CartItem {
   image_url: string;
   stock_quantity: number;
   subtotal: number;
+  added_price?: number;
+  price_changed?: boolean;
+  out_of_stock?: boolean;
 }
 
 export interface CartSummary {
   items: CartItem[];
   total_items: number;
   total_price: number;
+  version?: number;
+  has_price_changes?: boolean;
+  has_stock_issues?: boolean;
 }
 
 // Wishlist Types